@@ -1,6 +1,6 @@
+import asyncio
 import json
 import os
-import tempfile
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, File, Form, Request, UploadFile
@@ -9,16 +9,41 @@ from starlette.responses import HTMLResponse
 # --- Importações de Módulos ---
 from app.config import templates  # Importa da configuração central
 from app.services.classifier import (
+    CHUNK_TOKENS,
     InvalidClassificationResponseError,
     InvalidResponseJsonError,
+    classify_automated_email,
     classify_email,
+    classify_email_chunked,
 )
+from app.services.knn_classifier import try_classify_with_knn
 from app.services.responder import (
     InvalidGeneratedResponseError,
     generate_response,
 )
+from app.utils.boilerplate import remove_boilerplate
+from app.utils.compaction import estimate_tokens
+from app.utils.extraction_executor import extract_text_from_upload
 from app.utils.preprocess import preprocess_text
-from app.utils.text_extractor import extract_text
+from app.utils.text_cache import content_hash
+from app.utils.email_parser import is_automated_message
+from app.utils.text_extractor import email_upload_headers, extract_text
+from app.utils.thread_stripper import strip_quoted_history
+from app.utils.uploads import (
+    MAX_UPLOAD_BYTES,
+    UploadTooLargeError,
+    format_size_limit,
+    read_upload,
+)
+from app.utils.zip_uploads import (
+    ZipArchiveError,
+    get_zip_job,
+    is_zip_upload,
+    start_zip_job,
+)
+
+# Se True, um resumo curto do histórico citado é mantido junto à mensagem nova.
+INCLUDE_THREAD_SUMMARY = os.getenv("INCLUDE_THREAD_SUMMARY", "false").lower() == "true"
 
 
 # --- Helper HTMXResponse (movido para cá) ---
@@ -52,6 +77,93 @@ class HTMXResponse(HTMLResponse):
         super().__init__(content=content, **kwargs)
 
 
+# --- Pipeline de Classificação ---
+def _classify_content(
+    raw_content: str, automated: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Classifica o texto extraído de um e-mail e gera a resposta sugerida.
+
+    Args:
+        raw_content: O texto extraído.
+        automated: Se True (cabeçalhos de mensagem automática ou em massa), o
+            e-mail é classificado como improdutivo sem chamar o modelo.
+
+    Returns:
+        O resultado exibido na página: categoria (em minúsculas), confiança,
+        justificativa e resposta sugerida. None quando não sobra conteúdo
+        depois de remover histórico e boilerplate.
+    """
+    # Mantém apenas a mensagem mais recente de respostas e encaminhamentos
+    raw_content = strip_quoted_history(
+        raw_content, summarize=INCLUDE_THREAD_SUMMARY
+    ).text
+    # Remove assinaturas e avisos legais conhecidos (índice de boilerplate)
+    raw_content = remove_boilerplate(raw_content).text
+    if not raw_content.strip():
+        return None
+
+    processed_text = preprocess_text(raw_content, remove_stopwords=True, lemmatize=True)
+    if automated:
+        # Cabeçalhos de resposta automática/envio em massa dispensam o Gemini
+        classification_result = classify_automated_email()
+    else:
+        # E-mails muito parecidos com outros já classificados dispensam o Gemini
+        classification_result = try_classify_with_knn(raw_content)
+    if classification_result is None:
+        # Documentos longos são classificados em trechos paralelos (map-reduce)
+        if estimate_tokens(processed_text) > CHUNK_TOKENS:
+            classification_result = classify_email_chunked(processed_text)
+        else:
+            classification_result = classify_email(processed_text)
+
+    category_raw = classification_result["category"]
+    suggested_response = generate_response(raw_content, category_raw)
+
+    return {
+        "category": category_raw.lower(),
+        "confidence": classification_result["confidence"],
+        "reason": classification_result["reason"],
+        "suggested_response": suggested_response,
+    }
+
+
+def _is_automated_upload(
+    data: bytes, filename: Optional[str], mime_type: Optional[str] = None
+) -> bool:
+    """True para um upload .eml com cabeçalhos de mensagem automática."""
+    headers = email_upload_headers(data, filename=filename, mime_type=mime_type)
+    return headers is not None and is_automated_message(headers)
+
+
+async def _classify_zip_entry(filename: str, data: bytes) -> Dict[str, Any]:
+    """
+    Processa um arquivo de dentro de um ZIP (ver `start_zip_job`). Como no
+    endpoint, só erros conhecidos da IA têm a mensagem exibida; os demais são
+    registrados em log por `start_zip_job` e exibidos com uma mensagem genérica.
+    """
+    raw_content = await extract_text_from_upload(
+        data, filename=filename, sha256=content_hash(data)
+    )
+    try:
+        # Classificação e resposta fazem chamadas bloqueantes ao Gemini
+        result = await asyncio.to_thread(
+            _classify_content, raw_content, _is_automated_upload(data, filename)
+        )
+    except (
+        InvalidClassificationResponseError,
+        InvalidResponseJsonError,
+        InvalidGeneratedResponseError,
+    ) as e:
+        return {
+            "filename": filename,
+            "error": f"Erro ao processar a resposta da IA: {e}",
+        }
+    if result is None:
+        return {"filename": filename, "error": "O conteúdo está vazio."}
+    return {"filename": filename, **result}
+
+
 # --- Definição do Router ---
 router = APIRouter(tags=["Email Processing"])
 
@@ -76,18 +188,43 @@ async def process_email_endpoint(
             toast_description="É necessário enviar apenas uma fonte de conteúdo.",
         )
 
-    raw_content, temp_file_path = "", None
+    raw_content = ""
+    automated = False
     try:
         if file and file.filename:
-            suffix = os.path.splitext(file.filename)[1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-                temp_file.write(await file.read())
-                temp_file_path = temp_file.name
-            raw_content = extract_text(temp_file_path)
+            # Lê em blocos limitados, rejeitando arquivos acima do limite
+            upload = await read_upload(file)
+            if is_zip_upload(file.filename, file.content_type):
+                # Cada arquivo do ZIP é processado em segundo plano; a página
+                # consulta /api/zip-jobs/{id} e recebe os resultados aos poucos
+                job = start_zip_job(upload.data, _classify_zip_entry)
+                return HTMXResponse(
+                    request,
+                    "partials/zip_progress.html",
+                    context={"job": job, "results": [], "since": 0},
+                    toast_type="success",
+                    toast_title="Arquivo ZIP Recebido",
+                    toast_description=f"{job.total} arquivo(s) em processamento.",
+                )
+            # A extração roda no pool de processos, fora do event loop; o hash
+            # calculado no upload é a chave do cache de texto extraído
+            raw_content = await extract_text_from_upload(
+                upload.data,
+                filename=file.filename,
+                mime_type=file.content_type,
+                sha256=upload.sha256,
+            )
+            automated = _is_automated_upload(
+                upload.data, file.filename, file.content_type
+            )
         elif email_content:
             raw_content = extract_text(email_content)
 
-        if not raw_content.strip():
+        # None se vazio na extração ou após a limpeza (só assinatura/aviso legal)
+        # Classificação e resposta fazem chamadas bloqueantes ao Gemini; fora do
+        # event loop, as consultas de progresso dos ZIPs continuam respondendo
+        result = await asyncio.to_thread(_classify_content, raw_content, automated)
+        if result is None:
             return HTMXResponse(
                 request,
                 "partials/error_display.html",
@@ -98,31 +235,35 @@ async def process_email_endpoint(
                 toast_description="O e-mail parece estar vazio ou não pôde ser lido.",
             )
 
-        processed_text = preprocess_text(
-            raw_content, remove_stopwords=True, lemmatize=True
-        )
-        classification_result = classify_email(processed_text)
-
-        category_raw = classification_result["category"]
-        suggested_response = generate_response(raw_content, category_raw)
-        category_display = category_raw.lower()
-
         return HTMXResponse(
             request,
             "partials/result_display.html",
-            context={
-                "result": {
-                    "category": category_display,
-                    "confidence": classification_result["confidence"],
-                    "reason": classification_result["reason"],
-                    "suggested_response": suggested_response,
-                }
-            },
+            context={"result": result},
             toast_type="success",
             toast_title="E-mail Analisado",
-            toast_description=f"Classificado como '{category_display}'.",
+            toast_description=f"Classificado como '{result['category']}'.",
         )
 
+    except UploadTooLargeError as e:
+        return HTMXResponse(
+            request,
+            "partials/error_display.html",
+            context={"error_message": str(e)},
+            status_code=413,
+            toast_type="error",
+            toast_title="Arquivo Muito Grande",
+            toast_description=f"Envie arquivos de até {format_size_limit(MAX_UPLOAD_BYTES)}.",
+        )
+    except ZipArchiveError as e:
+        return HTMXResponse(
+            request,
+            "partials/error_display.html",
+            context={"error_message": str(e)},
+            status_code=400,
+            toast_type="error",
+            toast_title="Arquivo ZIP Inválido",
+            toast_description="O arquivo ZIP foi recusado.",
+        )
     except (
         InvalidClassificationResponseError,
         InvalidResponseJsonError,
@@ -153,6 +294,25 @@ async def process_email_endpoint(
             toast_title="Erro Inesperado",
             toast_description="Não foi possível processar a solicitação.",
         )
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+
+
+@router.get("/api/zip-jobs/{job_id}", include_in_schema=False)
+async def zip_job_progress_endpoint(request: Request, job_id: str, since: int = 0):
+    """
+    Retorna o progresso de um ZIP e, como swap out-of-band, apenas os
+    resultados concluídos desde a consulta anterior (`since`).
+    """
+    job = get_zip_job(job_id)
+    if job is None:
+        # Status 200 para que o HTMX troque o elemento e pare de consultar
+        return HTMXResponse(
+            request,
+            "partials/error_display.html",
+            context={"error_message": "O processamento deste ZIP expirou."},
+        )
+    results = job.results[since:]
+    return HTMXResponse(
+        request,
+        "partials/zip_update.html",
+        context={"job": job, "results": results, "since": since + len(results)},
+    )
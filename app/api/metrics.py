@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.utils.metrics import metrics
+
+router = APIRouter(tags=["Observability"])
+
+
+@router.get("/api/metrics")
+async def get_metrics():
+    """
+    Retorna os contadores em memória do processo (tokens economizados,
+    compactações, histórico removido etc.).
+    """
+    return metrics.snapshot()
@@ -1,4 +1,5 @@
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
@@ -6,8 +7,14 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from dotenv import load_dotenv
 
 from app.api import classify as classify_api
+from app.api import metrics as metrics_api
 from app.api import partials as partials_api  # Rota para parciais de UI
 from app.config import templates  # Importa da configuração central
+from app.utils.extraction_executor import (
+    shutdown_extraction_executor,
+    start_extraction_executor,
+)
+from app.utils.uploads import UploadSizeLimitMiddleware
 
 # --- Configuração do Python Path ---
 # O comando `fastapi run app/main.py` não adiciona a raiz do projeto ao
@@ -22,13 +29,27 @@ BASE_DIR = project_root
 ENV_PATH = BASE_DIR / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
 
+
+# --- Ciclo de Vida ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pool de processos pré-aquecido para extrair texto de PDFs fora do event loop
+    start_extraction_executor()
+    yield
+    shutdown_extraction_executor()
+
+
 # --- Instância da Aplicação ---
 app = FastAPI(
     title="Email AI Classifier",
     description="Uma aplicação completa para classificar e-mails e gerar respostas usando IA.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Rejeita com 413 uploads acima do limite antes de ler o corpo da requisição
+app.add_middleware(UploadSizeLimitMiddleware)
+
 
 # --- Handlers de Exceção ---
 @app.exception_handler(StarletteHTTPException)
@@ -41,6 +62,7 @@ async def custom_http_exception_handler(request: Request, exc: StarletteHTTPExce
 # --- Montar Rotas e Arquivos Estáticos ---
 app.include_router(classify_api.router)
 app.include_router(partials_api.router)  # Inclui o novo router
+app.include_router(metrics_api.router)
 static_dir = BASE_DIR / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
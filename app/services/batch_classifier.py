@@ -0,0 +1,393 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.classifier import (
+    EMAIL_CLASSIFIER_PROMPT_PATH,
+    MODEL_NAME,
+    InvalidClassificationResponseError,
+    _load_prompt,
+    _validate_classification_response,
+)
+from app.utils.compaction import compact_for_model
+from app.utils.text_cache import content_hash
+
+# --- Classificação em Lote (Batch Prediction) ---
+
+# Para reprocessamentos noturnos, uma chamada síncrona por e-mail é a opção mais
+# cara e mais lenta. No modo em lote, os prompts (os mesmos de
+# `classify_email`) são gravados em um JSONL no formato de batch prediction do
+# Vertex AI, enviados de uma vez a um backend, e o resultado é consultado
+# periodicamente até o job terminar. Cada resposta passa pela mesma validação
+# do modo síncrono (`_validate_classification_response`).
+#
+# Backends:
+#
+#   - VertexBatchBackend: envia o JSONL ao Cloud Storage (BATCH_GCS_PREFIX) e
+#     cria um BatchPredictionJob do Gemini;
+#   - LocalBatchBackend: stand-in em disco, sem GCP, que produz a saída no
+#     mesmo formato com uma função de predição local (por padrão, o kNN).
+
+BATCH_GCS_PREFIX = os.getenv("BATCH_GCS_PREFIX", "")
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "30"))
+BATCH_TIMEOUT_SECONDS = float(os.getenv("BATCH_TIMEOUT_SECONDS", str(24 * 3600)))
+
+_OUTPUT_FILE = "predictions.jsonl"
+
+
+class BatchPredictionError(ValueError):
+    """Lançado quando o job em lote falha ou não termina dentro do prazo."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class BatchJobStatus:
+    """Estado de um job: "running", "succeeded" ou "failed"."""
+
+    state: str
+    output_location: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("succeeded", "failed")
+
+
+# --- Formato dos Arquivos ---
+
+
+def build_batch_request(message_id: str, text: str) -> Dict:
+    """
+    Monta uma linha do JSONL de entrada, com o mesmo prompt e configuração de
+    `classify_email`.
+    """
+    prompt_template = _load_prompt(EMAIL_CLASSIFIER_PROMPT_PATH)
+    compacted_text = compact_for_model(text, MODEL_NAME).text
+    prompt = prompt_template.replace("<<<EMAIL_TEXT>>>", compacted_text)
+    return {
+        "id": message_id,
+        "request": {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": 0.0,
+                "responseMimeType": "application/json",
+            },
+        },
+    }
+
+
+def _request_prompt(request: Dict) -> str:
+    return request["contents"][0]["parts"][0]["text"]
+
+
+def write_batch_input(
+    items: Iterable[Tuple[str, str]], path: str
+) -> Dict[str, List[str]]:
+    """
+    Grava os pares (id, texto) como JSONL de entrada.
+
+    Returns:
+        Os ids de cada prompt, indexados pelo hash do prompt, para associar a
+        saída mesmo que o backend não devolva o campo "id". E-mails com o mesmo
+        texto pré-processado (a mesma newsletter recebida duas vezes) têm o
+        mesmo prompt e recebem o mesmo resultado.
+    """
+    ids_by_prompt: Dict[str, List[str]] = {}
+    with open(path, "w", encoding="utf-8") as f:
+        for message_id, text in items:
+            line = build_batch_request(message_id, text)
+            prompt = _request_prompt(line["request"])
+            ids = ids_by_prompt.setdefault(content_hash(prompt.encode("utf-8")), [])
+            ids.append(message_id)
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return ids_by_prompt
+
+
+def _parse_prediction(record: Dict) -> Dict:
+    if record.get("status"):
+        return {"error": str(record["status"])}
+    try:
+        text = record["response"]["candidates"][0]["content"]["parts"][0]["text"]
+        response_data = json.loads(text.strip())
+    except (KeyError, IndexError, TypeError, json.JSONDecodeError) as e:
+        return {"error": f"Resposta inválida no lote: {e}"}
+    try:
+        _validate_classification_response(response_data)
+    except InvalidClassificationResponseError as e:
+        return {"error": str(e)}
+    return response_data
+
+
+def parse_batch_output(
+    records: Iterable[Dict], ids_by_prompt: Dict[str, List[str]]
+) -> Dict[str, Dict]:
+    """
+    Valida as linhas de saída do job.
+
+    Returns:
+        Para cada id, o dicionário de classificação validado ou {"error": ...}.
+        Sem o campo "id" na linha, o resultado vale para todos os e-mails com
+        o mesmo prompt.
+    """
+    results: Dict[str, Dict] = {}
+    for record in records:
+        if record.get("id") is not None:
+            message_ids = [record["id"]]
+        else:
+            try:
+                prompt = _request_prompt(record["request"])
+            except (KeyError, IndexError, TypeError):
+                continue
+            message_ids = ids_by_prompt.get(content_hash(prompt.encode("utf-8")), [])
+        if message_ids:
+            result = _parse_prediction(record)
+            for message_id in message_ids:
+                results[message_id] = result
+    return results
+
+
+def _read_jsonl(lines: Iterable[str]) -> Iterator[Dict]:
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+# --- Backends ---
+
+
+class BatchPredictionBackend(ABC):
+    """
+    Interface de um backend de batch prediction. Backends incompletos falham
+    ao serem instanciados, antes de qualquer envio.
+    """
+
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        """Envia o JSONL de entrada e retorna o identificador do job."""
+
+    @abstractmethod
+    def poll(self, job_id: str) -> BatchJobStatus:
+        """Consulta o estado do job."""
+
+    @abstractmethod
+    def read_output(self, status: BatchJobStatus) -> Iterator[Dict]:
+        """Lê as linhas de saída de um job concluído."""
+
+
+def _split_prompt_template() -> Tuple[str, str]:
+    prefix, _, suffix = _load_prompt(EMAIL_CLASSIFIER_PROMPT_PATH).partition(
+        "<<<EMAIL_TEXT>>>"
+    )
+    return prefix, suffix
+
+
+def knn_predict(prompt: str) -> str:
+    """
+    Predição local padrão: recupera o e-mail do prompt e o classifica com o
+    índice kNN (KNN_INDEX_PATH), sem confiança mínima; a confiança do voto fica
+    registrada no resultado.
+    """
+    from app.services.knn_classifier import try_classify_with_knn
+
+    prefix, suffix = _split_prompt_template()
+    text = prompt.removeprefix(prefix).removesuffix(suffix)
+    result = try_classify_with_knn(text, min_confidence=0.0)
+    if result is None:
+        raise BatchPredictionError("Nenhum índice kNN local configurado.")
+    return json.dumps(result, ensure_ascii=False)
+
+
+class LocalBatchBackend(BatchPredictionBackend):
+    """
+    Stand-in local do Vertex AI: cada job é um diretório com a entrada, o
+    estado (job.json) e a saída no formato do batch prediction.
+
+    Args:
+        directory: Onde os jobs são criados.
+        predict: Recebe o prompt e retorna o texto da resposta do "modelo".
+        polls_until_done: Consultas em "running" antes de processar o job,
+            simulando a fila do serviço.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        predict: Callable[[str], str] = knn_predict,
+        polls_until_done: int = 1,
+    ):
+        self.directory = directory
+        self.predict = predict
+        self.polls_until_done = polls_until_done
+        os.makedirs(directory, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def _load_state(self, job_id: str) -> Dict:
+        with open(os.path.join(self._job_dir(job_id), "job.json"), "r") as f:
+            return json.load(f)
+
+    def _save_state(self, job_id: str, state: Dict) -> None:
+        with open(os.path.join(self._job_dir(job_id), "job.json"), "w") as f:
+            json.dump(state, f)
+
+    def submit(self, input_path: str) -> str:
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        shutil.copyfile(input_path, os.path.join(self._job_dir(job_id), "input.jsonl"))
+        self._save_state(job_id, {"state": "running", "polls": 0})
+        return job_id
+
+    def poll(self, job_id: str) -> BatchJobStatus:
+        state = self._load_state(job_id)
+        if state["state"] == "running":
+            state["polls"] += 1
+            if state["polls"] >= self.polls_until_done:
+                self._run(job_id)
+                state["state"] = "succeeded"
+            self._save_state(job_id, state)
+        if state["state"] == "running":
+            return BatchJobStatus("running")
+        return BatchJobStatus(state["state"], output_location=self._job_dir(job_id))
+
+    def _run(self, job_id: str) -> None:
+        job_dir = self._job_dir(job_id)
+        with (
+            open(os.path.join(job_dir, "input.jsonl"), "r", encoding="utf-8") as src,
+            open(os.path.join(job_dir, _OUTPUT_FILE), "w", encoding="utf-8") as out,
+        ):
+            for line in _read_jsonl(src):
+                try:
+                    text = self.predict(_request_prompt(line["request"]))
+                    line["response"] = {
+                        "candidates": [
+                            {"content": {"role": "model", "parts": [{"text": text}]}}
+                        ]
+                    }
+                except Exception as e:
+                    line["status"] = str(e)
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    def read_output(self, status: BatchJobStatus) -> Iterator[Dict]:
+        path = os.path.join(status.output_location, _OUTPUT_FILE)
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _read_jsonl(f)
+
+
+class VertexBatchBackend(BatchPredictionBackend):
+    """
+    Batch prediction do Gemini no Vertex AI. Entrada e saída ficam no Cloud
+    Storage, sob `gcs_prefix` (ex.: "gs://bucket/lotes").
+    """
+
+    def __init__(
+        self, gcs_prefix: str = BATCH_GCS_PREFIX, model_name: str = MODEL_NAME
+    ):
+        if not gcs_prefix.startswith("gs://"):
+            raise BatchPredictionError(
+                "Defina BATCH_GCS_PREFIX (gs://bucket/prefixo) para o modo em lote."
+            )
+        self.gcs_prefix = gcs_prefix.rstrip("/")
+        self.model_name = model_name
+
+    @staticmethod
+    def _split_uri(uri: str) -> Tuple[str, str]:
+        bucket, _, path = uri.removeprefix("gs://").partition("/")
+        return bucket, path
+
+    def submit(self, input_path: str) -> str:
+        from google.cloud import storage
+        from vertexai.batch_prediction import BatchPredictionJob
+
+        job_prefix = f"{self.gcs_prefix}/{uuid.uuid4().hex}"
+        bucket, path = self._split_uri(f"{job_prefix}/input.jsonl")
+        storage.Client().bucket(bucket).blob(path).upload_from_filename(input_path)
+        job = BatchPredictionJob.submit(
+            source_model=self.model_name,
+            input_dataset=f"{job_prefix}/input.jsonl",
+            output_uri_prefix=f"{job_prefix}/output",
+        )
+        return job.resource_name
+
+    def poll(self, job_id: str) -> BatchJobStatus:
+        from vertexai.batch_prediction import BatchPredictionJob
+
+        job = BatchPredictionJob(job_id)
+        job.refresh()
+        if not job.has_ended:
+            return BatchJobStatus("running")
+        if not job.has_succeeded:
+            return BatchJobStatus("failed", error=str(job.error))
+        return BatchJobStatus("succeeded", output_location=job.output_location)
+
+    def read_output(self, status: BatchJobStatus) -> Iterator[Dict]:
+        from google.cloud import storage
+
+        bucket, prefix = self._split_uri(status.output_location)
+        for blob in storage.Client().list_blobs(bucket, prefix=prefix):
+            if blob.name.endswith(".jsonl"):
+                yield from _read_jsonl(blob.download_as_text().splitlines())
+
+
+# --- Execução do Job ---
+
+
+def run_batch_classification(
+    items: Iterable[Tuple[str, str]],
+    backend: BatchPredictionBackend,
+    workdir: str,
+    poll_interval: float = BATCH_POLL_SECONDS,
+    timeout: float = BATCH_TIMEOUT_SECONDS,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Dict]:
+    """
+    Classifica os pares (id, texto pré-processado) em um único job em lote.
+
+    Args:
+        items: Os e-mails a classificar.
+        backend: O backend de batch prediction.
+        workdir: Diretório onde o JSONL de entrada é gravado.
+        poll_interval: Segundos entre as consultas ao job.
+        timeout: Tempo máximo de espera pelo job.
+        sleep: Função de espera (substituível em testes).
+
+    Returns:
+        Para cada id, a classificação validada ou {"error": ...}. Ids sem
+        linha na saída recebem um erro.
+
+    Raises:
+        BatchPredictionError: Se o job falhar ou exceder `timeout`.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    input_path = os.path.join(workdir, f"batch-{uuid.uuid4().hex}.jsonl")
+    ids_by_prompt = write_batch_input(items, input_path)
+    if not ids_by_prompt:
+        return {}
+
+    job_id = backend.submit(input_path)
+    deadline = time.monotonic() + timeout
+    status = backend.poll(job_id)
+    while not status.done:
+        if time.monotonic() > deadline:
+            raise BatchPredictionError(f"O job {job_id} não terminou no prazo.")
+        sleep(poll_interval)
+        status = backend.poll(job_id)
+    if status.state != "succeeded":
+        raise BatchPredictionError(f"O job {job_id} falhou: {status.error}")
+
+    results = parse_batch_output(backend.read_output(status), ids_by_prompt)
+    missing: List[str] = [
+        message_id
+        for ids in ids_by_prompt.values()
+        for message_id in ids
+        if message_id not in results
+    ]
+    for message_id in missing:
+        results[message_id] = {"error": "Sem resposta na saída do job."}
+    return results
@@ -1,10 +1,13 @@
 import os
 import json
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 import vertexai
 from vertexai.generative_models import GenerativeModel, GenerationConfig
 
+from app.utils.compaction import compact_for_model, split_into_token_chunks
+
 # --- Configuração do Vertex AI ---_
 # O ID do projeto e a localização são obtidos de variáveis de ambiente para
 # garantir portabilidade entre ambientes (local, dev, prod).
@@ -12,6 +15,16 @@ PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 LOCATION = os.getenv("GCP_LOCATION", "us-central1")
 MODEL_NAME = "gemini-2.5-pro"
 
+# --- Configuração do Modo em Trechos (map-reduce) ---
+# Documentos longos são divididos em trechos classificados em paralelo. O tamanho
+# do trecho deve ficar abaixo do orçamento de entrada do modelo para que nenhum
+# trecho precise ser compactado.
+CHUNK_TOKENS = int(os.getenv("CLASSIFIER_CHUNK_TOKENS", "4000"))
+CHUNK_CONCURRENCY = int(os.getenv("CLASSIFIER_CHUNK_CONCURRENCY", "4"))
+CHUNK_PRODUCTIVE_THRESHOLD = float(
+    os.getenv("CLASSIFIER_CHUNK_PRODUCTIVE_THRESHOLD", "0.6")
+)
+
 # Inicializa o Vertex AI SDK. A autenticação é tratada automaticamente
 # pelo ambiente (gcloud auth application-default login, variáveis de ambiente, etc.).
 vertexai.init(project=PROJECT_ID, location=LOCATION)
@@ -82,16 +95,19 @@ def classify_email(text: str) -> Dict:
         text: O conteúdo de texto do e-mail a ser classificado.
 
     Returns:
-        Um dicionário com a classificação, confiança e a justificativa.
+        Um dicionário com a classificação, confiança e a justificativa. Se o
+        texto precisou ser compactado ao orçamento do modelo, inclui a chave
+        'compaction' com as estatísticas (ver `CompactionResult.stats`).
 
     Raises:
         InvalidResponseJsonError: Se a resposta da API não for um JSON válido.
         InvalidClassificationResponseError: Se o JSON da resposta for inválido.
         FileNotFoundError: Se o arquivo de prompt não for encontrado.
     """
-    # 1. Carregar e formatar o prompt
+    # 1. Carregar e formatar o prompt, compactando o texto ao orçamento do modelo
     prompt_template = _load_prompt(EMAIL_CLASSIFIER_PROMPT_PATH)
-    prompt = prompt_template.replace("<<<EMAIL_TEXT>>>", text)
+    compaction = compact_for_model(text, MODEL_NAME)
+    prompt = prompt_template.replace("<<<EMAIL_TEXT>>>", compaction.text)
 
     # 2. Chamar a API do Gemini
     model = GenerativeModel(MODEL_NAME)
@@ -116,4 +132,125 @@ def classify_email(text: str) -> Dict:
     # 4. Validar e retornar a resposta
     _validate_classification_response(response_data)
 
+    if compaction.was_compacted:
+        response_data["compaction"] = compaction.stats()
     return response_data
+
+
+# --- Classificação em Trechos (map-reduce) ---
+
+
+def _merge_reasons(results: List[Dict]) -> str:
+    """Une as justificativas dos trechos, sem repetições, indicando sua origem."""
+    seen = set()
+    parts = []
+    for result in results:
+        reason = str(result.get("reason", "")).strip()
+        if reason and reason not in seen:
+            seen.add(reason)
+            parts.append(f"[Trecho {result['chunk']}] {reason}")
+    return " ".join(parts)
+
+
+def _aggregate_chunk_results(results: List[Dict], threshold: float) -> Dict:
+    """
+    Agrega as classificações dos trechos com a regra:
+
+    - Se algum trecho for "Produtivo" com confiança >= threshold, o documento é
+      "Produtivo", com a maior confiança entre esses trechos e as justificativas
+      deles combinadas.
+    - Caso contrário, o documento é "Improdutivo". A confiança é a menor
+      certeza de "não produtivo" entre os trechos (1 - confiança para trechos
+      produtivos abaixo do limiar), e as justificativas de todos são combinadas.
+    """
+    productive = [
+        r
+        for r in results
+        if r["category"] == "Produtivo" and r["confidence"] >= threshold
+    ]
+    if productive:
+        return {
+            "category": "Produtivo",
+            "confidence": max(r["confidence"] for r in productive),
+            "reason": _merge_reasons(productive),
+            "chunks": len(results),
+        }
+
+    certainty = [
+        r["confidence"] if r["category"] == "Improdutivo" else 1.0 - r["confidence"]
+        for r in results
+    ]
+    return {
+        "category": "Improdutivo",
+        "confidence": round(min(certainty), 4),
+        "reason": _merge_reasons(results),
+        "chunks": len(results),
+    }
+
+
+def classify_email_chunked(
+    text: str,
+    chunk_tokens: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    productive_threshold: Optional[float] = None,
+    classify: Optional[Callable[[str], Dict]] = None,
+) -> Dict:
+    """
+    Classifica textos longos dividindo-os em trechos limitados por tokens,
+    classificados em paralelo e agregados por `_aggregate_chunk_results`.
+
+    A latência passa a depender de (nº de trechos / concorrência), e não do
+    tamanho total do documento.
+
+    Args:
+        text: O texto pré-processado do e-mail ou documento.
+        chunk_tokens: Tamanho máximo de cada trecho, em tokens estimados.
+        max_concurrency: Número máximo de chamadas simultâneas ao modelo.
+        productive_threshold: Confiança mínima para um trecho "Produtivo"
+            determinar a categoria do documento.
+        classify: Função chamada para cada trecho (padrão: `classify_email`);
+            permite, por exemplo, limitar a taxa de chamadas por trecho.
+
+    Returns:
+        Um dicionário no mesmo formato de `classify_email`, com a chave
+        adicional 'chunks' (quantidade de trechos classificados).
+    """
+    chunk_tokens = chunk_tokens or CHUNK_TOKENS
+    max_concurrency = max_concurrency or CHUNK_CONCURRENCY
+    threshold = (
+        CHUNK_PRODUCTIVE_THRESHOLD
+        if productive_threshold is None
+        else productive_threshold
+    )
+
+    classify = classify or classify_email
+
+    chunks = split_into_token_chunks(text, chunk_tokens)
+    if len(chunks) <= 1:
+        result = classify(text)
+        return {**result, "chunks": 1}
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as pool:
+        chunk_results = list(pool.map(classify, chunks))
+
+    for i, result in enumerate(chunk_results, start=1):
+        result["chunk"] = i
+
+    return _aggregate_chunk_results(chunk_results, threshold)
+
+
+# --- Mensagens Automáticas ---
+# Respostas automáticas e envios em massa são identificados pelos cabeçalhos
+# (Auto-Submitted, List-Unsubscribe, List-Id, Precedence; ver
+# `email_parser.is_automated_message`) e classificados como improdutivos sem
+# chamar o modelo.
+AUTOMATED_EMAIL_CONFIDENCE = float(os.getenv("AUTOMATED_EMAIL_CONFIDENCE", "0.95"))
+
+
+def classify_automated_email() -> Dict:
+    """Resultado, no formato de `classify_email`, para uma mensagem automática."""
+    return {
+        "category": "Improdutivo",
+        "confidence": AUTOMATED_EMAIL_CONFIDENCE,
+        "reason": "Mensagem automática ou em massa, segundo os cabeçalhos do e-mail.",
+    }
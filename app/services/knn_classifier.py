@@ -0,0 +1,373 @@
+import json
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.metrics import metrics
+from app.utils.vectorize import HashingVectorizer
+
+# --- Classificador kNN por Similaridade ---
+
+# Muitos e-mails são quase idênticos a outros já classificados (cobranças,
+# confirmações, newsletters). O classificador kNN guarda embeddings de e-mails
+# rotulados em um índice NumPy e, para um e-mail novo, vota entre os vizinhos
+# mais próximos por similaridade de cosseno. Quando a confiança é alta, o
+# pipeline usa o voto e dispensa a chamada ao Gemini.
+#
+# O embedding padrão é local e barato: feature hashing de unigramas/bigramas
+# diretamente em `dim` dimensões (uma projeção aleatória esparsa). Embeddings
+# vindos de um modelo podem ser usados no lugar, passando-os já calculados ao
+# índice e uma função `embed` ao classificador.
+
+KNN_INDEX_PATH = os.getenv("KNN_INDEX_PATH")
+KNN_MIN_CONFIDENCE = float(os.getenv("KNN_MIN_CONFIDENCE", "0.9"))
+KNN_NEIGHBORS = int(os.getenv("KNN_NEIGHBORS", "10"))
+
+DEFAULT_EMBEDDING_DIM = 256
+# A partir deste tamanho, `build_ivf` é recomendado (busca por partições).
+IVF_MIN_VECTORS = 50_000
+_SEARCH_BLOCK_ROWS = 65_536
+
+CATEGORIES = ["Improdutivo", "Produtivo"]
+
+
+class InvalidVectorIndexError(ValueError):
+    """Lançado quando os arquivos do índice vetorial são inválidos."""
+
+    pass
+
+
+# --- Embedding Local ---
+
+
+class HashingEmbedder:
+    """Embedding local: feature hashing com sinal, normalizado (L2)."""
+
+    def __init__(self, dim: int = DEFAULT_EMBEDDING_DIM):
+        self.dim = dim
+        self._vectorizer = HashingVectorizer(n_features=dim)
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        return self._vectorizer.transform(texts, dense=True)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Retorna (scores, posições) dos k maiores valores de cada linha, ordenados."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(scores.dtype), empty.astype(np.int64)
+    positions = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    selected = np.take_along_axis(scores, positions, axis=1)
+    order = np.argsort(-selected, axis=1)
+    return (
+        np.take_along_axis(selected, order, axis=1),
+        np.take_along_axis(positions, order, axis=1),
+    )
+
+
+# --- Índice Vetorial ---
+
+
+class VectorIndex:
+    """
+    Índice de vetores normalizados com busca por cosseno em lote.
+
+    Sem partições, a busca é exata (força bruta em blocos). Com `build_ivf`,
+    os vetores são agrupados por k-means esférico e cada consulta examina
+    apenas as `nprobe` partições mais próximas.
+
+    Lotes acrescentados com `add` ficam pendentes e são empilhados uma única
+    vez, no primeiro acesso a `vectors`/`labels` (busca, IVF ou gravação):
+    construir o índice em lotes copia os vetores uma vez, e não a cada lote.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._labels = np.zeros(0, dtype=np.int8)
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._list_ids: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._vectors) + sum(len(labels) for _, labels in self._pending)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        self._stack_pending()
+        return self._vectors
+
+    @vectors.setter
+    def vectors(self, vectors: np.ndarray) -> None:
+        self._stack_pending()
+        self._vectors = vectors
+
+    @property
+    def labels(self) -> np.ndarray:
+        self._stack_pending()
+        return self._labels
+
+    @labels.setter
+    def labels(self, labels: np.ndarray) -> None:
+        self._stack_pending()
+        self._labels = labels
+
+    def _stack_pending(self) -> None:
+        if not self._pending:
+            return
+        self._vectors = np.concatenate(
+            [self._vectors, *(vectors for vectors, _ in self._pending)]
+        )
+        self._labels = np.concatenate(
+            [self._labels, *(labels for _, labels in self._pending)]
+        )
+        self._pending = []
+
+    @property
+    def has_ivf(self) -> bool:
+        return self.centroids is not None
+
+    def add(self, vectors: np.ndarray, categories: Sequence[str]) -> None:
+        """Acrescenta vetores rotulados. Invalida as partições IVF existentes."""
+        vectors = _normalize_rows(vectors)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Vetores devem ter formato (n, {self.dim}).")
+        if len(vectors) != len(categories):
+            raise ValueError("Quantidade de vetores e de categorias difere.")
+        labels = np.array([CATEGORIES.index(c) for c in categories], dtype=np.int8)
+        self._pending.append((vectors, labels))
+        self.centroids = self._list_ids = self._list_offsets = None
+
+    def build_ivf(
+        self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0
+    ) -> None:
+        """Particiona o índice com k-means esférico (padrão: ~sqrt(n) partições)."""
+        n_lists = n_lists or max(1, int(np.sqrt(len(self))))
+        n_lists = min(n_lists, len(self))
+        if not n_lists:
+            return
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(self), n_lists * 256)
+        sample = self.vectors[rng.choice(len(self), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~np.bincount(assignment, minlength=n_lists).astype(bool)
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = _normalize_rows(sums)
+
+        assignment = np.concatenate(
+            [
+                np.argmax(
+                    self.vectors[start : start + _SEARCH_BLOCK_ROWS] @ centroids.T,
+                    axis=1,
+                )
+                for start in range(0, len(self), _SEARCH_BLOCK_ROWS)
+            ]
+        )
+        self.centroids = centroids
+        self._list_ids = np.argsort(assignment, kind="stable")
+        self._list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(assignment, minlength=n_lists), out=self._list_offsets[1:]
+        )
+
+    def search(
+        self, queries: np.ndarray, k: int = KNN_NEIGHBORS, nprobe: int = 8
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k vizinhos mais similares de cada consulta.
+
+        Returns:
+            (similaridades, ids), ambos de formato (len(queries), k'), com
+            k' = min(k, len(índice)) e similaridades em ordem decrescente.
+        """
+        queries = _normalize_rows(np.atleast_2d(queries))
+        if self.has_ivf:
+            return self._search_ivf(queries, k, nprobe)
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), _SEARCH_BLOCK_ROWS):
+            block = self.vectors[start : start + _SEARCH_BLOCK_ROWS]
+            scores, positions = _top_k(queries @ block.T, k)
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_ids = np.concatenate([best_ids, positions + start], axis=1)
+            best_scores, order = _top_k(merged_scores, k)
+            best_ids = np.take_along_axis(merged_ids, order, axis=1)
+        return best_scores, best_ids
+
+    def _search_ivf(
+        self, queries: np.ndarray, k: int, nprobe: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self))
+        nprobe = min(nprobe, len(self.centroids))
+        _, probes = _top_k(queries @ self.centroids.T, nprobe)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, lists in enumerate(probes):
+            candidates = np.concatenate(
+                [
+                    self._list_ids[self._list_offsets[i] : self._list_offsets[i + 1]]
+                    for i in lists
+                ]
+            )
+            if not len(candidates):
+                continue
+            found_scores, positions = _top_k(
+                (self.vectors[candidates] @ queries[row])[None, :], k
+            )
+            scores[row, : positions.shape[1]] = found_scores[0]
+            ids[row, : positions.shape[1]] = candidates[positions[0]]
+        return scores, ids
+
+    # --- Persistência ---
+
+    def save(self, path: str) -> None:
+        """Grava o índice em um diretório (arquivos .npy + meta.json)."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        np.save(os.path.join(path, "labels.npy"), self.labels)
+        if self.has_ivf:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(path, "list_ids.npy"), self._list_ids)
+            np.save(os.path.join(path, "list_offsets.npy"), self._list_offsets)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "size": len(self), "ivf": self.has_ivf}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """Abre um índice salvo; com `mmap`, os vetores são mapeados sem cópia."""
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            mmap_mode = "r" if mmap else None
+            size = int(meta["size"])
+            index = cls(int(meta["dim"]))
+            index.vectors = np.load(
+                os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode
+            )
+            index.labels = np.load(os.path.join(path, "labels.npy"))
+            if meta.get("ivf"):
+                index.centroids = np.load(os.path.join(path, "centroids.npy"))
+                index._list_ids = np.load(
+                    os.path.join(path, "list_ids.npy"), mmap_mode=mmap_mode
+                )
+                index._list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+        except (OSError, KeyError, ValueError) as e:
+            raise InvalidVectorIndexError(
+                f"Índice vetorial inválido em {path}: {e}"
+            ) from e
+
+        if index.vectors.shape != (size, index.dim) or len(index.labels) != size:
+            raise InvalidVectorIndexError(f"Índice vetorial inconsistente em {path}")
+        return index
+
+
+# --- Classificador ---
+
+
+class KnnClassifier:
+    """
+    Classifica e-mails pelo voto dos vizinhos mais próximos no índice.
+
+    A confiança combina o voto (fração da similaridade dos vizinhos que apoia a
+    categoria vencedora) com a similaridade do vizinho mais próximo, para que
+    um voto unânime entre vizinhos distantes não pareça uma certeza.
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        embed: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+        k: int = KNN_NEIGHBORS,
+        nprobe: int = 8,
+    ):
+        self.index = index
+        self.embed = embed or HashingEmbedder(index.dim)
+        self.k = k
+        self.nprobe = nprobe
+
+    def predict(self, texts: Sequence[str]) -> List[Dict]:
+        """Classifica um lote de textos. Retorna um dicionário por texto."""
+        if not len(self.index):
+            raise ValueError("O índice vetorial está vazio.")
+        similarities, ids = self.index.search(self.embed(texts), self.k, self.nprobe)
+
+        results = []
+        for row_similarities, row_ids in zip(similarities, ids):
+            valid = row_ids >= 0
+            weights = np.clip(row_similarities[valid], 0.0, None)
+            labels = self.index.labels[row_ids[valid]]
+            votes = np.bincount(labels, weights=weights, minlength=len(CATEGORIES))
+            winner = int(np.argmax(votes))
+            vote = float(votes[winner] / votes.sum()) if votes.sum() > 0 else 0.0
+            nearest = float(row_similarities[valid][0]) if valid.any() else 0.0
+            results.append(
+                {
+                    "category": CATEGORIES[winner],
+                    "confidence": round(max(0.0, vote * nearest), 4),
+                    "vote": round(vote, 4),
+                    "similarity": round(nearest, 4),
+                    "neighbors": int(valid.sum()),
+                }
+            )
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_default_knn_classifier() -> Optional[KnnClassifier]:
+    """
+    Carrega (uma vez por processo) o índice configurado em KNN_INDEX_PATH.
+    Retorna None se nenhum índice estiver configurado.
+    """
+    if not KNN_INDEX_PATH or not os.path.isdir(KNN_INDEX_PATH):
+        return None
+    return KnnClassifier(VectorIndex.load(KNN_INDEX_PATH))
+
+
+def try_classify_with_knn(
+    text: str,
+    classifier: Optional[KnnClassifier] = None,
+    min_confidence: float = KNN_MIN_CONFIDENCE,
+) -> Optional[Dict]:
+    """
+    Tenta classificar o e-mail pelos vizinhos mais próximos.
+
+    Returns:
+        Um dicionário no formato de `classify_email` (category, confidence,
+        reason) se a confiança atingir `min_confidence`; caso contrário, None
+        (inclusive quando não há índice configurado).
+    """
+    classifier = classifier if classifier is not None else get_default_knn_classifier()
+    if classifier is None or not len(classifier.index):
+        return None
+
+    result = classifier.predict([text])[0]
+    if result["confidence"] < min_confidence:
+        metrics.increment("knn.misses")
+        return None
+
+    metrics.increment("knn.hits")
+    return {
+        "category": result["category"],
+        "confidence": result["confidence"],
+        "reason": (
+            f"Classificado por similaridade com {result['neighbors']} e-mails já "
+            f"classificados (similaridade {result['similarity']:.2f})."
+        ),
+    }
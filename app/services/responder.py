@@ -1,8 +1,15 @@
 import os
-from typing import Set
+from typing import Dict, Optional, Set
 
 from vertexai.generative_models import GenerativeModel, GenerationConfig
 
+from app.services.response_templates import (
+    TEMPLATE_MIN_CONFIDENCE,
+    get_template_library,
+    log_generated_response,
+)
+from app.utils.compaction import compact_for_model, estimate_tokens
+
 # --- Configurações e Constantes ---
 
 MODEL_NAME = "gemini-2.5-flash"
@@ -96,13 +103,45 @@ def _clean_response(text: str) -> str:
 # --- Serviço Principal ---
 
 
-def generate_response(email_text: str, category: str) -> str:
+def _try_template_response(email_text: str) -> Optional[str]:
+    """
+    Tenta responder localmente com um template da biblioteca, sem chamar o modelo.
+    Retorna None se nenhum subtipo for detectado com confiança suficiente.
+    """
+    library = get_template_library()
+    match = library.detect(email_text)
+    if match is None or match.confidence < TEMPLATE_MIN_CONFIDENCE:
+        return None
+
+    response_text = library.fill(match.subtype)
+    try:
+        _validate_generated_response(response_text, email_text)
+    except InvalidGeneratedResponseError:
+        return None
+    return response_text
+
+
+def generate_response(
+    email_text: str,
+    category: str,
+    use_templates: bool = True,
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
     """
     Gera uma resposta de e-mail usando o modelo Gemini com base na categoria.
 
+    E-mails improdutivos de subtipos conhecidos (agradecimentos, newsletters,
+    notificações automáticas) são respondidos com um template local quando o
+    subtipo é detectado com alta confiança, evitando a chamada ao modelo.
+
     Args:
         email_text: O corpo do e-mail original.
         category: A classificação do e-mail ('Produtivo' ou 'Improdutivo').
+        use_templates: Se True, permite o uso da biblioteca de templates.
+        usage: Se informado, recebe os tokens estimados da chamada ao modelo
+            ('input_tokens' e 'output_tokens') e os tokens do e-mail descartados
+            pela compactação ('dropped_tokens'); fica vazio quando a resposta
+            vem de um template.
 
     Returns:
         O corpo do e-mail de resposta gerado.
@@ -126,12 +165,19 @@ def generate_response(email_text: str, category: str) -> str:
             f"Categoria inválida: '{category}'. Esperado: {VALID_CATEGORIES}"
         )
 
+    # Respostas prontas para e-mails improdutivos comuns
+    if use_templates and normalized_category == "Improdutivo":
+        template_response = _try_template_response(email_text)
+        if template_response is not None:
+            return template_response
+
     # Carregamento e Preparação do Prompt
     prompt_template = _load_prompt(EMAIL_RESPONDER_PROMPT_PATH)
 
-    # Interpolação Segura
+    # Interpolação Segura (o texto é compactado ao orçamento de tokens do modelo)
+    compaction = compact_for_model(email_text, MODEL_NAME)
     prompt = prompt_template.replace("<<<EMAIL_CATEGORY>>>", normalized_category)
-    prompt = prompt.replace("<<<EMAIL_TEXT>>>", email_text)
+    prompt = prompt.replace("<<<EMAIL_TEXT>>>", compaction.text)
 
     # Configuração do Modelo
     model = GenerativeModel(MODEL_NAME)
@@ -151,7 +197,13 @@ def generate_response(email_text: str, category: str) -> str:
         raise RuntimeError(f"Erro ao comunicar com o modelo Gemini: {e}") from e
 
     # Pós-processamento e Validação
+    if usage is not None:
+        usage["input_tokens"] = estimate_tokens(prompt)
+        usage["output_tokens"] = estimate_tokens(generated_text)
+        usage["dropped_tokens"] = compaction.dropped_tokens
+
     cleaned_text = _clean_response(generated_text)
     _validate_generated_response(cleaned_text, email_text)
+    log_generated_response(normalized_category, cleaned_text, source="model")
 
     return cleaned_text
@@ -0,0 +1,271 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Set, Tuple
+
+from app.utils.preprocess import tokenize_text
+
+# --- Configurações e Constantes ---
+
+PROMPT_DIR = os.path.join(os.path.dirname(__file__), "..", "prompts")
+RESPONSE_TEMPLATES_PATH = os.path.join(PROMPT_DIR, "response_templates.json")
+
+# Confiança mínima do detector local de subtipo para que o template seja usado
+# no lugar de uma chamada ao modelo.
+TEMPLATE_MIN_CONFIDENCE = float(os.getenv("RESPONSE_TEMPLATE_MIN_CONFIDENCE", "0.8"))
+
+# Quando definido, cada resposta gerada é registrada (JSONL) neste arquivo para
+# alimentar a mineração de novos templates.
+RESPONSE_LOG_PATH = os.getenv("RESPONSE_LOG_PATH")
+
+DEFAULT_PLACEHOLDERS: Dict[str, str] = {
+    "SAUDACAO": "Olá,",
+    "ENCERRAMENTO": "Atenciosamente,\nSEU NOME",
+}
+
+# Sinais de que o e-mail pede alguma ação. Cada ocorrência reduz a confiança do
+# template, pois uma resposta genérica seria inadequada.
+_ACTION_SIGNALS: Pattern[str] = re.compile(
+    r"\?|\bpor favor\b|\bpoderia[m]?\b|\bpreciso\b|\bprecisamos\b|\burgente\b"
+    r"|\bprazo\b|\baguardo\b|\bsolicit\w*"
+)
+_ACTION_PENALTY = 0.35
+_RUNNER_UP_PENALTY = 0.25
+
+
+# --- Erros Personalizados ---
+
+
+class InvalidTemplateLibraryError(ValueError):
+    """Lançado quando o arquivo da biblioteca de templates é inválido."""
+
+    pass
+
+
+# --- Estruturas de Dados ---
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    """Resultado da detecção local de subtipo de um e-mail improdutivo."""
+
+    subtype: str
+    confidence: float
+    scores: Dict[str, float]
+
+
+# --- Biblioteca de Templates ---
+
+
+class ResponseTemplateLibrary:
+    """
+    Biblioteca de respostas prontas indexada por subtipo de e-mail improdutivo
+    (agradecimento, newsletter, notificação automática...).
+
+    Cada subtipo define sinais (regex com peso) usados para detectá-lo e uma
+    lista de templates com placeholders no formato <<<NOME>>>.
+    """
+
+    def __init__(self, entries: Dict[str, Dict]):
+        self._signals: Dict[str, List[Tuple[Pattern[str], float]]] = {}
+        self._templates: Dict[str, List[str]] = {}
+
+        for subtype, entry in entries.items():
+            templates = entry.get("templates") or []
+            if not templates:
+                raise InvalidTemplateLibraryError(
+                    f"O subtipo '{subtype}' não possui templates."
+                )
+            self._templates[subtype] = list(templates)
+            self._signals[subtype] = [
+                (re.compile(pattern), float(weight))
+                for pattern, weight in entry.get("signals", [])
+            ]
+
+    @classmethod
+    def from_file(cls, path: str) -> "ResponseTemplateLibrary":
+        """Carrega a biblioteca a partir de um arquivo JSON."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Biblioteca de templates não encontrada: {path}")
+        except json.JSONDecodeError as e:
+            raise InvalidTemplateLibraryError(
+                f"A biblioteca de templates não é um JSON válido: {path}"
+            ) from e
+        return cls(entries)
+
+    @property
+    def subtypes(self) -> List[str]:
+        return list(self._templates)
+
+    def detect(self, text: str) -> Optional[TemplateMatch]:
+        """
+        Detecta o subtipo mais provável do e-mail com base nos sinais.
+        Retorna None se nenhum sinal for encontrado.
+        """
+        normalized = text.lower()
+        scores = {
+            subtype: min(
+                1.0,
+                sum(
+                    weight for pattern, weight in signals if pattern.search(normalized)
+                ),
+            )
+            for subtype, signals in self._signals.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0.0:
+            return None
+
+        best_subtype, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        action_hits = len(_ACTION_SIGNALS.findall(normalized))
+
+        confidence = (
+            best_score - _RUNNER_UP_PENALTY * runner_up - _ACTION_PENALTY * action_hits
+        )
+        return TemplateMatch(
+            subtype=best_subtype,
+            confidence=round(max(0.0, min(1.0, confidence)), 4),
+            scores=scores,
+        )
+
+    def fill(
+        self,
+        subtype: str,
+        context: Optional[Dict[str, str]] = None,
+        variant: int = 0,
+    ) -> str:
+        """Preenche o template do subtipo, substituindo os placeholders <<<NOME>>>."""
+        templates = self._templates.get(subtype)
+        if not templates:
+            raise KeyError(f"Subtipo de template desconhecido: '{subtype}'")
+
+        values = {**DEFAULT_PLACEHOLDERS, **(context or {})}
+        text = templates[variant % len(templates)]
+        for name, value in values.items():
+            text = text.replace(f"<<<{name}>>>", value)
+        return text.strip()
+
+
+@lru_cache(maxsize=1)
+def get_template_library() -> ResponseTemplateLibrary:
+    """Retorna a biblioteca padrão, carregada uma única vez por processo."""
+    return ResponseTemplateLibrary.from_file(RESPONSE_TEMPLATES_PATH)
+
+
+# --- Registro de Respostas Geradas ---
+
+
+def log_generated_response(
+    category: str, response: str, source: str, path: Optional[str] = None
+) -> None:
+    """
+    Registra uma resposta gerada em JSONL para mineração posterior de templates.
+    Não faz nada se nenhum caminho estiver configurado. O texto do e-mail
+    original não é registrado.
+    """
+    log_path = path or RESPONSE_LOG_PATH
+    if not log_path:
+        return
+    record = {"category": category, "source": source, "response": response}
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_logged_responses(
+    path: str, category: Optional[str] = "Improdutivo"
+) -> Iterator[str]:
+    """Lê as respostas geradas pelo modelo a partir do log JSONL."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("source") != "model":
+                continue
+            if category and record.get("category") != category:
+                continue
+            response = record.get("response")
+            if isinstance(response, str) and response.strip():
+                yield response
+
+
+# --- Mineração de Templates ---
+
+
+def _shingles(text: str, size: int = 2) -> Set[Tuple[str, ...]]:
+    tokens = tokenize_text(text.lower())
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mine_templates(
+    responses: Iterable[str],
+    similarity_threshold: float = 0.5,
+    min_cluster_size: int = 3,
+) -> List[Dict]:
+    """
+    Agrupa respostas semelhantes (Jaccard sobre bigramas de tokens) e sugere,
+    para cada grupo, a resposta mais central como template candidato.
+
+    O agrupamento é do tipo "líder": cada resposta entra no primeiro grupo cujo
+    líder seja similar o suficiente, ou abre um novo grupo.
+
+    Returns:
+        Lista de candidatos ordenada pelo tamanho do grupo, cada um com as
+        chaves 'size', 'cohesion', 'template' e 'examples'.
+    """
+    clusters: List[Dict] = []
+    for response in responses:
+        shingles = _shingles(response)
+        if not shingles:
+            continue
+        for cluster in clusters:
+            if _jaccard(shingles, cluster["leader"]) >= similarity_threshold:
+                cluster["members"].append((response, shingles))
+                break
+        else:
+            clusters.append({"leader": shingles, "members": [(response, shingles)]})
+
+    candidates = []
+    for cluster in clusters:
+        members = cluster["members"]
+        if len(members) < min_cluster_size:
+            continue
+
+        # O medoide (maior similaridade média) é o representante mais "típico".
+        best_text, best_cohesion = members[0][0], -1.0
+        for text, shingles in members:
+            cohesion = sum(_jaccard(shingles, other) for _, other in members) / len(
+                members
+            )
+            if cohesion > best_cohesion:
+                best_text, best_cohesion = text, cohesion
+
+        candidates.append(
+            {
+                "size": len(members),
+                "cohesion": round(best_cohesion, 4),
+                "template": best_text.strip(),
+                "examples": [text for text, _ in members[:3]],
+            }
+        )
+
+    candidates.sort(key=lambda candidate: candidate["size"], reverse=True)
+    return candidates
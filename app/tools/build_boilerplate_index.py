@@ -0,0 +1,79 @@
+"""
+Constrói o índice de boilerplate (assinaturas, avisos legais) a partir de um
+corpus histórico de e-mails.
+
+Uso:
+    uv run python -m app.tools.build_boilerplate_index corpus/ -o boilerplate.idx
+    BOILERPLATE_INDEX_PATH=boilerplate.idx uv run uvicorn app.main:app
+
+Arquivos .txt e .pdf são lidos com `extract_text`; demais arquivos são lidos
+como texto UTF-8.
+"""
+
+import argparse
+import os
+import sys
+from typing import Iterator, List, Optional
+
+from app.utils.boilerplate import (
+    DEFAULT_MIN_SEGMENT_CHARS,
+    build_boilerplate_hashes,
+    write_boilerplate_index,
+)
+from app.utils.text_extractor import extract_text
+
+
+def _iter_paths(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+def _iter_documents(paths: List[str]) -> Iterator[str]:
+    for path in _iter_paths(paths):
+        if path.endswith((".txt", ".pdf")):
+            text = extract_text(path)
+        else:
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+        if text:
+            yield text
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Constrói o índice de boilerplate a partir de um corpus."
+    )
+    parser.add_argument("paths", nargs="+", help="Arquivos ou diretórios do corpus.")
+    parser.add_argument("-o", "--output", required=True, help="Arquivo do índice.")
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=20,
+        help="Número mínimo de documentos em que o trecho deve aparecer.",
+    )
+    parser.add_argument(
+        "--min-chars",
+        type=int,
+        default=DEFAULT_MIN_SEGMENT_CHARS,
+        help="Tamanho mínimo (normalizado) de um trecho indexável.",
+    )
+    args = parser.parse_args(argv)
+
+    hashes = build_boilerplate_hashes(
+        _iter_documents(args.paths), min_count=args.min_count, min_chars=args.min_chars
+    )
+    count = write_boilerplate_index(hashes, args.output, min_chars=args.min_chars)
+    print(f"{count} trechos de boilerplate gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
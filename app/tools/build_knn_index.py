@@ -0,0 +1,79 @@
+"""
+Constrói o índice vetorial do classificador kNN a partir de e-mails já
+classificados.
+
+Uso:
+    uv run python -m app.tools.build_knn_index rotulados.jsonl -o knn_index/
+    KNN_INDEX_PATH=knn_index/ uv run uvicorn app.main:app
+
+Cada linha do JSONL deve ter os campos "text" e "category" ("Produtivo" ou
+"Improdutivo"). Linhas inválidas são ignoradas.
+"""
+
+import argparse
+import json
+import sys
+from typing import Iterator, List, Optional, Tuple
+
+from app.services.knn_classifier import (
+    CATEGORIES,
+    DEFAULT_EMBEDDING_DIM,
+    IVF_MIN_VECTORS,
+    HashingEmbedder,
+    VectorIndex,
+)
+
+BATCH_SIZE = 1000
+
+
+def _iter_examples(paths: List[str]) -> Iterator[Tuple[str, str]]:
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text, category = record.get("text"), record.get("category")
+                if isinstance(text, str) and text.strip() and category in CATEGORIES:
+                    yield text, category
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Constrói o índice vetorial do classificador kNN."
+    )
+    parser.add_argument("paths", nargs="+", help="Arquivos JSONL com text/category.")
+    parser.add_argument("-o", "--output", required=True, help="Diretório do índice.")
+    parser.add_argument("--dim", type=int, default=DEFAULT_EMBEDDING_DIM)
+    parser.add_argument(
+        "--ivf-lists",
+        type=int,
+        default=None,
+        help=(
+            "Número de partições IVF. Padrão: automático a partir de "
+            f"{IVF_MIN_VECTORS} vetores; 0 desativa."
+        ),
+    )
+    args = parser.parse_args(argv)
+
+    embed = HashingEmbedder(args.dim)
+    index = VectorIndex(args.dim)
+    batch: List[Tuple[str, str]] = []
+    for example in _iter_examples(args.paths):
+        batch.append(example)
+        if len(batch) >= BATCH_SIZE:
+            index.add(embed([t for t, _ in batch]), [c for _, c in batch])
+            batch = []
+    if batch:
+        index.add(embed([t for t, _ in batch]), [c for _, c in batch])
+
+    if args.ivf_lists or (args.ivf_lists is None and len(index) >= IVF_MIN_VECTORS):
+        index.build_ivf(args.ivf_lists or None)
+    index.save(args.output)
+    print(f"{len(index)} e-mails indexados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
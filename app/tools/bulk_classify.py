@@ -0,0 +1,567 @@
+"""
+Classifica caixas de e-mail inteiras (mbox ou Maildir) fora da aplicação web.
+
+Uso:
+    uv run python -m app.tools.bulk_classify caixa.mbox -o resultados.jsonl
+    uv run python -m app.tools.bulk_classify Maildir/ -o resultados.sqlite \\
+        --respond --concurrency 8 --rate 5
+    uv run python -m app.tools.bulk_classify caixa.mbox -o resultados.jsonl \\
+        --batch vertex
+
+As mensagens são lidas uma a uma e passam pelo mesmo fluxo do endpoint
+(extração, remoção de histórico e boilerplate, pré-processamento, cabeçalhos
+de mensagem automática, kNN e Gemini), opcionalmente com geração de resposta. Cada resultado é gravado assim
+que fica pronto (JSONL ou SQLite, pela extensão de --output), e o próprio
+arquivo de saída serve de checkpoint: ao rodar de novo, mensagens já
+classificadas (identificadas pelo SHA-256 do conteúdo) são puladas e apenas as
+que falharam são refeitas.
+
+Com --batch, os e-mails que precisam do modelo são enviados em um único job de
+batch prediction (ver app.services.batch_classifier): "vertex" usa o Vertex AI
+(BATCH_GCS_PREFIX) e "local" usa o stand-in em disco, sem GCP.
+"""
+
+import argparse
+import json
+import mailbox
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services.batch_classifier import (
+    BATCH_POLL_SECONDS,
+    BatchPredictionBackend,
+    BatchPredictionError,
+    LocalBatchBackend,
+    VertexBatchBackend,
+    run_batch_classification,
+)
+from app.services.classifier import (
+    CHUNK_TOKENS,
+    MODEL_NAME,
+    classify_automated_email,
+    classify_email,
+    classify_email_chunked,
+)
+from app.services.knn_classifier import try_classify_with_knn
+from app.services.responder import generate_response
+from app.utils.boilerplate import remove_boilerplate
+from app.utils.compaction import estimate_tokens, get_input_budget
+from app.utils.email_parser import parse_email
+from app.utils.preprocess import preprocess_text
+from app.utils.text_cache import content_hash
+from app.utils.text_extractor import extract_text_from_email
+from app.utils.thread_stripper import strip_quoted_history
+
+# Status de mensagens concluídas; as demais ("error") são refeitas ao retomar.
+DONE_STATUSES = ("ok", "empty")
+
+RESULT_FIELDS = (
+    "id",
+    "position",
+    "status",
+    "category",
+    "confidence",
+    "reason",
+    "suggested_response",
+    "source",
+    "subject",
+    "sender",
+    "automated",
+    "tokens",
+    "output_tokens",
+    "error",
+)
+
+# Colunas acrescentadas depois da primeira versão da tabela SQLite; saídas
+# antigas ganham a coluna ao serem retomadas.
+_ADDED_SQLITE_COLUMNS = {"output_tokens": "INTEGER"}
+
+
+# --- Leitura das Caixas ---
+
+
+def iter_mailbox(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Gera (posição, bytes) de cada mensagem de um mbox ou Maildir."""
+    if os.path.isdir(path):
+        box = mailbox.Maildir(path, factory=None, create=False)
+    else:
+        box = mailbox.mbox(path, factory=None, create=False)
+    try:
+        for position, key in enumerate(box.iterkeys()):
+            yield position, box.get_bytes(key)
+    finally:
+        box.close()
+
+
+# --- Saída com Checkpoint ---
+
+
+class JsonlResultWriter:
+    """Resultados em JSONL, uma linha por mensagem, gravados imediatamente."""
+
+    def __init__(self, path: str):
+        self.path = path
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                # Uma execução interrompida pode ter deixado uma linha incompleta.
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def done_ids(self) -> Set[str]:
+        status: Dict[str, str] = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and "id" in record:
+                    status[record["id"]] = record.get("status")
+        return {key for key, value in status.items() if value in DONE_STATUSES}
+
+    def write(self, record: Dict) -> None:
+        line = {name: record[name] for name in RESULT_FIELDS if name in record}
+        self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SqliteResultWriter:
+    """Resultados em uma tabela SQLite `results`, um commit por mensagem."""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                id TEXT PRIMARY KEY,
+                position INTEGER,
+                status TEXT,
+                category TEXT,
+                confidence REAL,
+                reason TEXT,
+                suggested_response TEXT,
+                source TEXT,
+                subject TEXT,
+                sender TEXT,
+                automated INTEGER,
+                tokens INTEGER,
+                output_tokens INTEGER,
+                error TEXT
+            )
+            """
+        )
+        columns = {
+            row[1] for row in self._connection.execute("PRAGMA table_info(results)")
+        }
+        for name, column_type in _ADDED_SQLITE_COLUMNS.items():
+            if name not in columns:
+                self._connection.execute(
+                    f"ALTER TABLE results ADD COLUMN {name} {column_type}"
+                )
+        self._connection.commit()
+
+    def done_ids(self) -> Set[str]:
+        placeholders = ",".join("?" for _ in DONE_STATUSES)
+        rows = self._connection.execute(
+            f"SELECT id FROM results WHERE status IN ({placeholders})", DONE_STATUSES
+        )
+        return {row[0] for row in rows}
+
+    def write(self, record: Dict) -> None:
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO results ({', '.join(RESULT_FIELDS)}) "
+            f"VALUES ({', '.join('?' for _ in RESULT_FIELDS)})",
+            [record.get(name) for name in RESULT_FIELDS],
+        )
+        self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def open_result_writer(path: str):
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SqliteResultWriter(path)
+    return JsonlResultWriter(path)
+
+
+# --- Limite de Taxa ---
+
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `rate` por segundo (0 = sem limite)."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+# --- Classificação ---
+
+
+def prepare_message(
+    message_id: str, position: int, data: bytes
+) -> Tuple[Dict, Optional[str]]:
+    """
+    Extrai e pré-processa uma mensagem (sem chamar o modelo).
+
+    Returns:
+        O registro e o texto pré-processado a enviar ao modelo, ou None quando
+        o registro já está concluído (vazio, mensagem automática ou resolvido
+        pelo kNN).
+    """
+    record: Dict = {"id": message_id, "position": position}
+    # O MIME é lido uma única vez: cabeçalhos e texto saem do mesmo ParsedEmail
+    parsed = parse_email(data)
+    record.update(
+        subject=parsed.headers.get("subject"),
+        sender=parsed.headers.get("from"),
+        automated=parsed.is_automated,
+    )
+    raw_content = extract_text_from_email(parsed)
+    if not raw_content.strip():
+        return {**record, "status": "empty"}, None
+
+    raw_content = strip_quoted_history(raw_content).text
+    raw_content = remove_boilerplate(raw_content).text
+    if not raw_content.strip():
+        return {**record, "status": "empty"}, None
+    processed_text = preprocess_text(raw_content, remove_stopwords=True, lemmatize=True)
+    record["text"] = raw_content
+
+    # Como no endpoint, mensagens automáticas ou em massa dispensam o modelo
+    if parsed.is_automated:
+        return _with_result(
+            {**record, "source": "headers"}, classify_automated_email()
+        ), None
+
+    result = try_classify_with_knn(raw_content)
+    if result is not None:
+        return _with_result({**record, "source": "knn"}, result), None
+
+    record["source"] = "model"
+    record["tokens"] = min(
+        estimate_tokens(processed_text), get_input_budget(MODEL_NAME)
+    )
+    return record, processed_text
+
+
+def _with_result(record: Dict, result: Dict) -> Dict:
+    return {
+        **record,
+        "status": "ok",
+        "category": result["category"],
+        "confidence": result["confidence"],
+        "reason": result["reason"],
+    }
+
+
+def _error_record(record: Dict, error: str) -> Dict:
+    return {**record, "status": "error", "error": error}
+
+
+def _classify_with_model(processed_text: str, limiter: RateLimiter) -> Tuple[Dict, int]:
+    """
+    Classifica com o Gemini, respeitando o limite de taxa a cada chamada (um
+    e-mail longo gera uma chamada por trecho).
+
+    Returns:
+        O resultado e os tokens de entrada estimados, somados entre os trechos.
+    """
+    tokens: List[int] = []
+
+    def call_model(text: str) -> Dict:
+        limiter.acquire()
+        tokens.append(min(estimate_tokens(text), get_input_budget(MODEL_NAME)))
+        return classify_email(text)
+
+    if estimate_tokens(processed_text) > CHUNK_TOKENS:
+        result = classify_email_chunked(processed_text, classify=call_model)
+    else:
+        result = call_model(processed_text)
+    return result, sum(tokens)
+
+
+def classify_message(
+    message_id: str,
+    position: int,
+    data: bytes,
+    limiter: RateLimiter,
+    respond: bool = False,
+) -> Dict:
+    """Classifica uma mensagem com o mesmo fluxo do endpoint /api/process-email."""
+    record: Dict = {"id": message_id, "position": position}
+    try:
+        record, processed_text = prepare_message(message_id, position, data)
+        if processed_text is not None:
+            result, tokens = _classify_with_model(processed_text, limiter)
+            record = _with_result({**record, "tokens": tokens}, result)
+
+        if respond and record["status"] == "ok":
+            limiter.acquire()
+            usage: Dict[str, int] = {}
+            record["suggested_response"] = generate_response(
+                record["text"], record["category"], usage=usage
+            )
+            # Templates locais não chamam o modelo e deixam `usage` vazio
+            record["tokens"] = (record.get("tokens") or 0) + usage.get(
+                "input_tokens", 0
+            )
+            record["output_tokens"] = usage.get("output_tokens", 0)
+        return record
+    except Exception as e:
+        return _error_record(record, f"{type(e).__name__}: {e}")
+
+
+def run(
+    source: str,
+    output: str,
+    concurrency: int = 4,
+    rate: float = 0.0,
+    respond: bool = False,
+    limit: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Classifica todas as mensagens de `source`, gravando em `output`.
+
+    Returns:
+        Estatísticas da execução (mensagens processadas, puladas, erros,
+        tempo, e-mails/s e tokens estimados enviados ao modelo).
+    """
+    writer = open_result_writer(output)
+    done = writer.done_ids()
+    limiter = RateLimiter(rate)
+    stats = _new_stats()
+    seen: Set[str] = set()
+    start = time.perf_counter()
+
+    def record_result(future: Future) -> None:
+        record = future.result()
+        writer.write(record)
+        _tally(stats, record)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending: Set[Future] = set()
+            for position, data in iter_mailbox(source):
+                if limit is not None and stats["processed"] + len(pending) >= limit:
+                    break
+                message_id = content_hash(data)
+                if message_id in done or message_id in seen:
+                    stats["skipped"] += 1
+                    continue
+                seen.add(message_id)
+                pending.add(
+                    pool.submit(
+                        classify_message, message_id, position, data, limiter, respond
+                    )
+                )
+                # Limita as mensagens em memória a algumas por thread.
+                if len(pending) >= concurrency * 2:
+                    completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        record_result(future)
+            for future in pending:
+                record_result(future)
+    finally:
+        writer.close()
+
+    return _finish(stats, start)
+
+
+def run_batch(
+    source: str,
+    output: str,
+    backend: BatchPredictionBackend,
+    workdir: str,
+    limit: Optional[int] = None,
+    poll_interval: float = BATCH_POLL_SECONDS,
+) -> Dict[str, float]:
+    """
+    Como `run`, mas envia todos os e-mails pendentes em um único job de batch
+    prediction em vez de uma chamada por e-mail.
+
+    Mensagens vazias ou resolvidas pelo kNN são gravadas na hora; as demais,
+    quando o job termina. Se o job falhar, elas ficam sem registro e são
+    reenviadas na próxima execução.
+    """
+    writer = open_result_writer(output)
+    done = writer.done_ids()
+    stats = _new_stats()
+    seen: Set[str] = set()
+    waiting: Dict[str, Dict] = {}
+    items: List[Tuple[str, str]] = []
+    start = time.perf_counter()
+
+    try:
+        for position, data in iter_mailbox(source):
+            if limit is not None and stats["processed"] + len(waiting) >= limit:
+                break
+            message_id = content_hash(data)
+            if message_id in done or message_id in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(message_id)
+            record: Dict = {"id": message_id, "position": position}
+            try:
+                record, processed_text = prepare_message(message_id, position, data)
+            except Exception as e:
+                record, processed_text = (
+                    _error_record(record, f"{type(e).__name__}: {e}"),
+                    None,
+                )
+            if processed_text is None:
+                writer.write(record)
+                _tally(stats, record)
+            else:
+                waiting[message_id] = record
+                items.append((message_id, processed_text))
+
+        results = run_batch_classification(
+            items, backend, workdir, poll_interval=poll_interval
+        )
+        for message_id, record in waiting.items():
+            result = results.get(message_id, {"error": "Sem resultado."})
+            if "error" in result:
+                record = _error_record(record, result["error"])
+            else:
+                record = _with_result(record, result)
+            writer.write(record)
+            _tally(stats, record)
+    finally:
+        writer.close()
+
+    return _finish(stats, start)
+
+
+def _new_stats() -> Dict[str, float]:
+    return {
+        "processed": 0,
+        "skipped": 0,
+        "errors": 0,
+        "knn": 0,
+        "model": 0,
+        "automated": 0,
+        "tokens": 0,
+        "output_tokens": 0,
+    }
+
+
+def _tally(stats: Dict[str, float], record: Dict) -> None:
+    stats["processed"] += 1
+    stats["errors"] += record["status"] == "error"
+    stats["knn"] += record.get("source") == "knn"
+    stats["model"] += record.get("source") == "model"
+    stats["automated"] += record.get("source") == "headers"
+    stats["tokens"] += record.get("tokens") or 0
+    stats["output_tokens"] += record.get("output_tokens") or 0
+
+
+def _finish(stats: Dict[str, float], start: float) -> Dict[str, float]:
+    elapsed = time.perf_counter() - start
+    stats["elapsed"] = elapsed
+    stats["emails_per_second"] = stats["processed"] / elapsed if elapsed else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Classifica e-mails de um mbox ou Maildir em lote."
+    )
+    parser.add_argument("source", help="Arquivo mbox ou diretório Maildir.")
+    parser.add_argument(
+        "-o", "--output", required=True, help="Saída .jsonl ou .sqlite/.db."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Mensagens em paralelo."
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Máximo de chamadas ao modelo por segundo (0 = sem limite).",
+    )
+    parser.add_argument(
+        "--respond", action="store_true", help="Também gera a resposta sugerida."
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de e-mails.")
+    parser.add_argument(
+        "--batch",
+        choices=("vertex", "local"),
+        default=None,
+        help="Classifica em um único job de batch prediction (Vertex AI ou "
+        "stand-in local, sem GCP).",
+    )
+    parser.add_argument(
+        "--batch-dir",
+        default="batch_jobs",
+        help="Diretório do JSONL de entrada e dos jobs locais.",
+    )
+    args = parser.parse_args(argv)
+    if args.batch and args.respond:
+        parser.error("--respond não está disponível no modo em lote.")
+
+    if args.batch:
+        if args.batch == "vertex":
+            backend = VertexBatchBackend()
+        else:
+            backend = LocalBatchBackend(os.path.join(args.batch_dir, "local"))
+        try:
+            stats = run_batch(
+                args.source, args.output, backend, args.batch_dir, limit=args.limit
+            )
+        except BatchPredictionError as e:
+            print(f"Falha no job em lote: {e}", file=sys.stderr)
+            return 1
+    else:
+        stats = run(
+            args.source,
+            args.output,
+            concurrency=max(1, args.concurrency),
+            rate=args.rate,
+            respond=args.respond,
+            limit=args.limit,
+        )
+    processed = stats["processed"]
+    print(
+        f"{processed} e-mails classificados em {stats['elapsed']:.1f}s "
+        f"({stats['emails_per_second']:.2f} e-mails/s); "
+        f"{stats['skipped']} já concluídos, {stats['errors']} com erro."
+    )
+    model_calls = stats["model"]
+    print(
+        f"Tokens de entrada estimados: {stats['tokens']} "
+        f"({stats['tokens'] / model_calls if model_calls else 0:.0f} por e-mail "
+        f"classificado pelo modelo); de saída (respostas): {stats['output_tokens']}. "
+        f"{stats['knn']} resolvidos pelo kNN e {stats['automated']} pelos "
+        "cabeçalhos, sem chamar o modelo."
+    )
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Minera templates candidatos a partir do log de respostas geradas pelo modelo.
+
+Uso:
+    RESPONSE_LOG_PATH=responses.jsonl uv run uvicorn app.main:app   # coleta
+    uv run python -m app.tools.mine_response_templates responses.jsonl
+
+Os candidatos são impressos em JSON e devem ser revisados antes de serem
+adicionados a `app/prompts/response_templates.json`.
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from app.services.response_templates import load_logged_responses, mine_templates
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Agrupa respostas registradas e sugere templates candidatos."
+    )
+    parser.add_argument("log_path", help="Arquivo JSONL gerado via RESPONSE_LOG_PATH.")
+    parser.add_argument(
+        "--category",
+        default="Improdutivo",
+        help="Categoria das respostas a minerar (padrão: Improdutivo).",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Similaridade mínima (Jaccard) para agrupar respostas.",
+    )
+    parser.add_argument(
+        "--min-size",
+        type=int,
+        default=3,
+        help="Tamanho mínimo de um grupo para gerar um candidato.",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        responses = load_logged_responses(args.log_path, category=args.category)
+        candidates = mine_templates(
+            responses,
+            similarity_threshold=args.threshold,
+            min_cluster_size=args.min_size,
+        )
+    except FileNotFoundError:
+        print(f"Arquivo de log não encontrado: {args.log_path}", file=sys.stderr)
+        return 1
+
+    json.dump(candidates, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
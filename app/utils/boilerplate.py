@@ -0,0 +1,232 @@
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from app.utils.metrics import metrics
+
+# --- Remoção de Boilerplate Aprendida do Corpus ---
+
+# E-mails corporativos terminam com assinaturas e avisos legais idênticos em
+# milhares de mensagens. O índice de boilerplate guarda o hash (64 bits) de
+# linhas e parágrafos normalizados que aparecem com frequência no corpus
+# histórico. Em tempo de execução, uma passada linear descarta os trechos cujo
+# hash está no índice, antes do pré-processamento e das chamadas ao LLM.
+#
+# O arquivo do índice é um array ordenado de uint64 precedido de um cabeçalho
+# fixo. Ele é aberto com mmap (somente leitura), então todos os workers do
+# servidor compartilham as mesmas páginas de memória, e a busca é binária.
+
+INDEX_MAGIC = b"BPIX"
+INDEX_VERSION = 1
+# magic, versão, tamanho mínimo de trecho usado na construção, quantidade de hashes
+_HEADER = struct.Struct("<4sIIQ")
+
+BOILERPLATE_INDEX_PATH = os.getenv("BOILERPLATE_INDEX_PATH")
+
+# Trechos curtos ("Obrigado,", "Att.") são frequentes mas podem carregar
+# significado; apenas segmentos a partir deste tamanho entram no índice.
+DEFAULT_MIN_SEGMENT_CHARS = 25
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_DIGIT_PATTERN = re.compile(r"\d")
+_PARAGRAPH_SPLIT_PATTERN = re.compile(r"\n[ \t]*\n")
+
+
+class InvalidBoilerplateIndexError(ValueError):
+    """Lançado quando o arquivo do índice de boilerplate é inválido."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class BoilerplateResult:
+    """Texto sem boilerplate e estatísticas do que foi removido."""
+
+    text: str
+    removed_segments: int
+    bytes_saved: int
+
+
+# --- Normalização e Hash ---
+
+
+def _normalize_segment(segment: str) -> str:
+    """Normaliza um trecho para que variações triviais gerem o mesmo hash."""
+    normalized = _WHITESPACE_PATTERN.sub(" ", segment).strip().lower()
+    return _DIGIT_PATTERN.sub("0", normalized)
+
+
+def _segment_hash(normalized: str) -> int:
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _iter_segments(text: str, min_chars: int) -> Iterable[str]:
+    """Gera os parágrafos e as linhas de um texto que podem ser boilerplate."""
+    for paragraph in _PARAGRAPH_SPLIT_PATTERN.split(text):
+        normalized = _normalize_segment(paragraph)
+        if len(normalized) >= min_chars:
+            yield normalized
+        lines = paragraph.splitlines()
+        if len(lines) > 1:
+            for line in lines:
+                normalized_line = _normalize_segment(line)
+                if len(normalized_line) >= min_chars:
+                    yield normalized_line
+
+
+# --- Construção do Índice ---
+
+
+def build_boilerplate_hashes(
+    documents: Iterable[str],
+    min_count: int = 20,
+    min_chars: int = DEFAULT_MIN_SEGMENT_CHARS,
+) -> List[int]:
+    """
+    Conta em quantos documentos cada linha/parágrafo normalizado aparece e
+    retorna, ordenados, os hashes que aparecem em pelo menos `min_count` deles.
+    """
+    document_frequency: Counter = Counter()
+    for document in documents:
+        document_frequency.update(
+            {_segment_hash(segment) for segment in _iter_segments(document, min_chars)}
+        )
+    return sorted(h for h, count in document_frequency.items() if count >= min_count)
+
+
+def write_boilerplate_index(
+    hashes: Iterable[int], path: str, min_chars: int = DEFAULT_MIN_SEGMENT_CHARS
+) -> int:
+    """Grava o índice no formato binário compacto. Retorna a quantidade de hashes."""
+    values = array("Q", sorted(set(hashes)))
+    if sys.byteorder != "little":
+        values.byteswap()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, min_chars, len(values)))
+        values.tofile(f)
+    return len(values)
+
+
+# --- Índice em Memória Mapeada ---
+
+
+class BoilerplateIndex:
+    """
+    Conjunto de hashes de boilerplate, somente leitura, com busca binária.
+    """
+
+    def __init__(self, hashes: "array[int] | memoryview", min_chars: int):
+        self._hashes = hashes
+        self.min_chars = min_chars
+        self._mmap: Optional[mmap.mmap] = None
+
+    @classmethod
+    def open(cls, path: str) -> "BoilerplateIndex":
+        """Abre um índice gravado por `write_boilerplate_index` via mmap."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise InvalidBoilerplateIndexError(f"Índice truncado: {path}")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, min_chars, count = _HEADER.unpack_from(mapped, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            mapped.close()
+            raise InvalidBoilerplateIndexError(f"Formato de índice inválido: {path}")
+        if _HEADER.size + count * 8 > size:
+            mapped.close()
+            raise InvalidBoilerplateIndexError(f"Índice truncado: {path}")
+
+        view = memoryview(mapped)[_HEADER.size : _HEADER.size + count * 8]
+        if sys.byteorder == "little":
+            hashes = view.cast("Q")
+        else:
+            # Em máquinas big-endian, uma cópia convertida é inevitável.
+            hashes = array("Q", view.tobytes())
+            hashes.byteswap()
+
+        index = cls(hashes, min_chars)
+        index._mmap = mapped
+        return index
+
+    @classmethod
+    def from_hashes(
+        cls, hashes: Iterable[int], min_chars: int = DEFAULT_MIN_SEGMENT_CHARS
+    ) -> "BoilerplateIndex":
+        """Cria um índice em memória (útil para testes e construção incremental)."""
+        return cls(array("Q", sorted(set(hashes))), min_chars)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, value: int) -> bool:
+        position = bisect_left(self._hashes, value)
+        return position < len(self._hashes) and self._hashes[position] == value
+
+    def contains_segment(self, segment: str) -> bool:
+        normalized = _normalize_segment(segment)
+        return len(normalized) >= self.min_chars and _segment_hash(normalized) in self
+
+
+# --- Remoção em Tempo de Execução ---
+
+
+def remove_boilerplate(
+    text: str, index: Optional[BoilerplateIndex] = None
+) -> BoilerplateResult:
+    """
+    Remove do texto os parágrafos e as linhas presentes no índice de boilerplate.
+
+    Args:
+        text: O texto do e-mail.
+        index: O índice a usar. Se None, usa o índice configurado em
+            BOILERPLATE_INDEX_PATH; sem índice, o texto é retornado intacto.
+
+    Returns:
+        Um BoilerplateResult com o texto limpo e as estatísticas da remoção.
+    """
+    index = index if index is not None else get_default_index()
+    if index is None or not len(index) or not text:
+        return BoilerplateResult(text, 0, 0)
+
+    removed = 0
+    kept_paragraphs: List[str] = []
+    for paragraph in _PARAGRAPH_SPLIT_PATTERN.split(text):
+        if index.contains_segment(paragraph):
+            removed += 1
+            continue
+        lines = paragraph.split("\n")
+        kept_lines = [line for line in lines if not index.contains_segment(line)]
+        removed += len(lines) - len(kept_lines)
+        if any(line.strip() for line in kept_lines):
+            kept_paragraphs.append("\n".join(kept_lines))
+
+    if not removed:
+        return BoilerplateResult(text, 0, 0)
+
+    cleaned = "\n\n".join(kept_paragraphs).strip()
+    bytes_saved = max(0, len(text.encode("utf-8")) - len(cleaned.encode("utf-8")))
+    metrics.increment("boilerplate.segments_removed", removed)
+    metrics.increment("boilerplate.bytes_saved", bytes_saved)
+    return BoilerplateResult(cleaned, removed, bytes_saved)
+
+
+@lru_cache(maxsize=1)
+def get_default_index() -> Optional[BoilerplateIndex]:
+    """
+    Abre (uma vez por processo) o índice configurado em BOILERPLATE_INDEX_PATH.
+    Retorna None se nenhum índice estiver configurado ou o arquivo não existir.
+    """
+    if not BOILERPLATE_INDEX_PATH or not os.path.isfile(BOILERPLATE_INDEX_PATH):
+        return None
+    return BoilerplateIndex.open(BOILERPLATE_INDEX_PATH)
@@ -0,0 +1,258 @@
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from app.utils.metrics import metrics
+from app.utils.preprocess import get_stopwords, tokenize_text
+
+logger = logging.getLogger(__name__)
+
+# --- Estimativa de Tokens ---
+
+# O custo e a latência das chamadas ao Gemini crescem com o número de tokens de
+# entrada. Para decidir localmente (sem chamar a API de contagem) se um texto
+# cabe no orçamento, usamos a heurística de ~4 caracteres por token, que é
+# estável para português e inglês e custa O(1).
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estima o número de tokens de um texto para os modelos Gemini."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# --- Orçamentos por Modelo ---
+
+# Orçamento de tokens para o texto do e-mail (sem contar o prompt). Valores
+# podem ser ajustados por variável de ambiente.
+MODEL_INPUT_BUDGETS: Dict[str, int] = {
+    "gemini-2.5-pro": int(os.getenv("GEMINI_PRO_INPUT_TOKEN_BUDGET", "8000")),
+    "gemini-2.5-flash": int(os.getenv("GEMINI_FLASH_INPUT_TOKEN_BUDGET", "6000")),
+}
+DEFAULT_INPUT_BUDGET = int(os.getenv("DEFAULT_INPUT_TOKEN_BUDGET", "6000"))
+
+GAP_MARKER = "[...]"
+
+# Frações do orçamento reservadas ao início e ao fim do texto. O restante é
+# preenchido com as frases mais salientes do meio.
+HEAD_FRACTION = 0.3
+TAIL_FRACTION = 0.2
+
+# Frases muito longas (ex: texto de PDF sem pontuação) são quebradas em janelas
+# para que a seleção continue granular.
+_MAX_SENTENCE_CHARS = 600
+
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|\n+|$)|[.!?]+|\n+")
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    """Texto compactado e as estatísticas do que foi descartado."""
+
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    dropped_sentences: int
+
+    @property
+    def dropped_tokens(self) -> int:
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+    @property
+    def was_compacted(self) -> bool:
+        return self.dropped_sentences > 0
+
+    def stats(self) -> Dict[str, int]:
+        """Estatísticas da compactação, para registro junto ao resultado."""
+        return {
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "dropped_tokens": self.dropped_tokens,
+            "dropped_sentences": self.dropped_sentences,
+        }
+
+
+def get_input_budget(model_name: str) -> int:
+    """Retorna o orçamento de tokens de entrada configurado para o modelo."""
+    return MODEL_INPUT_BUDGETS.get(model_name, DEFAULT_INPUT_BUDGET)
+
+
+# --- Funções Auxiliares ---
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Divide o texto em frases, preservando a pontuação e as quebras de linha."""
+    sentences = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        sentence = match.group(0)
+        while len(sentence) > _MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(" ", 0, _MAX_SENTENCE_CHARS)
+            if cut <= 0:
+                cut = _MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:]
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _score_sentences(sentences: List[str], lang: str = "pt") -> List[float]:
+    """
+    Pontua a saliência de cada frase com um TF-IDF local: termos raros no
+    documento pesam mais. Números, tokens especiais e perguntas recebem bônus,
+    pois costumam carregar pedidos, valores e prazos.
+    """
+    stopwords = get_stopwords(lang)
+    sentence_tokens = [
+        [token for token in tokenize_text(s.lower()) if token not in stopwords]
+        for s in sentences
+    ]
+
+    sentence_frequency: Counter = Counter()
+    for tokens in sentence_tokens:
+        sentence_frequency.update(set(tokens))
+
+    total = len(sentences)
+    scores = []
+    for sentence, tokens in zip(sentences, sentence_tokens):
+        if not tokens:
+            scores.append(0.0)
+            continue
+        weight = sum(
+            math.log((1 + total) / (1 + sentence_frequency[token]))
+            for token in set(tokens)
+        )
+        bonus = 0.0
+        if "?" in sentence:
+            bonus += 1.0
+        if any(token[0].isdigit() or token.startswith("<") for token in tokens):
+            bonus += 0.5
+        scores.append(weight / math.sqrt(len(tokens)) + bonus)
+    return scores
+
+
+# --- Compactação ---
+
+
+def compact_text(text: str, max_tokens: int, lang: str = "pt") -> CompactionResult:
+    """
+    Reduz o texto ao orçamento de tokens mantendo o início, o fim e as frases
+    mais salientes do meio, na ordem original. Trechos descartados são
+    sinalizados com o marcador "[...]".
+
+    Args:
+        text: O texto a compactar.
+        max_tokens: O orçamento máximo de tokens estimados.
+        lang: O idioma usado para ignorar stopwords na pontuação.
+
+    Returns:
+        Um CompactionResult com o texto e as estatísticas da compactação.
+    """
+    original_tokens = estimate_tokens(text)
+    if original_tokens <= max_tokens:
+        return CompactionResult(text, original_tokens, original_tokens, 0)
+
+    sentences = _split_sentences(text)
+    costs = [estimate_tokens(s) for s in sentences]
+    marker_cost = estimate_tokens(f" {GAP_MARKER} ")
+    # Reserva espaço para até dois marcadores de lacuna ao redor do meio.
+    budget = max(0, max_tokens - 2 * marker_cost)
+
+    selected = [False] * len(sentences)
+    used = 0
+
+    def take(indices, limit: int) -> None:
+        nonlocal used
+        spent = 0
+        for i in indices:
+            if selected[i]:
+                continue
+            if spent + costs[i] > limit or used + costs[i] > budget:
+                break
+            selected[i] = True
+            spent += costs[i]
+            used += costs[i]
+
+    take(range(len(sentences)), int(budget * HEAD_FRACTION))
+    take(reversed(range(len(sentences))), int(budget * TAIL_FRACTION))
+
+    scores = _score_sentences(sentences, lang=lang)
+    ranked: List[Tuple[float, int]] = sorted(
+        ((score, i) for i, score in enumerate(scores) if not selected[i]),
+        key=lambda item: (-item[0], item[1]),
+    )
+    for _, i in ranked:
+        if used + costs[i] + marker_cost <= budget:
+            selected[i] = True
+            used += costs[i] + marker_cost
+
+    parts: List[str] = []
+    in_gap = False
+    for sentence, keep in zip(sentences, selected):
+        if keep:
+            parts.append(sentence)
+            in_gap = False
+        elif not in_gap:
+            parts.append(f" {GAP_MARKER} ")
+            in_gap = True
+
+    compacted = "".join(parts).strip()
+    return CompactionResult(
+        text=compacted,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(compacted),
+        dropped_sentences=selected.count(False),
+    )
+
+
+def split_into_token_chunks(text: str, chunk_tokens: int) -> List[str]:
+    """
+    Divide o texto em trechos de no máximo `chunk_tokens` tokens estimados,
+    cortando preferencialmente em quebras de linha ou espaços.
+    """
+    max_chars = max(1, chunk_tokens * CHARS_PER_TOKEN)
+    chunks: List[str] = []
+    start = 0
+    while start < len(text):
+        end = start + max_chars
+        if end < len(text):
+            cut = text.rfind("\n", start + max_chars // 2, end)
+            if cut == -1:
+                cut = text.rfind(" ", start + max_chars // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end
+    return chunks
+
+
+def compact_for_model(text: str, model_name: str) -> CompactionResult:
+    """
+    Compacta o texto para o orçamento do modelo e registra nas métricas e no
+    log quantos tokens foram descartados.
+    """
+    result = compact_text(text, get_input_budget(model_name))
+
+    metrics.increment("compaction.calls")
+    metrics.increment("compaction.tokens_in", result.original_tokens)
+    if result.was_compacted:
+        metrics.increment("compaction.compacted")
+        metrics.increment("compaction.tokens_dropped", result.dropped_tokens)
+        metrics.increment("compaction.sentences_dropped", result.dropped_sentences)
+        logger.info(
+            "Texto compactado para %s: %d de %d tokens mantidos, %d frases descartadas",
+            model_name,
+            result.compacted_tokens,
+            result.original_tokens,
+            result.dropped_sentences,
+        )
+    return result
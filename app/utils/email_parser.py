@@ -0,0 +1,236 @@
+import os
+from dataclasses import dataclass, field
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser, BytesParser
+from typing import Callable, Dict, Iterator, List, Optional
+
+# --- Leitura de E-mails MIME (.eml) ---
+
+# E-mails reais chegam como MIME: multipart, base64 e quoted-printable, com
+# anexos. O parser da biblioteca padrão monta apenas a árvore de partes; o
+# conteúdo de cada parte só é decodificado quando pedido. Aqui:
+#
+#   - o corpo preferido é text/plain; text/html só é usado na falta dele;
+#   - anexos só são decodificados quando o corpo tem menos de
+#     EML_MIN_BODY_CHARS caracteres, e nunca acima de EML_MAX_ATTACHMENT_BYTES;
+#   - cabeçalhos como Auto-Submitted e List-Unsubscribe ficam disponíveis como
+#     sinais baratos, antes de qualquer chamada ao modelo.
+
+EML_MIN_BODY_CHARS = int(os.getenv("EML_MIN_BODY_CHARS", "40"))
+EML_MAX_ATTACHMENT_BYTES = int(
+    os.getenv("EML_MAX_ATTACHMENT_BYTES", str(5 * 1024 * 1024))
+)
+
+# Cabeçalhos expostos em ParsedEmail.headers (nomes em minúsculas).
+EXPOSED_HEADERS = (
+    "subject",
+    "from",
+    "to",
+    "date",
+    "message-id",
+    "auto-submitted",
+    "list-unsubscribe",
+    "list-id",
+    "precedence",
+    "x-auto-response-suppress",
+)
+
+_BULK_PRECEDENCE = {"bulk", "list", "junk", "auto_reply"}
+
+# Anexos que `extract_text_from_bytes` sabe ler; os demais nem são decodificados.
+_EXTRACTABLE_EXTENSIONS = (".txt", ".pdf", ".eml")
+_EXTRACTABLE_TYPES = ("application/pdf", "message/rfc822")
+
+
+@dataclass(frozen=True)
+class EmailAttachment:
+    """Um anexo, com o conteúdo decodificado apenas sob demanda."""
+
+    filename: Optional[str]
+    content_type: str
+    # Tamanho estimado do conteúdo decodificado, sem decodificá-lo.
+    size: int
+    _part: EmailMessage = field(repr=False, compare=False)
+
+    @property
+    def is_extractable(self) -> bool:
+        return (
+            self.content_type in _EXTRACTABLE_TYPES
+            or self.content_type.startswith("text/")
+            or (self.filename or "").lower().endswith(_EXTRACTABLE_EXTENSIONS)
+        )
+
+    def read(self) -> bytes:
+        """Decodifica (base64/quoted-printable) e retorna o conteúdo."""
+        payload = self._part.get_payload(decode=True)
+        return payload or b""
+
+
+@dataclass(frozen=True)
+class ParsedEmail:
+    """Resultado de `parse_email`: cabeçalhos, corpo escolhido e anexos."""
+
+    headers: Dict[str, str]
+    body: str
+    body_type: str  # "plain", "html" ou "" (sem corpo de texto)
+    attachments: List[EmailAttachment]
+
+    @property
+    def is_automated(self) -> bool:
+        """Ver `is_automated_message`."""
+        return is_automated_message(self.headers)
+
+
+def is_automated_message(headers: Dict[str, str]) -> bool:
+    """
+    True para mensagens automáticas ou em massa (respostas automáticas,
+    newsletters, listas), segundo Auto-Submitted, List-Unsubscribe, List-Id e
+    Precedence. `headers` usa os nomes em minúsculas de EXPOSED_HEADERS.
+    """
+    auto_submitted = headers.get("auto-submitted", "").lower()
+    precedence = headers.get("precedence", "").lower()
+    return (
+        bool(auto_submitted and auto_submitted != "no")
+        or "list-unsubscribe" in headers
+        or "list-id" in headers
+        or precedence in _BULK_PRECEDENCE
+    )
+
+
+def _exposed_headers(message: EmailMessage) -> Dict[str, str]:
+    return {
+        name: str(message[name])
+        for name in EXPOSED_HEADERS
+        if message[name] is not None
+    }
+
+
+def parse_email_headers(data: bytes) -> Dict[str, str]:
+    """
+    Lê apenas os cabeçalhos de uma mensagem MIME, sem montar a árvore de
+    partes: basta para `is_automated_message` antes de extrair o texto.
+    """
+    message = BytesHeaderParser(policy=policy.default).parsebytes(data)
+    return _exposed_headers(message)
+
+
+def _estimated_size(part: EmailMessage) -> int:
+    raw = part.get_payload()
+    if not isinstance(raw, str):
+        return 0
+    if part.get("content-transfer-encoding", "").lower() == "base64":
+        return len(raw) * 3 // 4
+    return len(raw)
+
+
+def _iter_leaf_parts(message: EmailMessage) -> Iterator[EmailMessage]:
+    for part in message.walk():
+        if not part.is_multipart():
+            yield part
+
+
+def _part_text(part: EmailMessage) -> str:
+    try:
+        return part.get_content()
+    except (LookupError, UnicodeDecodeError, ValueError):
+        # Charset desconhecido ou inválido: decodifica os bytes como UTF-8.
+        payload = part.get_payload(decode=True) or b""
+        return payload.decode("utf-8", errors="replace")
+
+
+def parse_email(data: bytes) -> ParsedEmail:
+    """
+    Lê uma mensagem MIME (conteúdo de um arquivo .eml).
+
+    Args:
+        data: Os bytes da mensagem, cabeçalhos incluídos.
+
+    Returns:
+        Um ParsedEmail. O corpo é o primeiro text/plain que não seja anexo
+        (ou, na falta dele, o primeiro text/html, ainda com marcação).
+    """
+    message = BytesParser(policy=policy.default).parsebytes(data)
+    headers = _exposed_headers(message)
+
+    body_part = message.get_body(preferencelist=("plain", "html"))
+    attachments = []
+    for part in _iter_leaf_parts(message):
+        if part is body_part:
+            continue
+        if part.get_content_disposition() == "attachment" or part.get_filename():
+            attachments.append(
+                EmailAttachment(
+                    filename=part.get_filename(),
+                    content_type=part.get_content_type(),
+                    size=_estimated_size(part),
+                    _part=part,
+                )
+            )
+
+    if body_part is None:
+        return ParsedEmail(headers, "", "", attachments)
+    return ParsedEmail(
+        headers, _part_text(body_part), body_part.get_content_subtype(), attachments
+    )
+
+
+def email_to_text(
+    data: bytes,
+    extract_attachment: Callable[[bytes, Optional[str], str], str],
+    clean_html: Callable[[str], str],
+    min_body_chars: int = EML_MIN_BODY_CHARS,
+    max_attachment_bytes: int = EML_MAX_ATTACHMENT_BYTES,
+) -> str:
+    """
+    Converte uma mensagem .eml em texto para classificação.
+
+    Args:
+        data: Os bytes da mensagem.
+        extract_attachment: Extrai o texto de um anexo (bytes, nome, MIME type).
+        clean_html: Converte o corpo em texto (remove a marcação HTML).
+        min_body_chars: Abaixo disso, o texto dos anexos é acrescentado.
+        max_attachment_bytes: Anexos maiores nunca são decodificados.
+
+    Returns:
+        O assunto e o corpo, seguidos do texto dos anexos quando necessário.
+    """
+    return parsed_email_to_text(
+        parse_email(data),
+        extract_attachment,
+        clean_html,
+        min_body_chars=min_body_chars,
+        max_attachment_bytes=max_attachment_bytes,
+    )
+
+
+def parsed_email_to_text(
+    parsed: ParsedEmail,
+    extract_attachment: Callable[[bytes, Optional[str], str], str],
+    clean_html: Callable[[str], str],
+    min_body_chars: int = EML_MIN_BODY_CHARS,
+    max_attachment_bytes: int = EML_MAX_ATTACHMENT_BYTES,
+) -> str:
+    """
+    Como `email_to_text`, para uma mensagem já lida com `parse_email` (evita
+    ler o MIME duas vezes quando os cabeçalhos também são usados).
+    """
+    body = clean_html(parsed.body) if parsed.body.strip() else ""
+    parts = [body] if body else []
+
+    if len(body) < min_body_chars:
+        for attachment in parsed.attachments:
+            if not attachment.is_extractable or attachment.size > max_attachment_bytes:
+                continue
+            text = extract_attachment(
+                attachment.read(), attachment.filename, attachment.content_type
+            )
+            if text:
+                parts.append(text)
+            if sum(len(part) for part in parts) >= min_body_chars:
+                break
+
+    subject = parsed.headers.get("subject", "").strip()
+    if subject and parts:
+        parts.insert(0, f"Assunto: {subject}")
+    return "\n\n".join(parts)
@@ -0,0 +1,418 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Set
+
+from app.utils.metrics import metrics
+from app.utils.text_cache import get_default_text_cache
+from app.utils.text_extractor import (
+    PDF_PARALLEL_MIN_PAGES,
+    count_pdf_pages,
+    detect_upload_kind,
+    extract_text_from_bytes,
+    text_cache_key,
+)
+
+try:
+    import resource
+except ImportError:  # Windows: sem limites de memória por processo
+    resource = None
+
+# --- Executor de Extração ---
+
+# O pdfminer é Python puro e intensivo em CPU: rodar a extração dentro do
+# handler assíncrono trava o event loop e, com ele, todas as outras requisições
+# do worker. O executor mantém um pool de processos pré-aquecidos (pdfminer já
+# importado) alimentado por uma fila. Cada processo tem:
+#
+#   - limite de memória (RLIMIT_AS), para que um PDF patológico falhe com
+#     MemoryError em vez de derrubar o container;
+#   - qualquer exceção da tarefa chega ao chamador como ExtractionError (a
+#     original fica em __cause__) e o processo é descartado, pois um
+#     MemoryError pode deixá-lo em estado inconsistente;
+#   - tempo máximo por tarefa: ao estourar, o processo é morto e substituído;
+#   - reciclagem após N tarefas, devolvendo a memória fragmentada ao sistema.
+#
+# Diferente do ProcessPoolExecutor, um processo travado pode ser morto sem
+# invalidar o pool inteiro. A profundidade da fila é publicada na métrica
+# "extraction.queue_depth".
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "30"))
+EXTRACTION_MAX_JOBS_PER_WORKER = int(os.getenv("EXTRACTION_MAX_JOBS_PER_WORKER", "100"))
+EXTRACTION_MEMORY_LIMIT_MB = int(os.getenv("EXTRACTION_MEMORY_LIMIT_MB", "1024"))
+
+# Tempo máximo para um processo novo ficar pronto (importações incluídas).
+WORKER_STARTUP_TIMEOUT_SECONDS = 60.0
+_POLL_INTERVAL_SECONDS = 0.1
+
+
+class ExtractionError(ValueError):
+    """Lançado quando o processo de extração falha sem produzir resultado."""
+
+    pass
+
+
+class ExtractionTimeoutError(ExtractionError):
+    """Lançado quando uma tarefa excede o tempo limite e o processo é morto."""
+
+    pass
+
+
+def _worker_main(conn, memory_limit_bytes: Optional[int]) -> None:
+    """Laço principal de um processo do pool: recebe (função, args) e responde."""
+    if memory_limit_bytes and resource is not None:
+        try:
+            resource.setrlimit(
+                resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes)
+            )
+        except (ValueError, OSError):
+            pass
+    conn.send("ready")
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        func, args = message
+        try:
+            conn.send((True, func(*args)))
+        except BaseException as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # Exceções que não podem ser serializadas viram ExtractionError.
+                conn.send((False, ExtractionError(repr(e))))
+
+
+class _WorkerProcess:
+    """Um processo do pool e a ponta do pipe usada para falar com ele."""
+
+    def __init__(self, context, memory_limit_bytes: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_bytes),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def wait_ready(self, timeout: float, cancelled: Callable[[], bool]) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not cancelled():
+            if self.conn.poll(_POLL_INTERVAL_SECONDS):
+                try:
+                    return self.conn.recv() == "ready"
+                except (EOFError, OSError):
+                    return False
+        return False
+
+    def run(self, func: Callable, args: tuple, timeout: float) -> Any:
+        self.conn.send((func, args))
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise ExtractionTimeoutError(
+                f"A extração excedeu o tempo limite de {timeout:.0f}s."
+            )
+        try:
+            ok, value = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise ExtractionError("O processo de extração terminou inesperadamente.")
+        self.jobs += 1
+        if ok:
+            return value
+        if isinstance(value, ExtractionError):
+            raise value
+        raise ExtractionError(f"A extração falhou: {value!r}") from value
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionExecutor:
+    """
+    Pool de processos para extração de texto fora do event loop.
+
+    Args:
+        workers: Número de processos.
+        timeout: Tempo máximo (s) de cada tarefa.
+        max_jobs_per_worker: Tarefas antes de reciclar o processo.
+        memory_limit_mb: Limite de memória virtual de cada processo (0 = sem
+            limite).
+    """
+
+    def __init__(
+        self,
+        workers: int = EXTRACTION_WORKERS,
+        timeout: float = EXTRACTION_TIMEOUT_SECONDS,
+        max_jobs_per_worker: int = EXTRACTION_MAX_JOBS_PER_WORKER,
+        memory_limit_mb: int = EXTRACTION_MEMORY_LIMIT_MB,
+    ):
+        if workers < 1:
+            raise ValueError("O executor precisa de ao menos um processo.")
+        self.workers = workers
+        self.timeout = timeout
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self._memory_limit_bytes = memory_limit_mb * 1024 * 1024 or None
+        self._context = multiprocessing.get_context("spawn")
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: list = []
+        self._live: Set[_WorkerProcess] = set()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    # --- Ciclo de Vida ---
+
+    def start(self) -> "ExtractionExecutor":
+        """Inicia os processos em segundo plano (sem esperar o aquecimento)."""
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run_slot, name=f"extraction-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def shutdown(self) -> None:
+        """Cancela as tarefas na fila, espera as em andamento e encerra o pool."""
+        self._shutdown = True
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=self.timeout + 5)
+        with self._lock:
+            for worker in list(self._live):
+                worker.kill()
+            self._live.clear()
+        self._threads.clear()
+        self._update_queue_depth()
+
+    def __enter__(self) -> "ExtractionExecutor":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    # --- Submissão ---
+
+    @property
+    def queue_depth(self) -> int:
+        """Número de tarefas aguardando um processo livre."""
+        return self._queue.qsize()
+
+    def submit(self, func: Callable, *args) -> Future:
+        """Agenda `func(*args)` em um processo. `func` precisa ser serializável."""
+        if self._shutdown:
+            raise RuntimeError("O executor de extração foi encerrado.")
+        future: Future = Future()
+        self._queue.put((future, func, args))
+        self._update_queue_depth()
+        return future
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Versão assíncrona de `submit`: aguarda o resultado sem bloquear o loop."""
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    # --- Processos ---
+
+    def _update_queue_depth(self) -> None:
+        metrics.set("extraction.queue_depth", self._queue.qsize())
+
+    def _spawn(self) -> Optional[_WorkerProcess]:
+        try:
+            worker = _WorkerProcess(self._context, self._memory_limit_bytes)
+        except Exception:
+            metrics.increment("extraction.worker_failures")
+            return None
+        with self._lock:
+            self._live.add(worker)
+        if worker.wait_ready(WORKER_STARTUP_TIMEOUT_SECONDS, lambda: self._shutdown):
+            return worker
+        self._discard(worker)
+        if not self._shutdown:
+            metrics.increment("extraction.worker_failures")
+        return None
+
+    def _discard(self, worker: _WorkerProcess) -> None:
+        worker.kill()
+        with self._lock:
+            self._live.discard(worker)
+
+    def _run_slot(self) -> None:
+        worker: Optional[_WorkerProcess] = None
+        while True:
+            # Pré-aquecimento: o processo fica pronto antes de a tarefa chegar.
+            while worker is None and not self._shutdown:
+                worker = self._spawn()
+                if worker is None and not self._shutdown:
+                    time.sleep(1)
+
+            job = self._queue.get()
+            if job is None:
+                break
+            self._update_queue_depth()
+            future, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if worker is None:
+                future.set_exception(ExtractionError("O executor foi encerrado."))
+                continue
+
+            try:
+                result = worker.run(func, args, self.timeout)
+            except ExtractionError as e:
+                metrics.increment(
+                    "extraction.timeouts"
+                    if isinstance(e, ExtractionTimeoutError)
+                    else "extraction.worker_failures"
+                )
+                future.set_exception(e)
+                self._discard(worker)
+                worker = None
+                continue
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            metrics.increment("extraction.jobs")
+
+            if worker.jobs >= self.max_jobs_per_worker:
+                metrics.increment("extraction.recycled")
+                worker.stop()
+                with self._lock:
+                    self._live.discard(worker)
+                worker = None
+
+        if worker is not None:
+            worker.stop()
+            with self._lock:
+                self._live.discard(worker)
+
+
+# --- Instância da Aplicação ---
+
+# Iniciada e encerrada pelo lifespan da aplicação FastAPI. Sem executor (ex:
+# EXTRACTION_WORKERS=0, scripts e testes), a extração roda em uma thread.
+
+_executor: Optional[ExtractionExecutor] = None
+
+
+def start_extraction_executor(
+    workers: int = EXTRACTION_WORKERS,
+) -> Optional[ExtractionExecutor]:
+    global _executor
+    if _executor is None and workers > 0:
+        _executor = ExtractionExecutor(workers=workers).start()
+    return _executor
+
+
+def shutdown_extraction_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def get_extraction_executor() -> Optional[ExtractionExecutor]:
+    return _executor
+
+
+def _count_pdf_pages_or_zero(data: bytes) -> int:
+    """Conta as páginas no processo do pool; PDF inválido conta como zero."""
+    try:
+        return count_pdf_pages(data)
+    except MemoryError:
+        raise
+    except Exception:
+        # PDF inválido: a extração normal retorna string vazia, sem que o
+        # processo precise ser descartado
+        return 0
+
+
+async def _is_long_pdf(
+    executor: ExtractionExecutor,
+    data: bytes,
+    filename: Optional[str],
+    mime_type: Optional[str],
+) -> bool:
+    if detect_upload_kind(data, filename, mime_type) != "pdf":
+        return False
+    # Contar páginas já interpreta o PDF: fica no pool, com seus limites
+    page_count = await executor.run(_count_pdf_pages_or_zero, bytes(data))
+    return page_count > PDF_PARALLEL_MIN_PAGES
+
+
+async def extract_text_from_upload(
+    data: bytes,
+    filename: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    sha256: Optional[str] = None,
+) -> str:
+    """
+    Executa `extract_text_from_bytes` fora do event loop.
+
+    O cache de texto extraído é consultado antes, no próprio processo: arquivos
+    repetidos não chegam ao pool. Usa o pool de processos quando ele está
+    ativo; PDFs com mais de PDF_PARALLEL_MIN_PAGES páginas são divididos em
+    faixas de páginas extraídas em paralelo pelos processos do pool. Se a
+    extração estourar o tempo, a memória ou derrubar o processo, retorna
+    string vazia, como para qualquer arquivo ilegível, e o processo afetado é
+    substituído.
+    """
+    executor = get_extraction_executor()
+    if executor is None:
+        return await asyncio.to_thread(
+            extract_text_from_bytes, data, filename, mime_type, sha256
+        )
+
+    key = text_cache_key(data, filename, mime_type, sha256)
+    if key is None:
+        return ""
+    cache = get_default_text_cache()
+    text = cache.get(key)
+    if text is not None:
+        return text
+    try:
+        if await _is_long_pdf(executor, data, filename, mime_type):
+            # A thread só coordena: as faixas de páginas rodam no pool, e o
+            # cache é gravado pela própria extração
+            return await asyncio.to_thread(
+                extract_text_from_bytes, data, filename, mime_type, sha256, executor
+            )
+        text = await executor.run(
+            extract_text_from_bytes, data, filename, mime_type, sha256
+        )
+    except ExtractionError:
+        return ""
+    if text:
+        # O processo do pool já gravou a entrada no nível em disco.
+        cache.put(key, text, persist=False)
+    return text
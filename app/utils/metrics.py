@@ -0,0 +1,49 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+# --- Métricas em Memória ---
+
+# Contadores simples, por processo, para acompanhar economia de tokens, taxas de
+# acerto de cache etc. sem depender de um backend de observabilidade. Os nomes
+# seguem o padrão "<componente>.<métrica>" (ex: "compaction.tokens_dropped").
+
+
+class MetricsRegistry:
+    """
+    Registro thread-safe de contadores numéricos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Soma `value` ao contador `name`."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        """Define o valor atual de um medidor (ex: profundidade de fila)."""
+        with self._lock:
+            self._counters[name] = value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def snapshot(self, prefix: Optional[str] = None) -> Dict[str, float]:
+        """Retorna uma cópia dos contadores, opcionalmente filtrados por prefixo."""
+        with self._lock:
+            return {
+                name: value
+                for name, value in sorted(self._counters.items())
+                if prefix is None or name.startswith(prefix)
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = MetricsRegistry()
@@ -1,5 +1,27 @@
+import codecs
+import os
 import re
-from typing import Optional, Callable, List, Dict, Set, Union, overload, Literal
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from functools import lru_cache
+from typing import (
+    Optional,
+    Callable,
+    List,
+    Deque,
+    Dict,
+    FrozenSet,
+    IO,
+    Iterable,
+    Iterator,
+    Set,
+    Tuple,
+    Union,
+    overload,
+    Literal,
+)
 
 # --- Stopwords (Extensível para múltiplos idiomas) ---
 
@@ -234,6 +256,16 @@ _STOPWORD_LISTS: Dict[str, Set[str]] = {
     "pt": _STOPWORDS_PT,
 }
 
+
+@lru_cache(maxsize=None)
+def get_stopwords(lang: str = "pt") -> FrozenSet[str]:
+    """
+    Retorna as stopwords do idioma (conjunto vazio se o idioma não tiver
+    lista). O conjunto é imutável e compartilhado entre as chamadas.
+    """
+    return frozenset(_STOPWORD_LISTS.get(lang, ()))
+
+
 # --- Lematização Heurística Simplificada ---
 
 # A lematização foi preferida ao stemming por ser uma abordagem menos destrutiva.
@@ -246,31 +278,116 @@ _STOPWORD_LISTS: Dict[str, Set[str]] = {
 # Foi projetada para ser simples, previsível e extensível.
 
 
-def _lemmatize_token_pt(token: str) -> str:
-    """
-    Aplica regras simples e heurísticas de lematização para um token em português.
-    A ordem é importante: regras mais específicas devem vir antes.
+# --- Motor de Lematização por Trie de Sufixos ---
+
+# As regras de sufixo e o dicionário de exceções são compilados em uma trie de
+# sufixos invertidos: a busca percorre o token do fim para o começo uma única
+# vez, independentemente da quantidade de regras. Como a frequência dos tokens
+# em linguagem natural é muito concentrada, o resultado de cada token é
+# memorizado em um cache limitado (LRU) por processo.
+
+SuffixRule = Tuple[str, str, int]  # (sufixo, substituição, tamanho mínimo do token)
+
+_PT_SUFFIX_RULES: List[SuffixRule] = [
+    ("ães", "ão", 3),  # pães -> pão
+    ("es", "", 4),  # autores -> autor, flores -> flor
+    ("s", "", 4),  # carros -> carro
+]
+
+# Palavras invariáveis no plural, que as regras de sufixo estragariam
+# ("status" viraria "statu", "ônibus" viraria "ônibu"). A tabela muda de
+# propósito a saída do lematizador para essas palavras.
+_PT_LEMMA_EXCEPTIONS: Dict[str, str] = {
+    word: word
+    for word in ("lápis", "ônibus", "vírus", "bônus", "status", "tênis", "óculos")
+}
+
+DEFAULT_LEMMA_CACHE_SIZE = 65536
+
+
+class _SuffixTrieNode:
+    __slots__ = ("children", "rule")
+
+    def __init__(self):
+        self.children: Dict[str, "_SuffixTrieNode"] = {}
+        self.rule: Optional[SuffixRule] = None
+
+
+class SuffixRuleLemmatizer:
     """
-    # Regra para plurais em '-es' (ex: autores -> autor, flores -> flor).
-    # É mais específica que a regra do '-s', por isso vem primeiro.
-    if token.endswith("ães"):
-        return token[:-3] + "ão"
-    if len(token) >= 4 and token.endswith("es"):
-        return token[:-2]
+    Lematizador baseado em regras de sufixo compiladas em uma trie invertida.
 
-    # Regra para plurais simples terminados em 's' (ex: carros -> carro, testes -> teste).
-    if len(token) > 3 and token.endswith("s") and not token.endswith("es"):
-        return token[:-1]
+    Apenas a regra de sufixo mais longo que casa com o token é considerada; se
+    o token for menor que o tamanho mínimo dela, ele é mantido (ex: "mes" não
+    cai na regra do "-es").
+    """
 
-    # Nenhuma regra correspondeu, retorna o token original.
-    return token
+    def __init__(
+        self,
+        rules: List[SuffixRule],
+        exceptions: Optional[Dict[str, str]] = None,
+        cache_size: int = DEFAULT_LEMMA_CACHE_SIZE,
+    ):
+        self.rules = list(rules)
+        self.exceptions = dict(exceptions or {})
+        self.cache_size = cache_size
+        self._root = _SuffixTrieNode()
+        for rule in self.rules:
+            node = self._root
+            for char in reversed(rule[0]):
+                node = node.children.setdefault(char, _SuffixTrieNode())
+            node.rule = rule
+        self._cached_lemmatize = lru_cache(maxsize=cache_size)(self._lemmatize)
+
+    def __reduce__(self):
+        # O cache não é serializável; cada processo reconstrói o seu.
+        return (type(self), (self.rules, self.exceptions, self.cache_size))
+
+    def _lemmatize(self, token: str) -> str:
+        exception = self.exceptions.get(token)
+        if exception is not None:
+            return exception
+
+        node = self._root
+        rule = None
+        for char in reversed(token):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.rule is not None:
+                rule = node.rule
+
+        if rule is None or len(token) < rule[2]:
+            return token
+        suffix, replacement, _ = rule
+        return token[: len(token) - len(suffix)] + replacement
+
+    def __call__(self, token: str) -> str:
+        return self._cached_lemmatize(token)
+
+    def stats(self) -> Dict[str, float]:
+        """Estatísticas do cache: acertos, falhas, taxa de acerto e tamanho."""
+        info = self._cached_lemmatize.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+            "size": info.currsize,
+        }
+
+    def clear_cache(self) -> None:
+        self._cached_lemmatize.cache_clear()
 
 
 _LEMMATIZER_FUNCTIONS: Dict[str, Callable[[str], str]] = {
-    "pt": _lemmatize_token_pt,
+    "pt": SuffixRuleLemmatizer(_PT_SUFFIX_RULES, _PT_LEMMA_EXCEPTIONS),
 }
 
 
+_WORD_PUNCTUATION_PATTERN = re.compile(r"^(\w+)([\W_]*)$")
+
+
 def _lemmatize_text(text: str, lang: str = "pt") -> str:
     """
     Aplica a lematização em todo o texto, token por token, usando a função
@@ -284,7 +401,7 @@ def _lemmatize_text(text: str, lang: str = "pt") -> str:
     lemmatized_words = []
     for word in words:
         # Isola a palavra da pontuação final usando regex
-        match = re.match(r"^(\w+)([\W_]*)$", word)
+        match = _WORD_PUNCTUATION_PATTERN.match(word)
         if match:
             token, punctuation = match.groups()
             lemmatized_token = lemmatizer(token)
@@ -304,16 +421,82 @@ def _lemmatize_text(text: str, lang: str = "pt") -> str:
 # melhorando a precisão da classificação.
 
 
+# Regex para encontrar números, incluindo aqueles com separadores de milhar ([.,])
+# e parte decimal. Usa limites de palavra (\b) para evitar substituição dentro de outras palavras.
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:[.,]\d+)*\b")
+
+
 def _normalize_numbers(text: str) -> str:
     """
     Substitui vários formatos de números por um token semântico <NUM>.
     Exemplos: 10, 10.5, 1.000, 1,000.50 são convertidos para <NUM>.
     Projetado para ser extensível para outras entidades (moeda, data).
     """
-    # Regex para encontrar números, incluindo aqueles com separadores de milhar ([.,])
-    # e parte decimal. Usa limites de palavra (\b) para evitar substituição dentro de outras palavras.
-    number_pattern = r"\b\d+(?:[.,]\d+)*\b"
-    return re.sub(number_pattern, "<NUM>", text)
+    return _NUMBER_PATTERN.sub("<NUM>", text)
+
+
+# Normalizador de entidades: uma única alternação compilada reconhece, em uma
+# passada, valores monetários, datas, percentuais, documentos (CPF, CNPJ e
+# linhas digitáveis de boleto) e, por último, números avulsos. A ordem das
+# alternativas define a prioridade: padrões mais específicos vêm primeiro.
+_ENTITY_PATTERN = re.compile(
+    r"""
+    (?P<DOC>
+        (?<![\w.])
+        (?:
+            \d{5}\.\d{5}\s\d{5}\.\d{6}\s\d{5}\.\d{6}\s\d\s\d{14}  # boleto bancário
+          | (?:\d{11}-?\d\s?){3}\d{11}-?\d  # boleto de arrecadação
+          | \d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}  # CNPJ
+          | \d{3}\.\d{3}\.\d{3}-\d{2}  # CPF
+          | \d{44,48} | \d{14}  # código de barras / CNPJ sem formatação
+        )
+        (?![\w/])
+    )
+  | (?P<DATA>
+        (?<![\w./-])
+        (?:
+            \d{4}-\d{2}-\d{2}
+          | (?:0?[1-9]|[12]\d|3[01])
+            (?:
+                /(?:0?[1-9]|1[0-2])(?:/(?:\d{4}|\d{2}))?
+              | (?P<sep>[.-])(?:0?[1-9]|1[0-2])(?P=sep)(?:\d{4}|\d{2})
+            )
+        )
+        (?![\w/-]|\.\d)
+    )
+  | (?P<MOEDA>
+        (?<!\w)(?:R\$|US\$|U\$|\$|€)\s?\d+(?:[.,]\d+)*(?!\w)
+    )
+  | (?P<PCT>
+        (?<!\w)\d+(?:[.,]\d+)*\s?%
+    )
+  | (?P<NUM>
+        \b\d+(?:[.,]\d+)*\b
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_ENTITY_TOKENS = {
+    "DOC": "<DOC>",
+    "DATA": "<DATA>",
+    "MOEDA": "<MOEDA>",
+    "PCT": "<PCT>",
+    "NUM": "<NUM>",
+}
+
+
+def _entity_token(match: "re.Match[str]") -> str:
+    return _ENTITY_TOKENS[match.lastgroup]
+
+
+def _normalize_entities(text: str) -> str:
+    """
+    Substitui entidades por tokens semânticos em uma única passada.
+    Exemplos: "R$ 1.234,56" -> <MOEDA>, "15/03/2026" -> <DATA>, "12%" -> <PCT>,
+    "123.456.789-09" -> <DOC>; demais números viram <NUM>.
+    """
+    return _ENTITY_PATTERN.sub(_entity_token, text)
 
 
 # --- Tokenização ---
@@ -340,21 +523,25 @@ def tokenize_text(text: str) -> List[str]:
 ProcessingStep = Callable[[str], str]
 
 
-def _to_lowercase(text: str) -> str:
-    special_tokens = re.findall(r"<[^>]+>\%?", text)
-    placeholders = [f"__PLACEHOLDER_{i}__" for i, _ in enumerate(special_tokens)]
-
-    temp_text = text
-    for token, placeholder in zip(special_tokens, placeholders):
-        temp_text = temp_text.replace(token, placeholder, 1)
-
-    temp_text_lowercased = temp_text.lower()
+_SPECIAL_TOKEN_PATTERN = re.compile(r"<[^>]+>\%?")
 
-    final_text = temp_text_lowercased
-    for token, placeholder in zip(special_tokens, placeholders):
-        final_text = final_text.replace(placeholder.lower(), token, 1)
 
-    return final_text
+def _to_lowercase(text: str) -> str:
+    """
+    Converte o texto para minúsculas preservando tokens especiais (ex: <NUM>).
+    Uma única varredura: apenas os trechos entre os tokens são convertidos.
+    """
+    pieces = []
+    position = 0
+    for match in _SPECIAL_TOKEN_PATTERN.finditer(text):
+        start, end = match.span()
+        pieces.append(text[position:start].lower())
+        pieces.append(text[start:end])
+        position = end
+    if not pieces:
+        return text.lower()
+    pieces.append(text[position:].lower())
+    return "".join(pieces)
 
 
 def _remove_control_characters(text: str) -> str:
@@ -372,6 +559,424 @@ def _remove_stopwords(text: str, stopwords: Set[str]) -> str:
     return " ".join(filtered_words)
 
 
+# --- Pipeline Compilado ---
+
+# O `process` executa cada etapa como uma passada separada sobre o texto. Para
+# lotes grandes, `TextPreprocessor.compile` monta, uma única vez por combinação
+# de opções, um pipeline com padrões pré-compilados, tabela de `str.translate`
+# para os caracteres de controle e uma única varredura das palavras que aplica
+# remoção de stopwords e lematização juntas. Etapas desativadas nem entram na
+# lista de execução. O resultado é idêntico ao de `process`.
+
+_CONTROL_CHARACTERS_TABLE = dict.fromkeys(
+    [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F]
+)
+_WHITESPACE_RUN_PATTERN = re.compile(r"[ \t]+")
+_TOKEN_PATTERN = re.compile(r"<[^>]+>\%?|\d+(?:[.,]\d+)*|\w+")
+
+_DEFAULT_BASE_STEPS: List[ProcessingStep] = [
+    _remove_control_characters,
+    _normalize_whitespace,
+]
+
+
+def _clean_characters(text: str) -> str:
+    """Remoção de caracteres de controle e normalização de espaços, fundidas."""
+    return _WHITESPACE_RUN_PATTERN.sub(
+        " ", text.translate(_CONTROL_CHARACTERS_TABLE)
+    ).strip()
+
+
+class CompiledPipeline:
+    """
+    Pipeline de pré-processamento pré-montado para um conjunto fixo de opções.
+    Chamável como uma função: `pipeline(texto)`.
+    """
+
+    def __init__(
+        self,
+        base_steps: List[ProcessingStep],
+        lowercase: bool,
+        normalize_numbers: bool,
+        stopwords: Optional[Set[str]],
+        lemmatizer: Optional[Callable[[str], str]],
+        tokenize: bool,
+        normalize_entities: bool = False,
+    ):
+        character_steps: List[ProcessingStep] = []
+        if lowercase:
+            character_steps.append(_to_lowercase)
+        self._streamable = base_steps == _DEFAULT_BASE_STEPS
+        if self._streamable:
+            character_steps.append(_clean_characters)
+        else:
+            character_steps.extend(base_steps)
+
+        word_steps: List[ProcessingStep] = []
+        if normalize_entities:
+            word_steps.append(_normalize_entities)
+        elif normalize_numbers:
+            word_steps.append(self._normalize_numbers)
+        if stopwords or lemmatizer:
+            word_steps.append(self._process_words)
+
+        self._lowercase = lowercase
+        self._normalize_entities = normalize_entities
+        self._word_steps = word_steps
+        self._steps = character_steps + word_steps
+        self._stopwords = stopwords or None
+        self._lemmatizer = lemmatizer
+        self._tokenize = tokenize
+
+    @staticmethod
+    def _normalize_numbers(text: str) -> str:
+        return _NUMBER_PATTERN.sub("<NUM>", text)
+
+    def _process_words(self, text: str) -> str:
+        """
+        Remove stopwords e lematiza em uma única varredura das palavras. O
+        resultado de cada palavra distinta é calculado uma vez por chamada.
+        """
+        stopwords = self._stopwords
+        lemmatizer = self._lemmatizer
+        match_word = _WORD_PUNCTUATION_PATTERN.match
+        seen: Dict[str, Optional[str]] = {}
+        words = []
+        for word in text.split(" "):
+            if word in seen:
+                result = seen[word]
+            else:
+                result = word
+                if stopwords is not None and word in stopwords:
+                    result = None
+                elif lemmatizer is not None:
+                    # `\w` equivale a `str.isalnum` mais o sublinhado.
+                    if word.isalnum():
+                        result = lemmatizer(word)
+                    else:
+                        match = match_word(word)
+                        if match:
+                            result = lemmatizer(match.group(1)) + match.group(2)
+                seen[word] = result
+            if result is not None:
+                words.append(result)
+        return " ".join(words)
+
+    def __call__(self, text: str) -> Union[str, List[str]]:
+        for step in self._steps:
+            text = step(text)
+        if self._tokenize:
+            return _TOKEN_PATTERN.findall(text)
+        return text
+
+    def _process_segment(self, segment: str, first: bool, last: bool) -> str:
+        """
+        Processa um segmento do fluxo. Segmentos seguintes ao primeiro começam
+        pelo espaço que os separa do anterior, que vira o separador de saída.
+        """
+        if self._lowercase:
+            segment = _to_lowercase(segment)
+        segment = _WHITESPACE_RUN_PATTERN.sub(
+            " ", segment.translate(_CONTROL_CHARACTERS_TABLE)
+        )
+        segment = segment.lstrip() if first else segment[1:]
+        if last:
+            segment = segment.rstrip()
+        if not segment:
+            return segment
+        for step in self._word_steps:
+            segment = step(segment)
+        return segment
+
+    def stream(self, chunks: Iterable[str]) -> Iterator[Union[str, List[str]]]:
+        """
+        Processa um fluxo de pedaços de texto com memória aproximadamente
+        constante. A concatenação das strings geradas (ou das listas, com
+        `tokenize`) é igual ao resultado de processar o texto inteiro.
+
+        Raises:
+            ValueError: Se o pipeline usa etapas base personalizadas.
+        """
+        if not self._streamable:
+            raise ValueError(
+                "O modo streaming requer as etapas base padrão do pré-processador."
+            )
+        emitted = False
+        segments = _iter_stream_segments(
+            chunks, cut_after_letter=self._normalize_entities
+        )
+        for segment, first, last in segments:
+            processed = self._process_segment(segment, first, last)
+            if not processed:
+                continue
+            if self._tokenize:
+                yield _TOKEN_PATTERN.findall(processed)
+            else:
+                yield " " + processed if emitted else processed
+                emitted = True
+
+
+# --- Representação em Tokens ---
+
+# Alternativa ao pipeline baseado em strings: o texto original é tokenizado uma
+# única vez em spans (início, fim, tipo) guardados em arrays compactos, e as
+# etapas de palavras rodam como filtros e mapeamentos sobre essa estrutura.
+# Uma string só é materializada no final. Como os offsets apontam para o texto
+# original, destacar os trechos que influenciaram uma classificação é direto.
+#
+# Diferenças em relação a `process`: a pontuação não gera tokens (logo, "o,"
+# também é removida como stopword) e caracteres de controle separam tokens.
+#
+# Com `normalize_entities`, a varredura usa os padrões de `_ENTITY_PATTERN`:
+# cada entidade ("R$ 1.234,56", uma linha digitável) vira um único span do tipo
+# TOKEN_ENTITY, cujo offset cobre o trecho original inteiro e cuja forma é o
+# token semântico (<MOEDA>, <DOC>...), como no pipeline de strings.
+
+TOKEN_WORD = 0
+TOKEN_NUMBER = 1
+TOKEN_SPECIAL = 2
+TOKEN_ENTITY = 3
+
+_KIND_BY_GROUP = {
+    "special": TOKEN_SPECIAL,
+    "number": TOKEN_NUMBER,
+    "word": TOKEN_WORD,
+    **{name: TOKEN_ENTITY for name in _ENTITY_TOKENS},
+}
+_TOKEN_SPAN_PATTERN = re.compile(
+    r"(?P<special><[^>]+>\%?)|(?P<number>\d+(?:[.,]\d+)*)|(?P<word>\w+)"
+)
+_ENTITY_SPAN_PATTERN = re.compile(
+    rf"(?P<special><[^>]+>\%?)|{_ENTITY_PATTERN.pattern}|(?P<word>\w+)",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+TokenTransform = Callable[[str, int], str]
+TokenPredicate = Callable[[str, int], bool]
+
+
+class TokenSpans:
+    """
+    Sequência de tokens de um texto, representada por offsets no texto original.
+
+    Mapeamentos (`map`) são compostos de forma preguiçosa e aplicados apenas ao
+    ler a forma de um token; filtros (`filter`) geram novos arrays de offsets.
+    """
+
+    __slots__ = ("text", "starts", "ends", "kinds", "_transforms")
+
+    def __init__(
+        self,
+        text: str,
+        starts: "array[int]",
+        ends: "array[int]",
+        kinds: "array[int]",
+        transforms: Tuple[TokenTransform, ...] = (),
+    ):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.kinds = kinds
+        self._transforms = transforms
+
+    @classmethod
+    def scan(cls, text: str, entities: bool = False) -> "TokenSpans":
+        """
+        Tokeniza o texto em uma única varredura. Com `entities`, moedas, datas,
+        percentuais, documentos e números viram spans do tipo TOKEN_ENTITY.
+        """
+        pattern = _ENTITY_SPAN_PATTERN if entities else _TOKEN_SPAN_PATTERN
+        starts, ends, kinds = array("I"), array("I"), array("B")
+        for match in pattern.finditer(text or ""):
+            start, end = match.span()
+            starts.append(start)
+            ends.append(end)
+            kinds.append(_KIND_BY_GROUP[match.lastgroup])
+        return cls(text or "", starts, ends, kinds)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def form(self, position: int) -> str:
+        """A forma atual (após os mapeamentos) do token na posição informada."""
+        token = self.text[self.starts[position] : self.ends[position]]
+        kind = self.kinds[position]
+        for transform in self._transforms:
+            token = transform(token, kind)
+        return token
+
+    def map(self, transform: TokenTransform) -> "TokenSpans":
+        """Retorna uma visão com `transform(token, tipo)` aplicado a cada token."""
+        return TokenSpans(
+            self.text,
+            self.starts,
+            self.ends,
+            self.kinds,
+            self._transforms + (transform,),
+        )
+
+    def filter(self, keep: TokenPredicate) -> "TokenSpans":
+        """Retorna apenas os tokens para os quais `keep(token, tipo)` é verdadeiro."""
+        starts, ends, kinds = array("I"), array("I"), array("B")
+        for position in range(len(self)):
+            kind = self.kinds[position]
+            if keep(self.form(position), kind):
+                starts.append(self.starts[position])
+                ends.append(self.ends[position])
+                kinds.append(kind)
+        return TokenSpans(self.text, starts, ends, kinds, self._transforms)
+
+    def spans(self) -> Iterator[Tuple[int, int, int]]:
+        """Os offsets (início, fim, tipo) de cada token no texto original."""
+        return zip(self.starts, self.ends, self.kinds)
+
+    def tokens(self) -> List[str]:
+        """Materializa a lista de tokens."""
+        return [self.form(position) for position in range(len(self))]
+
+    def to_text(self) -> str:
+        """Materializa os tokens como uma string separada por espaços."""
+        return " ".join(self.tokens())
+
+
+def _lowercase_token(token: str, kind: int) -> str:
+    return token if kind == TOKEN_SPECIAL else token.lower()
+
+
+def _number_token(token: str, kind: int) -> str:
+    return "<NUM>" if kind == TOKEN_NUMBER else token
+
+
+def _entity_token_form(token: str, kind: int) -> str:
+    return _normalize_entities(token) if kind == TOKEN_ENTITY else token
+
+
+# --- Processamento em Fluxo (Streaming) ---
+
+# Para textos enormes (PDFs extraídos, dumps de mbox), o fluxo de entrada é
+# cortado em segmentos apenas em pontos seguros: um espaço/tab precedido de um
+# caractere visível, fora de um token especial `<...>` ainda aberto. Como
+# nenhuma etapa atravessa esse espaço (palavras, números e `<NUM>` não contêm
+# espaços), processar os segmentos separadamente dá o mesmo resultado que
+# processar o texto inteiro. A memória fica limitada ao tamanho do pedaço de
+# entrada mais a maior palavra; se um `<` sem fechamento segurar o corte por
+# mais de STREAM_MAX_CARRY_CHARS caracteres, o corte é forçado no último espaço.
+
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_MAX_CARRY_CHARS = 1024 * 1024
+
+_CONTROL_CHARACTERS = frozenset(chr(code) for code in _CONTROL_CHARACTERS_TABLE)
+
+
+def _find_stream_cut(
+    buffer: str, respect_special_tokens: bool = True, cut_after_letter: bool = False
+) -> int:
+    """
+    Retorna a última posição segura de corte no buffer, ou -1 se não houver.
+    Com `cut_after_letter`, o corte só ocorre após uma letra, para que
+    entidades com espaços internos ("R$ 10", linhas de boleto) não sejam
+    divididas.
+    """
+    end = len(buffer)
+    while True:
+        position = max(buffer.rfind(" ", 0, end), buffer.rfind("\t", 0, end))
+        if position <= 0:
+            return -1
+        previous = buffer[position - 1]
+        if (
+            previous.isspace()
+            or previous in _CONTROL_CHARACTERS
+            or (cut_after_letter and not previous.isalpha())
+        ):
+            end = position
+            continue
+        if respect_special_tokens:
+            open_bracket = buffer.rfind("<", 0, position)
+            if open_bracket > buffer.rfind(">", 0, position):
+                end = open_bracket
+                continue
+        return position
+
+
+def _iter_stream_segments(
+    chunks: Iterable[str], cut_after_letter: bool = False
+) -> Iterator[Tuple[str, bool, bool]]:
+    """Agrupa os pedaços de entrada em segmentos (texto, primeiro, último)."""
+    carry = ""
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer = carry + chunk
+        cut = _find_stream_cut(buffer, cut_after_letter=cut_after_letter)
+        if cut < 0 and len(buffer) > STREAM_MAX_CARRY_CHARS:
+            cut = _find_stream_cut(buffer, respect_special_tokens=False)
+        if cut < 0:
+            carry = buffer
+            continue
+        yield buffer[:cut], first, False
+        first = False
+        carry = buffer[cut:]
+    yield carry, first, True
+
+
+def _iter_source_chunks(
+    source: Union[str, Iterable[str], IO], chunk_size: int
+) -> Iterator[str]:
+    """Normaliza a entrada (string, iterável de pedaços ou arquivo) em pedaços."""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start : start + chunk_size]
+        return
+    if hasattr(source, "read"):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+        return
+    yield from source
+
+
+# --- Processamento em Lote ---
+
+# Lotes pequenos rodam no próprio processo: iniciar um pool de processos custa
+# mais do que processar algumas centenas de e-mails. Lotes grandes são
+# divididos em blocos de `chunksize` textos e distribuídos entre os workers,
+# com uma janela limitada de blocos em andamento para manter a memória
+# constante mesmo com iteráveis de milhões de textos.
+
+PARALLEL_MIN_BATCH = 512
+DEFAULT_CHUNKSIZE = 64
+
+_worker_pipeline: Optional["CompiledPipeline"] = None
+
+
+def _init_worker(pipeline: "CompiledPipeline") -> None:
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def _process_chunk(chunk: List[str]) -> List[Union[str, List[str]]]:
+    return [_worker_pipeline(text) for text in chunk]
+
+
+def _iter_chunks(
+    head: List[str], rest: Iterator[str], chunksize: int
+) -> Iterator[List[str]]:
+    for start in range(0, len(head), chunksize):
+        yield head[start : start + chunksize]
+    while True:
+        chunk = list(islice(rest, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
 # --- Pipeline de Pré-processamento ---
 
 
@@ -385,11 +990,46 @@ class TextPreprocessor:
         base_steps: Optional[List[ProcessingStep]] = None,
         stopword_lists: Optional[Dict[str, Set[str]]] = None,
     ):
-        self.base_steps = base_steps or [
-            _remove_control_characters,
-            _normalize_whitespace,
-        ]
+        self.base_steps = base_steps or list(_DEFAULT_BASE_STEPS)
         self.stopword_lists = stopword_lists or _STOPWORD_LISTS
+        self._compiled: Dict[tuple, CompiledPipeline] = {}
+
+    def compile(
+        self,
+        lowercase: bool = True,
+        remove_stopwords: bool = False,
+        lang: str = "pt",
+        lemmatize: bool = False,
+        normalize_numbers: bool = False,
+        tokenize: bool = False,
+        normalize_entities: bool = False,
+    ) -> CompiledPipeline:
+        """
+        Retorna um pipeline compilado para as opções informadas, equivalente a
+        `process` com as mesmas opções. Pipelines são reutilizados por opção.
+        """
+        key = (
+            lowercase,
+            remove_stopwords,
+            lang,
+            lemmatize,
+            normalize_numbers,
+            tokenize,
+            normalize_entities,
+        )
+        pipeline = self._compiled.get(key)
+        if pipeline is None:
+            pipeline = CompiledPipeline(
+                base_steps=self.base_steps,
+                lowercase=lowercase,
+                normalize_numbers=normalize_numbers,
+                stopwords=self.stopword_lists.get(lang) if remove_stopwords else None,
+                lemmatizer=_LEMMATIZER_FUNCTIONS.get(lang) if lemmatize else None,
+                tokenize=tokenize,
+                normalize_entities=normalize_entities,
+            )
+            self._compiled[key] = pipeline
+        return pipeline
 
     @overload
     def process(
@@ -402,6 +1042,7 @@ class TextPreprocessor:
         normalize_numbers: bool = False,
         *,
         tokenize: Literal[True],
+        normalize_entities: bool = False,
     ) -> List[str]: ...
 
     @overload
@@ -414,6 +1055,7 @@ class TextPreprocessor:
         lemmatize: bool = False,
         normalize_numbers: bool = False,
         tokenize: Literal[False] = False,
+        normalize_entities: bool = False,
     ) -> str: ...
 
     def process(
@@ -425,6 +1067,7 @@ class TextPreprocessor:
         lemmatize: bool = False,
         normalize_numbers: bool = False,
         tokenize: bool = False,
+        normalize_entities: bool = False,
     ) -> Union[str, List[str]]:
         """
         Aplica o pipeline de processamento, com opções configuráveis.
@@ -437,8 +1080,10 @@ class TextPreprocessor:
         for step in self.base_steps:
             processed_text = step(processed_text)
 
-        # Etapa opcional de normalização de entidades (ex: números)
-        if normalize_numbers:
+        # Etapa opcional de normalização de entidades (moeda, datas, números...)
+        if normalize_entities:
+            processed_text = _normalize_entities(processed_text)
+        elif normalize_numbers:
             processed_text = _normalize_numbers(processed_text)
 
         # Etapas opcionais de remoção e transformação de palavras
@@ -455,6 +1100,143 @@ class TextPreprocessor:
 
         return processed_text
 
+    def process_many(
+        self,
+        texts: Iterable[str],
+        lowercase: bool = True,
+        remove_stopwords: bool = False,
+        lang: str = "pt",
+        lemmatize: bool = False,
+        normalize_numbers: bool = False,
+        tokenize: bool = False,
+        normalize_entities: bool = False,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+    ) -> Iterator[Union[str, List[str]]]:
+        """
+        Processa vários textos, preservando a ordem de entrada.
+
+        Os resultados são gerados à medida que ficam prontos (iterador), então
+        `texts` pode ser um gerador arbitrariamente grande. Com menos de
+        PARALLEL_MIN_BATCH textos, ou `workers=1`, tudo roda no próprio
+        processo; caso contrário, usa um pool de `workers` processos (padrão:
+        número de CPUs). Etapas base personalizadas precisam ser serializáveis
+        (pickle) para o modo paralelo.
+        """
+        pipeline = self.compile(
+            lowercase=lowercase,
+            remove_stopwords=remove_stopwords,
+            lang=lang,
+            lemmatize=lemmatize,
+            normalize_numbers=normalize_numbers,
+            tokenize=tokenize,
+            normalize_entities=normalize_entities,
+        )
+        workers = workers or os.cpu_count() or 1
+        iterator = iter(texts)
+        head = list(islice(iterator, PARALLEL_MIN_BATCH))
+
+        if workers <= 1 or len(head) < PARALLEL_MIN_BATCH:
+            for text in head:
+                yield pipeline(text)
+            for text in iterator:
+                yield pipeline(text)
+            return
+
+        chunks = _iter_chunks(head, iterator, max(1, chunksize))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(pipeline,)
+        ) as executor:
+            pending: Deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_process_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def process_stream(
+        self,
+        source: Union[str, Iterable[str], IO],
+        lowercase: bool = True,
+        remove_stopwords: bool = False,
+        lang: str = "pt",
+        lemmatize: bool = False,
+        normalize_numbers: bool = False,
+        tokenize: bool = False,
+        normalize_entities: bool = False,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[Union[str, List[str]]]:
+        """
+        Processa um texto grande em fluxo, sem carregá-lo inteiro na memória.
+
+        Args:
+            source: Um iterável de pedaços de texto ou um arquivo (texto ou
+                binário UTF-8), lido em blocos de `chunk_size`.
+
+        Returns:
+            Um iterador de pedaços processados; `"".join(...)` (ou a
+            concatenação das listas, com `tokenize`) equivale a `process`.
+        """
+        pipeline = self.compile(
+            lowercase=lowercase,
+            remove_stopwords=remove_stopwords,
+            lang=lang,
+            lemmatize=lemmatize,
+            normalize_numbers=normalize_numbers,
+            tokenize=tokenize,
+            normalize_entities=normalize_entities,
+        )
+        return pipeline.stream(_iter_source_chunks(source, chunk_size))
+
+    def process_tokens(
+        self,
+        text: str,
+        lowercase: bool = True,
+        remove_stopwords: bool = False,
+        lang: str = "pt",
+        lemmatize: bool = False,
+        normalize_numbers: bool = False,
+        normalize_entities: bool = False,
+    ) -> TokenSpans:
+        """
+        Aplica o pipeline sobre a representação em tokens do texto.
+
+        Returns:
+            Um TokenSpans com os tokens mantidos; use `tokens()` ou `to_text()`
+            para materializar e `spans()` para obter os offsets no texto original.
+        """
+        spans = TokenSpans.scan(text, entities=normalize_entities)
+
+        if lowercase:
+            spans = spans.map(_lowercase_token)
+
+        # Como em `process`, entidades têm precedência sobre `normalize_numbers`
+        if normalize_entities:
+            spans = spans.map(_entity_token_form)
+        elif normalize_numbers:
+            spans = spans.map(_number_token)
+
+        if remove_stopwords:
+            stopwords_to_remove = self.stopword_lists.get(lang)
+            if stopwords_to_remove:
+                spans = spans.filter(
+                    lambda token, kind: (
+                        kind != TOKEN_WORD or token not in stopwords_to_remove
+                    )
+                )
+
+        if lemmatize:
+            lemmatizer = _LEMMATIZER_FUNCTIONS.get(lang)
+            if lemmatizer:
+                spans = spans.map(
+                    lambda token, kind: (
+                        lemmatizer(token) if kind == TOKEN_WORD else token
+                    )
+                )
+
+        return spans
+
 
 # --- Função Pública ---
 
@@ -470,6 +1252,7 @@ def preprocess_text(
     normalize_numbers: bool = False,
     *,
     tokenize: Literal[True],
+    normalize_entities: bool = False,
 ) -> List[str]: ...
 
 
@@ -481,6 +1264,7 @@ def preprocess_text(
     lemmatize: bool = False,
     normalize_numbers: bool = False,
     tokenize: Literal[False] = False,
+    normalize_entities: bool = False,
 ) -> str: ...
 
 
@@ -491,6 +1275,7 @@ def preprocess_text(
     lemmatize: bool = False,
     normalize_numbers: bool = False,
     tokenize: bool = False,
+    normalize_entities: bool = False,
 ) -> Union[str, List[str]]:
     """
     Função pública para pré-processar um texto usando o pipeline padrão.
@@ -502,6 +1287,9 @@ def preprocess_text(
         lemmatize: Se True, aplica lematização heurística ao texto.
         normalize_numbers: Se True, normaliza os números para um token <NUM>.
         tokenize: Se True, retorna uma lista de tokens em vez de uma string.
+        normalize_entities: Se True, substitui moedas, datas, percentuais e
+            documentos por <MOEDA>, <DATA>, <PCT> e <DOC>, e demais números
+            por <NUM>.
 
     Returns:
         O texto limpo como uma string ou uma lista de tokens.
@@ -516,4 +1304,5 @@ def preprocess_text(
         lemmatize=lemmatize,
         normalize_numbers=normalize_numbers,
         tokenize=tokenize,
+        normalize_entities=normalize_entities,
     )
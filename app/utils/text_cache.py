@@ -0,0 +1,190 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Union
+
+from app.utils.metrics import metrics
+
+# --- Cache de Texto Extraído ---
+
+# Os mesmos anexos (boletos, contratos, faturas) são enviados repetidas vezes e
+# o pdfminer os interpretaria do zero a cada upload. O cache mapeia o SHA-256 do
+# conteúdo (mais o tipo do arquivo) para o texto extraído, em dois níveis:
+#
+#   - memória: LRU com até TEXT_CACHE_SIZE entradas, por processo;
+#   - disco (opcional, TEXT_CACHE_DIR): entradas comprimidas com zlib,
+#     compartilhadas entre processos e reinícios, com tamanho total limitado a
+#     TEXT_CACHE_MAX_BYTES (as menos usadas recentemente são removidas).
+#
+# Acertos e falhas são contados nas métricas "text_cache.*".
+
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "256"))
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", "")
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_DISK_SUFFIX = ".z"
+
+
+def content_hash(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Hash SHA-256 (hexadecimal) usado como chave do cache."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractedTextCache:
+    """
+    Cache de dois níveis para texto extraído de documentos.
+
+    Args:
+        max_entries: Entradas mantidas em memória (0 desativa o nível).
+        directory: Diretório do nível em disco, ou None para desativá-lo.
+        max_disk_bytes: Tamanho total máximo dos arquivos em disco.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TEXT_CACHE_SIZE,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = TEXT_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._disk_bytes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+
+    # --- Consulta ---
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna o texto associado à chave, ou None."""
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        if text is None and self.directory:
+            text = self._read_disk(key)
+            if text is not None:
+                metrics.increment("text_cache.disk_hits")
+                self._remember(key, text)
+
+        with self._lock:
+            if text is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        metrics.increment("text_cache.misses" if text is None else "text_cache.hits")
+        return text
+
+    def put(self, key: str, text: str, persist: bool = True) -> None:
+        """
+        Guarda o texto. Com `persist=False`, grava apenas em memória (útil
+        quando outro processo já gravou a entrada em disco).
+        """
+        self._remember(key, text)
+        if persist and self.directory:
+            self._write_disk(key, text)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Esvazia o nível em memória e zera as estatísticas."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    # --- Memória ---
+
+    def _remember(self, key: str, text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # --- Disco ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _DISK_SUFFIX)
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+            os.utime(path)  # mtime marca o último uso (ordem de remoção)
+            return text
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+
+    def _write_disk(self, key: str, text: str) -> None:
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        payload = zlib.compress(text.encode("utf-8"), 6)
+        if len(payload) > self.max_disk_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(payload)
+            # Renomear é atômico: leitores nunca veem uma entrada pela metade.
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes += len(payload)
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(_DISK_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _evict_disk(self) -> None:
+        entries = sorted(self._scan_disk(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            metrics.increment("text_cache.disk_evictions")
+        with self._lock:
+            self._disk_bytes = total
+
+
+@lru_cache(maxsize=1)
+def get_default_text_cache() -> ExtractedTextCache:
+    """Cache do processo, configurado pelas variáveis TEXT_CACHE_*."""
+    return ExtractedTextCache(directory=TEXT_CACHE_DIR or None)
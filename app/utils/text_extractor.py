@@ -1,18 +1,210 @@
+import html
+import io
+import math
 import re
 import os
-from typing import Optional
-from pdfminer.high_level import extract_text as pdfminer_extract_text
-from pdfminer.pdfparser import PDFSyntaxError
+from concurrent.futures import Executor
+from io import StringIO
+from html.parser import HTMLParser
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams, LTChar, LTContainer, LTPage
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser, PDFSyntaxError
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import open_filename
 
+from app.utils import email_parser
+from app.utils.email_parser import (
+    ParsedEmail,
+    email_to_text,
+    parse_email_headers,
+    parsed_email_to_text,
+)
+from app.utils.text_cache import content_hash, get_default_text_cache
 
-def _extract_text_from_pdf(file_path: str) -> str:
+# Conteúdo binário aceito por `extract_text_from_bytes`.
+BinaryContent = Union[bytes, bytearray, memoryview, BinaryIO]
+
+PDF_MAGIC = b"%PDF-"
+
+# --- Extração de PDF por Páginas ---
+
+# `pdfminer.high_level.extract_text` interpreta todas as páginas em sequência e
+# roda a análise de layout completa (agrupamento de caracteres em linhas e
+# caixas) em cada uma. Para classificar um e-mail raramente é preciso mais que
+# as primeiras páginas, então a extração aqui:
+#
+#   - para assim que PDF_MAX_CHARS caracteres ou PDF_MAX_PAGES páginas forem
+#     coletados (0 = sem limite);
+#   - no modo rápido (PDF_FAST_MODE), dispensa a análise de layout e apenas
+#     insere quebras de linha e espaços a partir da posição dos caracteres;
+#   - com um executor de processos, divide as páginas em faixas extraídas em
+#     paralelo, em ondas, para que o limite de texto também interrompa o lote.
+#     Na aplicação, `extract_text_from_upload` usa esse modo para PDFs com mais
+#     de PDF_PARALLEL_MIN_PAGES páginas, com o pool de extração como executor.
+
+PDF_FAST_MODE = os.getenv("PDF_FAST_MODE", "false").lower() == "true"
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "200000"))
+
+# Páginas mínimas por tarefa no modo paralelo (abaixo disso, o custo de reabrir
+# o documento em cada processo supera o ganho).
+PDF_MIN_PAGES_PER_TASK = 4
+
+# A partir deste número de páginas, uploads de PDF são extraídos por faixas de
+# páginas distribuídas entre os processos do pool (ver extraction_executor).
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+
+class _FastTextConverter(TextConverter):
+    """TextConverter sem análise de layout, com quebras inferidas por posição."""
+
+    def receive_layout(self, ltpage: LTPage) -> None:
+        parts: List[str] = []
+        previous: Optional[LTChar] = None
+        for char in _iter_chars(ltpage):
+            if previous is not None:
+                if abs(char.y0 - previous.y0) > previous.height / 2:
+                    parts.append("\n")
+                elif char.x0 - previous.x1 > previous.width / 3:
+                    parts.append(" ")
+            parts.append(char.get_text())
+            previous = char
+        parts.append("\n\f")
+        self.write_text("".join(parts))
+
+
+def _iter_chars(item):
+    for child in item:
+        if isinstance(child, LTChar):
+            yield child
+        elif isinstance(child, LTContainer):
+            yield from _iter_chars(child)
+
+
+def _extract_pdf_pages(
+    source: Union[str, BinaryIO, bytes],
+    page_numbers: Optional[Sequence[int]] = None,
+    fast: bool = False,
+    max_pages: int = 0,
+    max_chars: int = 0,
+) -> str:
+    """Extrai as páginas indicadas (ou todas), parando ao atingir `max_chars`."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with open_filename(source, "rb") as fp, StringIO() as output:
+        resource_manager = PDFResourceManager(caching=True)
+        if fast:
+            device = _FastTextConverter(resource_manager, output)
+        else:
+            device = TextConverter(resource_manager, output, laparams=LAParams())
+        interpreter = PDFPageInterpreter(resource_manager, device)
+        for page in PDFPage.get_pages(fp, page_numbers, maxpages=max_pages):
+            interpreter.process_page(page)
+            if max_chars and output.tell() >= max_chars:
+                break
+        return output.getvalue()
+
+
+def count_pdf_pages(source: Union[str, BinaryIO, bytes]) -> int:
+    """Conta as páginas de um PDF sem interpretar seu conteúdo."""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with open_filename(source, "rb") as fp:
+        document = PDFDocument(PDFParser(fp))
+        pages = resolve1(document.catalog.get("Pages"))
+        count = resolve1(pages.get("Count")) if isinstance(pages, dict) else None
+        if isinstance(count, int):
+            return count
+        return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def extract_pdf_text(
+    source: Union[str, BinaryIO, bytes],
+    fast: Optional[bool] = None,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+) -> str:
+    """
+    Extrai o texto de um PDF, opcionalmente em paralelo por faixas de páginas.
+
+    Args:
+        source: Caminho, bytes ou objeto binário legível.
+        fast: Dispensa a análise de layout (padrão: PDF_FAST_MODE).
+        max_pages: Máximo de páginas lidas (padrão: PDF_MAX_PAGES; 0 = todas).
+        max_chars: Para após coletar esse número de caracteres (padrão:
+            PDF_MAX_CHARS; 0 = sem limite). A página que cruza o limite é
+            mantida inteira.
+        executor: Executor de processos (ex: ProcessPoolExecutor ou
+            ExtractionExecutor) para extrair faixas de páginas em paralelo.
+        workers: Tarefas simultâneas por onda (padrão: os processos de um
+            ExtractionExecutor ou, para outros executores, o número de CPUs).
+
+    Returns:
+        O texto extraído, com as páginas separadas por "\\f".
+
+    Raises:
+        Exceções do pdfminer para PDFs inválidos.
     """
-    Extrai texto puro de um arquivo PDF de forma segura, usando pdfminer.six.
+    fast = PDF_FAST_MODE if fast is None else fast
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+    if executor is None:
+        return _extract_pdf_pages(source, None, fast, max_pages, max_chars)
+
+    # Os processos precisam de algo serializável: o caminho ou os bytes.
+    if not isinstance(source, (str, bytes)):
+        source = source.read()
+    page_count = count_pdf_pages(source)
+    if max_pages:
+        page_count = min(page_count, max_pages)
+    workers = workers or getattr(executor, "workers", None) or os.cpu_count() or 1
+    pages_per_task = PDF_MIN_PAGES_PER_TASK
+    if not max_chars:
+        # Sem limite de texto, uma única onda com faixas do mesmo tamanho.
+        pages_per_task = max(pages_per_task, math.ceil(page_count / workers))
+    ranges = [
+        list(range(start, min(start + pages_per_task, page_count)))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    if len(ranges) <= 1:
+        return _extract_pdf_pages(source, None, fast, max_pages, max_chars)
+
+    parts: List[str] = []
+    collected = 0
+    for wave_start in range(0, len(ranges), workers):
+        futures = [
+            executor.submit(_extract_pdf_pages, source, pages, fast, 0, max_chars)
+            for pages in ranges[wave_start : wave_start + workers]
+        ]
+        for index, future in enumerate(futures):
+            text = future.result()
+            parts.append(text)
+            collected += len(text)
+            if max_chars and collected >= max_chars:
+                for pending in futures[index + 1 :]:
+                    pending.cancel()
+                return "".join(parts)
+    return "".join(parts)
+
+
+def _extract_text_from_pdf(
+    source: Union[str, BinaryIO], executor: Optional[Executor] = None
+) -> str:
+    """
+    Extrai texto puro de um PDF de forma segura, usando pdfminer.six.
+    Aceita um caminho ou um objeto binário legível (ex: BytesIO) e, opcionalmente,
+    um executor para extrair as páginas em paralelo (ver `extract_pdf_text`).
     Retorna uma string vazia se ocorrer um erro.
     """
     try:
-        # A função de alto nível do pdfminer.six lida com a abertura e extração.
-        text = pdfminer_extract_text(file_path)
+        # Respeita os limites de páginas/caracteres e o modo rápido configurados.
+        text = extract_pdf_text(source, executor=executor)
         return text if text else ""
     except (PDFSyntaxError, Exception):
         # Captura erros específicos da biblioteca ou qualquer outra exceção inesperada.
@@ -22,7 +214,7 @@ def _extract_text_from_pdf(file_path: str) -> str:
 def extract_text(raw_content: Optional[str]) -> str:
     """
     Extrai texto puro de um conteúdo bruto. Pode processar strings diretas, HTML,
-    ou caminhos para arquivos .txt e .pdf.
+    ou caminhos para arquivos .txt, .pdf e .eml.
 
     Args:
         raw_content: A string de entrada (texto, HTML, caminho de arquivo) ou None.
@@ -34,39 +226,342 @@ def extract_text(raw_content: Optional[str]) -> str:
     if not isinstance(raw_content, str) or not raw_content.strip():
         return ""
 
-    content_to_process = raw_content
     potential_path = raw_content.strip()
 
     # Decide o tipo de conteúdo e o processa.
     if potential_path.endswith(".txt"):
-        if os.path.isfile(potential_path):
-            try:
-                with open(potential_path, "r", encoding="utf-8") as f:
-                    content_to_process = f.read()
-            except (IOError, UnicodeDecodeError):
-                return ""
-        else:
-            return ""
+        kind = "txt"
     elif potential_path.endswith(".pdf"):
-        if os.path.isfile(potential_path):
-            content_to_process = _extract_text_from_pdf(potential_path)
-            # Se a extração do PDF falhar, retorna string vazia imediatamente.
-            if not content_to_process:
-                return ""
+        kind = "pdf"
+    elif potential_path.endswith(".eml"):
+        kind = "eml"
+    else:
+        # Strings diretas passam apenas pelo pipeline de limpeza de HTML.
+        return _clean_html(raw_content)
+
+    if not os.path.isfile(potential_path):
+        return ""
+    try:
+        with open(potential_path, "rb") as f:
+            data = f.read()
+    except IOError:
+        return ""
+    # Arquivos .txt, .pdf e .eml repetidos são servidos pelo cache de texto extraído.
+    return _extract_cached(kind, data)
+
+
+# --- HTML para Texto ---
+
+# A limpeza por expressões regulares (remover <script>/<style>, depois todas as
+# tags, depois decodificar entidades) faz três passadas, sofre backtracking em
+# marcação malformada e mantém textos ocultos (preheaders, rastreadores) que só
+# gastam tokens. O HTMLTextExtractor usa o html.parser da biblioteca padrão em
+# uma única passada incremental: ignora script, style, head e elementos
+# ocultos, colapsa espaços (mantendo as quebras de linha do texto) e transforma
+# elementos de bloco em quebras de linha. Aceita a entrada em pedaços (`feed`
+# várias vezes).
+
+# Presença de tags HTML conhecidas: só então o parser é usado. Texto puro com
+# "<" (como "João <joao@empresa.com> escreveu:") mantém suas linhas.
+_HTML_TAG_PATTERN = re.compile(
+    r"<!doctype\b|<!--|</?(?:html|head|body|meta|title|style|script|div|span|p|"
+    r"br|hr|a|b|i|u|em|strong|font|img|table|tbody|thead|tr|td|th|ul|ol|li|"
+    r"h[1-6]|blockquote|center|pre|section|article|header|footer)(?=[\s/>])",
+    re.IGNORECASE,
+)
+# Espaços colapsados como no navegador, mas as quebras de linha do texto são
+# mantidas (uma por sequência).
+_INLINE_SPACE_PATTERN = re.compile(r"[^\S\n]+")
+_NEWLINE_RUN_PATTERN = re.compile(r" *\n\s*")
+_LINE_BREAKS_PATTERN = re.compile(r" *\n[\n ]*")
+
+_SKIPPED_TAGS = frozenset({"script", "style", "head", "noscript", "template", "svg"})
+_BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "body", "center", "dd",
+        "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer",
+        "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "html",
+        "li", "main", "nav", "ol", "p", "pre", "section", "table", "tbody",
+        "thead", "tfoot", "tr", "ul",
+    }
+)  # fmt: skip
+_CELL_TAGS = frozenset({"td", "th"})
+_VOID_TAGS = frozenset(
+    {
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+        "meta", "param", "source", "track", "wbr",
+    }
+)  # fmt: skip
+_HIDDEN_STYLE_PATTERN = re.compile(
+    r"display\s*:\s*none|visibility\s*:\s*hidden|mso-hide\s*:\s*all"
+    r"|(?:max-height|font-size|opacity)\s*:\s*0(?![.\d])",
+    re.IGNORECASE,
+)
+
+
+def _is_hidden(attrs: List[Tuple[str, Optional[str]]]) -> bool:
+    for name, value in attrs:
+        if name == "hidden":
+            return True
+        if name == "aria-hidden" and (value or "").lower() == "true":
+            return True
+        if name == "style" and value and _HIDDEN_STYLE_PATTERN.search(value):
+            return True
+    return False
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Converte HTML em texto puro de forma incremental.
+
+    Uso:
+        extractor = HTMLTextExtractor()
+        for chunk in chunks:
+            extractor.feed(chunk)
+        text = extractor.get_text()
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        # Profundidade da pilha em que o trecho ignorado começou.
+        self._skip_depth: Optional[int] = None
+        self._pre_depth = 0
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in _VOID_TAGS:
+            if self._skip_depth is None and tag in ("br", "hr"):
+                self._parts.append("\n")
+            return
+        if self._skip_depth is None:
+            if tag in _SKIPPED_TAGS or _is_hidden(attrs):
+                self._skip_depth = len(self._stack)
+            elif tag in _BLOCK_TAGS:
+                self._parts.append("\n")
+            elif tag in _CELL_TAGS:
+                self._parts.append(" ")
+        if tag == "pre":
+            self._pre_depth += 1
+        self._stack.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        # <div/> e afins não abrem um elemento: nada a ignorar ou fechar.
+        if tag in ("br", "hr") and self._skip_depth is None:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        # Fecha até o elemento correspondente; tags sem abertura são ignoradas.
+        if tag not in self._stack:
+            return
+        while self._stack:
+            closed = self._stack.pop()
+            if closed == "pre":
+                self._pre_depth -= 1
+            if self._skip_depth is not None and len(self._stack) <= self._skip_depth:
+                self._skip_depth = None
+            elif self._skip_depth is None and closed in _BLOCK_TAGS:
+                self._parts.append("\n")
+            if closed == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth is not None:
+            return
+        if self._pre_depth:
+            self._parts.append(data)
+        else:
+            data = _INLINE_SPACE_PATTERN.sub(" ", data)
+            self._parts.append(_NEWLINE_RUN_PATTERN.sub("\n", data))
+
+    def get_text(self) -> str:
+        """Finaliza a leitura e retorna o texto, sem espaços nas pontas."""
+        self.close()
+        text = "".join(self._parts)
+        return _LINE_BREAKS_PATTERN.sub("\n", text).strip()
+
+
+def html_to_text(source: Union[str, Iterable[str]]) -> str:
+    """
+    Converte HTML (uma string ou um iterável de pedaços) em texto puro.
+    """
+    extractor = HTMLTextExtractor()
+    for chunk in [source] if isinstance(source, str) else source:
+        extractor.feed(chunk)
+    return extractor.get_text()
+
+
+def _clean_html(content: str) -> str:
+    # Sem tags, apenas decodifica entidades e preserva o texto como está.
+    if not _HTML_TAG_PATTERN.search(content):
+        return html.unescape(content).strip()
+    return html_to_text(content)
+
+
+# --- Extração em Memória ---
+
+# Uploads chegam como bytes; gravá-los em um arquivo temporário só para que
+# `extract_text` os leia de volta custa duas idas ao disco por requisição. PDFs
+# são entregues ao pdfminer como BytesIO, arquivos de texto são decodificados
+# diretamente e mensagens .eml são lidas por `email_parser`. O tipo é decidido
+# pela extensão do nome, pelo MIME type ou, na falta dos dois, pela assinatura
+# "%PDF-" no início do conteúdo.
+
+
+def _detect_kind(
+    head: bytes, filename: Optional[str], mime_type: Optional[str]
+) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower()
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+    if extension == ".pdf" or mime_type == "application/pdf":
+        return "pdf"
+    if extension == ".eml" or mime_type == "message/rfc822":
+        return "eml"
+    if extension == ".txt" or mime_type.startswith("text/"):
+        return "txt"
+    if not extension and head.startswith(PDF_MAGIC):
+        return "pdf"
+    return None
+
+
+def _decode_text(data: bytes) -> str:
+    try:
+        text = bytes(data).decode("utf-8")
+    except UnicodeDecodeError:
+        return ""
+    # Mesmas quebras de linha que a leitura em modo texto produziria.
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _extract_pdf_bytes(data: bytes, executor: Optional[Executor] = None) -> str:
+    return _extract_text_from_pdf(io.BytesIO(data), executor)
+
+
+# Versão da extração, incluída na chave do cache: deve ser incrementada quando
+# a conversão mudar (HTML, PDF, .eml), para não servir texto antigo do disco.
+TEXT_EXTRACTION_VERSION = 2
+
+
+def _extraction_config_tag() -> str:
+    """Resumo da versão e das configurações que mudam o texto extraído."""
+    config = (
+        TEXT_EXTRACTION_VERSION,
+        PDF_FAST_MODE,
+        PDF_MAX_PAGES,
+        PDF_MAX_CHARS,
+        email_parser.EML_MIN_BODY_CHARS,
+        email_parser.EML_MAX_ATTACHMENT_BYTES,
+    )
+    return content_hash(repr(config).encode("utf-8"))[:12]
+
+
+def _cache_key(digest: str, kind: str) -> str:
+    return f"{digest}.{kind}.{_extraction_config_tag()}"
+
+
+def _extract_cached(
+    kind: str,
+    data: bytes,
+    digest: Optional[str] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    """Extrai e limpa o conteúdo, consultando antes o cache pelo hash dos bytes."""
+    cache = get_default_text_cache()
+    key = _cache_key(digest or content_hash(data), kind)
+    text = cache.get(key)
+    if text is None:
+        if kind == "eml":
+            # Anexos, quando necessários, passam pela mesma extração (e cache).
+            text = email_to_text(data, extract_text_from_bytes, _clean_html)
         else:
-            return ""
+            content = (
+                _extract_pdf_bytes(data, executor)
+                if kind == "pdf"
+                else _decode_text(data)
+            )
+            text = _clean_html(content) if content.strip() else ""
+        # Falhas não são guardadas: podem ter sido transitórias.
+        if text:
+            cache.put(key, text)
+    return text
+
+
+def text_cache_key(
+    data: bytes,
+    filename: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    sha256: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Chave do cache de texto para um arquivo em memória, ou None se o tipo não
+    for suportado. Permite consultar o cache antes de despachar a extração
+    para outro processo. Inclui a versão e as configurações da extração
+    (PDF_*, EML_*), para que mudá-las não sirva texto antigo do cache.
+    """
+    kind = _detect_kind(bytes(data[: len(PDF_MAGIC)]), filename, mime_type)
+    if kind is None:
+        return None
+    return _cache_key(sha256 or content_hash(data), kind)
+
+
+def extract_text_from_bytes(
+    data: BinaryContent,
+    filename: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    sha256: Optional[str] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    """
+    Extrai texto puro de um arquivo em memória (.txt, .pdf ou .eml), sem tocar o
+    disco.
 
-    # O conteúdo (de string, .txt ou .pdf) passa pelo pipeline de limpeza de HTML.
-    # 1. Remove elementos <script> e <style>.
-    clean_text = re.sub(r"(?is)<(script|style).*?>.*?</\1>", "", content_to_process)
+    Args:
+        data: O conteúdo do arquivo (bytes, bytearray, memoryview ou um objeto
+            binário legível).
+        filename: Nome original do arquivo; a extensão decide o tipo.
+        mime_type: MIME type informado no upload, usado se não houver extensão
+            reconhecida.
+        sha256: Hash do conteúdo, se já calculado (ex: durante o upload).
+        executor: Executor de processos para extrair PDFs por faixas de
+            páginas em paralelo; não deve ser usado de dentro dos próprios
+            processos do executor.
+
+    Returns:
+        O texto extraído e limpo. Retorna string vazia se o tipo não for
+        suportado ou se o conteúdo não puder ser lido.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = data.read()
+
+    kind = _detect_kind(bytes(data[: len(PDF_MAGIC)]), filename, mime_type)
+    if kind is None:
+        return ""
+    return _extract_cached(kind, data, sha256, executor)
 
-    # 2. Remove as tags HTML restantes.
-    clean_text = re.sub(r"<[^>]+>", "", clean_text)
 
-    # 3. Decodifica entidades HTML.
-    import html
+def detect_upload_kind(
+    data: bytes, filename: Optional[str] = None, mime_type: Optional[str] = None
+) -> Optional[str]:
+    """O tipo do arquivo ("pdf", "eml" ou "txt"), ou None se não for suportado."""
+    return _detect_kind(bytes(data[: len(PDF_MAGIC)]), filename, mime_type)
 
-    clean_text = html.unescape(clean_text)
 
-    # Retorna o texto limpo, removendo espaços em branco no início/fim.
-    return clean_text.strip()
+def extract_text_from_email(parsed: ParsedEmail) -> str:
+    """
+    Texto de uma mensagem já lida com `email_parser.parse_email`, como
+    `extract_text_from_bytes` faria com os bytes do .eml (sem cache).
+    """
+    return parsed_email_to_text(parsed, extract_text_from_bytes, _clean_html)
+
+
+def email_upload_headers(
+    data: bytes, filename: Optional[str] = None, mime_type: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """
+    Cabeçalhos (ver `email_parser.EXPOSED_HEADERS`) de um upload .eml, lidos
+    sem decodificar o corpo, ou None se o arquivo não for uma mensagem.
+    """
+    kind = _detect_kind(bytes(data[: len(PDF_MAGIC)]), filename, mime_type)
+    if kind != "eml":
+        return None
+    return parse_email_headers(bytes(data))
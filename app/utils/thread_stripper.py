@@ -0,0 +1,193 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.utils.compaction import estimate_tokens
+from app.utils.metrics import metrics
+
+# --- Remoção de Histórico Citado ---
+
+# Respostas e encaminhamentos carregam toda a conversa anterior ("Em ... escreveu:",
+# linhas citadas com ">", "-----Original Message-----"), o que multiplica o
+# tamanho da entrada sem ajudar a classificar a mensagem mais recente. Esta etapa
+# roda logo após `extract_text` e mantém apenas a mensagem nova.
+
+# Linhas que iniciam o histórico citado. Os padrões são aplicados linha a linha.
+_ATTRIBUTION_PATTERNS = [
+    re.compile(r"^\s*Em\s.{0,300}\bescreveu:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*On\s.{0,300}\bwrote:\s*$", re.IGNORECASE),
+]
+_SEPARATOR_PATTERN = re.compile(
+    r"^\s*-{2,}\s*(?:Original Message|Mensagem original|Forwarded message"
+    r"|Mensagem encaminhada)\s*-{2,}\s*$",
+    re.IGNORECASE,
+)
+# Cabeçalho no estilo Outlook: "De:" seguido, nas próximas linhas, de "Enviado:" etc.
+_HEADER_FROM_PATTERN = re.compile(r"^\s*(?:De|From):\s*(.+)$", re.IGNORECASE)
+_HEADER_FIELD_PATTERN = re.compile(
+    r"^\s*(?:Enviad[oa]|Sent|Data|Date|Para|To|Assunto|Subject|Cc):", re.IGNORECASE
+)
+_ATTRIBUTION_SENDER_PATTERN = re.compile(
+    r"(?:,\s*|\bOn\s.+?,\s*|\bEm\s.+?,\s*)([^,]+?)\s*(?:escreveu|wrote):\s*$",
+    re.IGNORECASE,
+)
+
+# Filtro barato: se nenhum destes trechos aparece, não há histórico a remover.
+_QUICK_MARKERS = ("escreveu", "wrote", "---", ">", "De:", "From:", "de:", "from:")
+
+_SUMMARY_MAX_CHARS = 160
+
+
+def _is_attribution_tail(line: str) -> bool:
+    return line.strip().lower() in ("escreveu:", "wrote:")
+
+
+@dataclass(frozen=True)
+class StripResult:
+    """Mensagem mais recente e as estatísticas do histórico removido."""
+
+    text: str
+    summary: Optional[str]
+    bytes_saved: int
+    tokens_saved: int
+
+    @property
+    def had_history(self) -> bool:
+        return self.bytes_saved > 0
+
+
+# --- Funções Auxiliares ---
+
+
+def _find_history_start(lines: List[str]) -> Optional[int]:
+    """Retorna o índice da primeira linha do histórico citado, se houver."""
+    for i, line in enumerate(lines):
+        if _SEPARATOR_PATTERN.match(line):
+            return i
+        if any(pattern.match(line) for pattern in _ATTRIBUTION_PATTERNS):
+            return i
+        # A atribuição do Gmail costuma quebrar em duas linhas.
+        if i + 1 < len(lines) and _is_attribution_tail(lines[i + 1]):
+            joined = line.rstrip("\r\n") + " " + lines[i + 1].strip()
+            if any(pattern.match(joined) for pattern in _ATTRIBUTION_PATTERNS):
+                return i
+        if _HEADER_FROM_PATTERN.match(line) and any(
+            _HEADER_FIELD_PATTERN.match(following) for following in lines[i + 1 : i + 4]
+        ):
+            return i
+    return None
+
+
+def _is_quoted(line: str) -> bool:
+    return line.lstrip().startswith(">")
+
+
+def _summarize_history(history: List[str]) -> Optional[str]:
+    """
+    Gera um resumo curto e local do histórico: quantas mensagens, de quem e o
+    início da mensagem citada mais recente.
+    """
+    senders: List[str] = []
+    messages = 0
+    first_body: List[str] = []
+
+    for i, line in enumerate(history):
+        stripped = line.strip()
+        is_marker = _find_history_start([line] + history[i + 1 : i + 4]) == 0
+        if is_marker:
+            messages += 1
+            from_match = _HEADER_FROM_PATTERN.match(stripped)
+            sender_match = _ATTRIBUTION_SENDER_PATTERN.search(stripped)
+            sender = from_match.group(1) if from_match else None
+            if sender is None and sender_match:
+                sender = sender_match.group(1)
+            if sender and sender.strip() not in senders:
+                senders.append(sender.strip())
+            continue
+        if _is_attribution_tail(stripped) or _HEADER_FIELD_PATTERN.match(stripped):
+            continue
+        if messages <= 1 and stripped:
+            if len(" ".join(first_body)) < _SUMMARY_MAX_CHARS:
+                first_body.append(stripped.lstrip("> ").strip())
+
+    messages = max(messages, 1)
+    excerpt = " ".join(part for part in first_body if part)[:_SUMMARY_MAX_CHARS]
+    if not excerpt and not senders:
+        return None
+
+    summary = f"[Histórico citado: {messages} mensagem(ns) anterior(es)"
+    if senders:
+        summary += f" de {', '.join(senders[:3])}"
+    if excerpt:
+        summary += f'. Trecho mais recente: "{excerpt.strip()}"'
+    return summary + "]"
+
+
+def _split_newest(text: str) -> Tuple[str, List[str]]:
+    """Separa a mensagem mais recente das linhas de histórico citado."""
+    lines = text.splitlines(keepends=True)
+    start = _find_history_start(lines)
+    head = lines if start is None else lines[:start]
+    history = [] if start is None else lines[start:]
+
+    newest = [line for line in head if not _is_quoted(line)]
+    quoted_inline = [line for line in head if _is_quoted(line)]
+    return "".join(newest).strip(), quoted_inline + history
+
+
+# --- Função Pública ---
+
+
+def strip_quoted_history(text: str, summarize: bool = False) -> StripResult:
+    """
+    Remove o histórico citado de respostas e encaminhamentos, mantendo apenas a
+    mensagem mais recente.
+
+    Se a mensagem nova estiver vazia (ex: encaminhamento sem comentário), a
+    primeira mensagem do histórico é usada no lugar.
+
+    Args:
+        text: O texto extraído do e-mail.
+        summarize: Se True, anexa um resumo curto do histórico removido.
+
+    Returns:
+        Um StripResult com o texto resultante e os bytes/tokens economizados.
+    """
+    metrics.increment("thread_strip.emails")
+
+    if not text or not any(marker in text for marker in _QUICK_MARKERS):
+        return StripResult(text, None, 0, 0)
+
+    newest, history = _split_newest(text)
+    if not history:
+        return StripResult(text, None, 0, 0)
+
+    if not newest:
+        # Encaminhamento puro: a mensagem de interesse é a primeira citada.
+        body = [
+            line.lstrip().lstrip(">").lstrip() if _is_quoted(line) else line
+            for line in history[1:]
+        ]
+        while body and (
+            not body[0].strip()
+            or _is_attribution_tail(body[0])
+            or _HEADER_FIELD_PATTERN.match(body[0])
+            or _HEADER_FROM_PATTERN.match(body[0])
+        ):
+            body.pop(0)
+        newest, history = _split_newest("".join(body))
+        if not newest:
+            return StripResult(text, None, 0, 0)
+
+    summary = _summarize_history(history) if summarize and history else None
+    result_text = f"{newest}\n\n{summary}" if summary else newest
+
+    bytes_saved = max(0, len(text.encode("utf-8")) - len(result_text.encode("utf-8")))
+    tokens_saved = max(0, estimate_tokens(text) - estimate_tokens(result_text))
+
+    if bytes_saved:
+        metrics.increment("thread_strip.stripped")
+        metrics.increment("thread_strip.bytes_saved", bytes_saved)
+        metrics.increment("thread_strip.tokens_saved", tokens_saved)
+
+    return StripResult(result_text, summary, bytes_saved, tokens_saved)
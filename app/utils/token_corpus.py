@@ -0,0 +1,266 @@
+import json
+import os
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.preprocess import preprocess_text
+
+# --- Corpus de Tokens Colunar ---
+
+# Arquivos de e-mails pré-processados guardados como listas de strings Python
+# custam dezenas de bytes por token. O corpus colunar interna cada token em um
+# ID inteiro e grava os documentos como um único buffer contíguo de uint32,
+# mais um array de offsets (uint64) que marca onde cada documento começa:
+#
+#   <diretório>/vocab.txt    um token por linha (string JSON); linha = ID
+#   <diretório>/tokens.bin   IDs dos tokens de todos os documentos, em sequência
+#   <diretório>/offsets.bin  len(documentos) + 1 offsets em tokens.bin
+#
+# Na leitura, os dois binários são abertos com np.memmap (somente leitura):
+# o acesso a qualquer documento é aleatório e sem cópia, e vários processos
+# compartilham as mesmas páginas do cache do sistema operacional.
+#
+# O `flush` grava vocabulário, tokens e só então os offsets, que funcionam como
+# marcador de commit: um documento só existe quando seu offset final está no
+# arquivo. Se o processo cair no meio da gravação, sobram tokens (ou um offset
+# parcial) além do último offset consistente; a leitura os ignora e a abertura
+# com mode="a" trunca os arquivos de volta a esse ponto antes de acrescentar.
+
+VOCAB_FILENAME = "vocab.txt"
+TOKENS_FILENAME = "tokens.bin"
+OFFSETS_FILENAME = "offsets.bin"
+
+_TOKEN_DTYPE = np.dtype("<u4")
+_OFFSET_DTYPE = np.dtype("<u8")
+
+
+class InvalidTokenCorpusError(ValueError):
+    """Lançado quando os arquivos do corpus de tokens são inconsistentes."""
+
+    pass
+
+
+class Vocabulary:
+    """Mapeamento bidirecional token <-> ID, com IDs atribuídos em ordem."""
+
+    def __init__(self, tokens: Optional[Sequence[str]] = None):
+        self._tokens: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for token in tokens or []:
+            self.intern(token)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._ids
+
+    def intern(self, token: str) -> int:
+        """Retorna o ID do token, atribuindo um novo se ainda não existir."""
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = len(self._tokens)
+            self._ids[token] = token_id
+            self._tokens.append(token)
+        return token_id
+
+    def get_id(self, token: str) -> Optional[int]:
+        return self._ids.get(token)
+
+    def token(self, token_id: int) -> str:
+        return self._tokens[token_id]
+
+    def tokens_since(self, start: int) -> List[str]:
+        return self._tokens[start:]
+
+    @classmethod
+    def load(cls, path: str) -> "Vocabulary":
+        with open(path, "r", encoding="utf-8") as f:
+            # Uma linha sem "\n" no fim é de um flush interrompido
+            return cls(
+                [json.loads(line) for line in f if line.strip() and line[-1] == "\n"]
+            )
+
+
+def _as_little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _open_memmap(path: str, dtype: np.dtype) -> np.ndarray:
+    # Ignora um elemento parcial no fim (gravação interrompida)
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _write_durably(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _truncate_incomplete_flush(path: str) -> None:
+    """
+    Descarta o que um `flush` interrompido deixou além do último offset
+    consistente: offsets que apontam além dos tokens gravados, tokens sem
+    offset e uma linha parcial no fim do vocabulário.
+    """
+    tokens_path = os.path.join(path, TOKENS_FILENAME)
+    offsets_path = os.path.join(path, OFFSETS_FILENAME)
+    token_count = os.path.getsize(tokens_path) // _TOKEN_DTYPE.itemsize
+    offsets = np.fromfile(offsets_path, dtype=_OFFSET_DTYPE)
+    if not len(offsets) or offsets[0] != 0:
+        raise InvalidTokenCorpusError(f"Offsets inconsistentes em {path}")
+
+    # Offsets válidos são crescentes e não passam do fim dos tokens
+    invalid = offsets > token_count
+    invalid[1:] |= offsets[1:] < offsets[:-1]
+    consistent = int(np.argmax(invalid)) if invalid.any() else len(offsets)
+    end = int(offsets[consistent - 1])
+    os.truncate(offsets_path, consistent * _OFFSET_DTYPE.itemsize)
+    os.truncate(tokens_path, end * _TOKEN_DTYPE.itemsize)
+
+    vocab_path = os.path.join(path, VOCAB_FILENAME)
+    with open(vocab_path, "rb") as f:
+        vocab = f.read()
+    if vocab and not vocab.endswith(b"\n"):
+        os.truncate(vocab_path, vocab.rfind(b"\n") + 1)
+
+
+class TokenCorpus:
+    """
+    Corpus de documentos tokenizados, gravado em disco em formato colunar.
+
+    Use `TokenCorpus.open(caminho)` para leitura e `TokenCorpus.open(caminho,
+    "a")` (de preferência como context manager) para acrescentar documentos.
+    """
+
+    def __init__(self, path: str, writable: bool):
+        self.path = path
+        self.writable = writable
+        self.vocabulary = Vocabulary.load(os.path.join(path, VOCAB_FILENAME))
+        self._saved_vocabulary = len(self.vocabulary)
+        self._pending_tokens = array("I")
+        self._pending_offsets = array("Q")
+        self._reload()
+
+    @classmethod
+    def open(cls, path: str, mode: str = "r") -> "TokenCorpus":
+        """
+        Abre um corpus existente. Com mode="a", cria o diretório e os arquivos
+        se necessário e permite acrescentar documentos.
+        """
+        if mode not in ("r", "a"):
+            raise ValueError(f"Modo inválido: {mode}")
+        if mode == "a":
+            os.makedirs(path, exist_ok=True)
+            for name in (VOCAB_FILENAME, TOKENS_FILENAME):
+                open(os.path.join(path, name), "ab").close()
+            offsets_path = os.path.join(path, OFFSETS_FILENAME)
+            if not os.path.exists(offsets_path) or not os.path.getsize(offsets_path):
+                with open(offsets_path, "wb") as f:
+                    f.write(_as_little_endian(array("Q", [0])))
+            _truncate_incomplete_flush(path)
+        elif not os.path.isfile(os.path.join(path, OFFSETS_FILENAME)):
+            raise InvalidTokenCorpusError(f"Corpus de tokens não encontrado: {path}")
+        return cls(path, writable=mode == "a")
+
+    def _reload(self) -> None:
+        self._tokens = _open_memmap(
+            os.path.join(self.path, TOKENS_FILENAME), _TOKEN_DTYPE
+        )
+        self._offsets = _open_memmap(
+            os.path.join(self.path, OFFSETS_FILENAME), _OFFSET_DTYPE
+        )
+        if (
+            not len(self._offsets)
+            or self._offsets[0] != 0
+            or int(self._offsets[-1]) > len(self._tokens)
+        ):
+            raise InvalidTokenCorpusError(f"Offsets inconsistentes em {self.path}")
+        # Tokens além do último offset são de um flush ainda não confirmado
+        self._tokens = self._tokens[: int(self._offsets[-1])]
+
+    # --- Escrita ---
+
+    def append(self, tokens: Sequence[str]) -> int:
+        """Acrescenta um documento já tokenizado. Retorna o índice do documento."""
+        if not self.writable:
+            raise ValueError("Corpus aberto somente para leitura.")
+        intern = self.vocabulary.intern
+        self._pending_tokens.extend(intern(token) for token in tokens)
+        self._pending_offsets.append(len(self._tokens) + len(self._pending_tokens))
+        return len(self) - 1
+
+    def append_text(self, text: str, **preprocess_options) -> int:
+        """Pré-processa e tokeniza o texto com `preprocess_text` e o acrescenta."""
+        return self.append(preprocess_text(text, tokenize=True, **preprocess_options))
+
+    def flush(self) -> None:
+        """
+        Grava no disco os documentos e tokens novos e reabre o mapeamento.
+
+        Os offsets são gravados por último, depois que vocabulário e tokens
+        estão no disco; até lá, os novos documentos não são visíveis.
+        """
+        if not self.writable or not self._pending_offsets:
+            return
+        new_tokens = self.vocabulary.tokens_since(self._saved_vocabulary)
+        with open(os.path.join(self.path, VOCAB_FILENAME), "a", encoding="utf-8") as f:
+            f.writelines(
+                json.dumps(token, ensure_ascii=False) + "\n" for token in new_tokens
+            )
+            _write_durably(f)
+        with open(os.path.join(self.path, TOKENS_FILENAME), "ab") as f:
+            f.write(_as_little_endian(self._pending_tokens))
+            _write_durably(f)
+        with open(os.path.join(self.path, OFFSETS_FILENAME), "ab") as f:
+            f.write(_as_little_endian(self._pending_offsets))
+
+        self._saved_vocabulary = len(self.vocabulary)
+        self._pending_tokens = array("I")
+        self._pending_offsets = array("Q")
+        self._reload()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "TokenCorpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- Leitura ---
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1 + len(self._pending_offsets)
+
+    def token_ids(self, position: int) -> np.ndarray:
+        """IDs dos tokens do documento (visão sem cópia do arquivo mapeado)."""
+        if not 0 <= position < len(self._offsets) - 1:
+            if 0 <= position < len(self):
+                raise IndexError("Documento ainda não gravado; chame flush().")
+            raise IndexError(position)
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        return self._tokens[start:end]
+
+    def document(self, position: int) -> List[str]:
+        token = self.vocabulary.token
+        return [token(int(token_id)) for token_id in self.token_ids(position)]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        """Itera pelos IDs de tokens de cada documento gravado."""
+        for position in range(len(self._offsets) - 1):
+            yield self.token_ids(position)
+
+    def iter_documents(self) -> Iterator[List[str]]:
+        """Itera pelos documentos gravados como listas de tokens."""
+        for position in range(len(self._offsets) - 1):
+            yield self.document(position)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import UploadFile
+
+from app.config import templates
+from app.utils.metrics import metrics
+
+# --- Uploads em Fluxo ---
+
+# Ler o arquivo inteiro com `await file.read()` não impõe limite algum: vários
+# PDFs grandes simultâneos somam centenas de MB no worker. Aqui o upload é lido
+# em blocos de tamanho fixo, o tamanho é verificado a cada bloco (abortando
+# assim que o limite é excedido) e o hash SHA-256 do conteúdo é calculado
+# durante a leitura, servindo de chave para caches de extração sem uma segunda
+# passada. O conteúdo fica em memória e é extraído com `extract_text_from_bytes`,
+# sem arquivo temporário (no Cloud Run o /tmp também ocupa RAM).
+
+# Mesmo limite anunciado na tela de upload.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Folga para os cabeçalhos do multipart e campos do formulário, usada ao
+# comparar o Content-Length da requisição inteira com o limite do arquivo.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_PATHS = ("/api/process-email",)
+
+
+class UploadTooLargeError(ValueError):
+    """Lançado quando o arquivo enviado excede o tamanho máximo permitido."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class UploadedContent:
+    """Conteúdo de um upload, com tamanho e hash calculados na leitura."""
+
+    data: bytes
+    size: int
+    sha256: str
+
+
+def format_size_limit(max_bytes: int) -> str:
+    return f"{max_bytes / (1024 * 1024):.0f} MB"
+
+
+async def read_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> UploadedContent:
+    """
+    Lê o upload em blocos limitados, calculando o hash SHA-256 no caminho.
+
+    Args:
+        file: O arquivo recebido pelo endpoint.
+        max_bytes: Tamanho máximo aceito (padrão: MAX_UPLOAD_BYTES).
+        chunk_size: Tamanho de cada bloco lido.
+
+    Returns:
+        Um UploadedContent com os bytes do arquivo.
+
+    Raises:
+        UploadTooLargeError: Se o upload exceder `max_bytes`; a leitura é
+            interrompida no primeiro bloco acima do limite.
+    """
+    if max_bytes is None:
+        max_bytes = MAX_UPLOAD_BYTES
+
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while chunk := await file.read(chunk_size):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(
+                f"O arquivo excede o limite de {format_size_limit(max_bytes)}."
+            )
+        digest.update(chunk)
+        chunks.append(chunk)
+
+    metrics.increment("uploads.bytes", size)
+    return UploadedContent(b"".join(chunks), size, digest.hexdigest())
+
+
+# --- Rejeição Antecipada ---
+
+# O Starlette lê e interpreta todo o corpo multipart antes de chamar o endpoint.
+# Quando o cliente informa um Content-Length acima do limite, o middleware
+# responde 413 imediatamente, sem consumir o corpo. Uploads sem Content-Length
+# (chunked) continuam protegidos pelo limite aplicado em `read_upload`.
+
+
+class UploadSizeLimitMiddleware:
+    """Middleware ASGI que rejeita com 413 uploads declaradamente grandes."""
+
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in UPLOAD_PATHS:
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if (
+                content_length is not None
+                and content_length.isdigit()
+                and int(content_length) > self.max_bytes + MULTIPART_OVERHEAD_BYTES
+            ):
+                metrics.increment("uploads.rejected")
+                await self._reject(send)
+                return
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send) -> None:
+        limit = format_size_limit(self.max_bytes)
+        body = (
+            templates.get_template("partials/error_display.html")
+            .render({"error_message": f"O arquivo excede o limite de {limit}."})
+            .encode("utf-8")
+        )
+        toast = {
+            "toast": {
+                "type": "error",
+                "title": "Arquivo Muito Grande",
+                "description": f"Envie arquivos de até {limit}.",
+            }
+        }
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"text/html; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"hx-trigger", json.dumps(toast).encode("utf-8")),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
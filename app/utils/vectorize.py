@@ -0,0 +1,230 @@
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.utils.preprocess import TextPreprocessor
+
+# --- Vetorização por Hashing ---
+
+# Modelos locais (kNN, classificadores lineares) precisam de features numéricas.
+# O vetorizador por hashing mapeia cada unigrama/bigrama diretamente para uma
+# coluna via CRC32, sem construir nem guardar um vocabulário: o custo de memória
+# é fixo e lotes diferentes (ou processos diferentes) produzem colunas
+# compatíveis. O resultado é uma matriz esparsa no formato CSR (indices, indptr,
+# data) montada com operações vetorizadas do NumPy.
+
+DEFAULT_N_FEATURES = 2**20
+
+# Mesmas etapas usadas antes da classificação, com entidades normalizadas para
+# que valores e datas diferentes caiam na mesma feature.
+DEFAULT_PREPROCESS_OPTIONS: Dict[str, bool] = {
+    "remove_stopwords": True,
+    "lemmatize": True,
+    "normalize_entities": True,
+}
+
+
+@dataclass(frozen=True)
+class CSRMatrix:
+    """Matriz esparsa em formato CSR (linhas comprimidas)."""
+
+    data: np.ndarray
+    indices: np.ndarray
+    indptr: np.ndarray
+    shape: Tuple[int, int]
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def row(self, position: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (indices, data) da linha informada."""
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def toarray(self) -> np.ndarray:
+        """Converte para uma matriz densa (use apenas com `n_features` pequeno)."""
+        dense = np.zeros(self.shape, dtype=self.data.dtype)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        dense[rows, self.indices] = self.data
+        return dense
+
+
+def _row_ids(indptr: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _l2_normalize(matrix: CSRMatrix) -> CSRMatrix:
+    if not matrix.nnz:
+        return matrix
+    squares = np.bincount(
+        _row_ids(matrix.indptr), weights=matrix.data**2, minlength=matrix.shape[0]
+    )
+    norms = np.sqrt(squares)
+    norms[norms == 0] = 1.0
+    data = matrix.data / np.repeat(norms, np.diff(matrix.indptr)).astype(
+        matrix.data.dtype
+    )
+    return CSRMatrix(data, matrix.indices, matrix.indptr, matrix.shape)
+
+
+class HashingVectorizer:
+    """
+    Converte lotes de e-mails em matrizes esparsas de unigramas e bigramas.
+
+    Args:
+        n_features: Número de colunas (potência de 2 recomendada).
+        ngram_range: Tamanhos mínimo e máximo dos n-gramas (1 ou 2).
+        alternate_sign: Se True, usa um bit do hash como sinal, o que faz as
+            colisões se cancelarem em média em vez de se acumularem.
+        norm: "l2" para normalizar cada linha, ou None.
+        preprocess_options: Opções de `TextPreprocessor.process` aplicadas
+            antes da tokenização.
+    """
+
+    def __init__(
+        self,
+        n_features: int = DEFAULT_N_FEATURES,
+        ngram_range: Tuple[int, int] = (1, 2),
+        alternate_sign: bool = True,
+        norm: Optional[str] = "l2",
+        preprocess_options: Optional[Dict[str, bool]] = None,
+    ):
+        if not 0 < n_features <= 2**31:
+            raise ValueError("n_features deve estar entre 1 e 2**31.")
+        if not 1 <= ngram_range[0] <= ngram_range[1] <= 2:
+            raise ValueError("ngram_range suporta apenas unigramas e bigramas.")
+        if norm not in ("l2", None):
+            raise ValueError(f"Normalização não suportada: {norm}")
+
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.alternate_sign = alternate_sign
+        self.norm = norm
+        options = dict(DEFAULT_PREPROCESS_OPTIONS)
+        options.update(preprocess_options or {})
+        self._pipeline = TextPreprocessor().compile(tokenize=True, **options)
+        self.idf: Optional[np.ndarray] = None
+
+    # --- Extração de Features ---
+
+    def _ngrams(self, tokens: Sequence[str]) -> List[str]:
+        low, high = self.ngram_range
+        features: List[str] = list(tokens) if low == 1 else []
+        if high == 2:
+            features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def _hash_counts(self, token_lists: Iterable[Sequence[str]]) -> CSRMatrix:
+        # Os hashes vão direto para um array compacto; nenhuma estrutura guarda
+        # as features em si.
+        codes = array("I")
+        lengths: List[int] = []
+        for tokens in token_lists:
+            features = self._ngrams(tokens)
+            codes.extend(zlib.crc32(feature.encode("utf-8")) for feature in features)
+            lengths.append(len(features))
+
+        n_rows = len(lengths)
+        if not codes:
+            return CSRMatrix(
+                np.zeros(0, dtype=np.float32),
+                np.zeros(0, dtype=np.int32),
+                np.zeros(n_rows + 1, dtype=np.int64),
+                (n_rows, self.n_features),
+            )
+
+        hashed = np.frombuffer(codes, dtype=np.uint32)
+        columns = (hashed % np.uint32(self.n_features)).astype(np.int64)
+        if self.alternate_sign:
+            signs = np.where(hashed & np.uint32(0x80000000), -1.0, 1.0)
+        else:
+            signs = np.ones(len(hashed))
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), lengths)
+
+        # Soma features repetidas na mesma linha (chave = linha * n_features + coluna).
+        keys, inverse = np.unique(rows * self.n_features + columns, return_inverse=True)
+        values = np.bincount(inverse.ravel(), weights=signs)
+        nonzero = values != 0
+        keys, values = keys[nonzero], values[nonzero]
+
+        key_rows = keys // self.n_features
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(key_rows, minlength=n_rows), out=indptr[1:])
+        return CSRMatrix(
+            values.astype(np.float32),
+            (keys % self.n_features).astype(np.int32),
+            indptr,
+            (n_rows, self.n_features),
+        )
+
+    def transform_tokens(
+        self, token_lists: Iterable[Sequence[str]], dense: bool = False
+    ) -> Union[CSRMatrix, np.ndarray]:
+        """Vetoriza listas de tokens já pré-processadas."""
+        matrix = self._hash_counts(token_lists)
+        if self.idf is not None and matrix.nnz:
+            matrix = CSRMatrix(
+                matrix.data * self.idf[matrix.indices],
+                matrix.indices,
+                matrix.indptr,
+                matrix.shape,
+            )
+        if self.norm == "l2":
+            matrix = _l2_normalize(matrix)
+        return matrix.toarray() if dense else matrix
+
+    def transform(
+        self, texts: Iterable[str], dense: bool = False
+    ) -> Union[CSRMatrix, np.ndarray]:
+        """
+        Vetoriza um lote de textos brutos.
+
+        Args:
+            texts: Os textos dos e-mails.
+            dense: Se True, retorna um np.ndarray denso em vez de CSRMatrix.
+
+        Returns:
+            Uma CSRMatrix (float32) de formato (len(texts), n_features).
+        """
+        return self.transform_tokens((self._pipeline(text) for text in texts), dense)
+
+    # --- Pesos TF-IDF ---
+
+    def fit_idf(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Calcula os pesos IDF (suavizados) a partir de um corpus e passa a
+        aplicá-los em `transform`. Os pesos ficam em um np.ndarray float32 de
+        tamanho `n_features`.
+        """
+        counts = self._hash_counts(self._pipeline(text) for text in texts)
+        # Cada coluna aparece no máximo uma vez por linha: bincount das colunas
+        # não nulas = frequência de documentos. Colunas em que features de
+        # sinais opostos se cancelaram não contam para o documento.
+        document_frequency = np.bincount(
+            counts.indices[counts.data != 0], minlength=self.n_features
+        )
+        n_documents = counts.shape[0]
+        self.idf = (np.log((1 + n_documents) / (1 + document_frequency)) + 1).astype(
+            np.float32
+        )
+        return self.idf
+
+    def save_idf(self, path: str) -> None:
+        if self.idf is None:
+            raise ValueError("Nenhum peso IDF calculado; use fit_idf primeiro.")
+        np.save(path, self.idf)
+
+    def load_idf(self, path: str) -> None:
+        idf = np.load(path)
+        if idf.shape != (self.n_features,):
+            raise ValueError(
+                f"Pesos IDF com formato {idf.shape}; esperado ({self.n_features},)."
+            )
+        self.idf = idf.astype(np.float32, copy=False)
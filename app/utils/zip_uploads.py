@@ -0,0 +1,253 @@
+import asyncio
+import io
+import logging
+import os
+import posixpath
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.utils.metrics import metrics
+from app.utils.uploads import MAX_UPLOAD_BYTES
+
+# --- Uploads de Arquivos ZIP ---
+
+# Um ZIP com vários e-mails exportados (ou PDFs) é lido direto da memória, sem
+# extrair nada em disco: cada entrada só é descompactada quando há vaga entre as
+# ZIP_CONCURRENCY processadas ao mesmo tempo, e os resultados são acumulados em
+# um ZipJob que a página consulta periodicamente (HTMX), recebendo apenas os
+# itens novos a cada consulta.
+#
+# Proteções contra "zip bombs", verificadas antes de qualquer descompactação:
+#
+#   - no máximo ZIP_MAX_ENTRIES arquivos;
+#   - soma dos tamanhos declarados até ZIP_MAX_TOTAL_BYTES;
+#   - taxa de compressão total até ZIP_MAX_COMPRESSION_RATIO.
+#
+# Como os tamanhos declarados podem ser falsos, cada entrada também é lida em
+# blocos e abortada ao passar de ZIP_MAX_ENTRY_BYTES bytes descompactados (o
+# zipfile não lê além do tamanho declarado; um valor falso falha no CRC).
+# ZIPs aninhados, entradas criptografadas e outros formatos são ignorados.
+
+ZIP_MAX_ENTRIES = int(os.getenv("ZIP_MAX_ENTRIES", "100"))
+ZIP_MAX_ENTRY_BYTES = int(os.getenv("ZIP_MAX_ENTRY_BYTES", str(MAX_UPLOAD_BYTES)))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(50 * 1024 * 1024)))
+ZIP_MAX_COMPRESSION_RATIO = float(os.getenv("ZIP_MAX_COMPRESSION_RATIO", "100"))
+ZIP_CONCURRENCY = int(os.getenv("ZIP_CONCURRENCY", "4"))
+
+# Jobs são descartados depois deste tempo, contado a partir da conclusão.
+ZIP_JOB_TTL_SECONDS = int(os.getenv("ZIP_JOB_TTL_SECONDS", "900"))
+
+ZIP_SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".eml")
+ZIP_MIME_TYPES = ("application/zip", "application/x-zip-compressed")
+
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Exibida no lugar de erros inesperados, cujo texto (SDKs, caminhos internos)
+# não deve chegar à página; o erro completo vai para o log.
+ZIP_ENTRY_GENERIC_ERROR = "Não foi possível processar este arquivo."
+
+logger = logging.getLogger(__name__)
+
+
+class ZipArchiveError(ValueError):
+    """Lançado quando o ZIP é inválido ou ultrapassa os limites de segurança."""
+
+    pass
+
+
+def is_zip_upload(filename: Optional[str], mime_type: Optional[str] = None) -> bool:
+    """True quando o upload deve ser tratado como um arquivo ZIP."""
+    return (filename or "").lower().endswith(".zip") or mime_type in ZIP_MIME_TYPES
+
+
+def _is_supported(info: zipfile.ZipInfo) -> bool:
+    name = info.filename
+    basename = posixpath.basename(name)
+    return (
+        not info.is_dir()
+        and not basename.startswith(".")
+        and not name.startswith("__MACOSX/")
+        and not info.flag_bits & 0x1  # criptografada
+        and basename.lower().endswith(ZIP_SUPPORTED_EXTENSIONS)
+    )
+
+
+def open_zip_archive(
+    data: bytes,
+    max_entries: int = ZIP_MAX_ENTRIES,
+    max_total_bytes: int = ZIP_MAX_TOTAL_BYTES,
+    max_ratio: float = ZIP_MAX_COMPRESSION_RATIO,
+) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """
+    Abre um ZIP em memória e valida o diretório central.
+
+    Args:
+        data: Os bytes do arquivo ZIP.
+        max_entries: Número máximo de arquivos no ZIP.
+        max_total_bytes: Soma máxima dos tamanhos descompactados declarados.
+        max_ratio: Taxa máxima entre tamanho descompactado e compactado.
+
+    Returns:
+        O ZipFile aberto e as entradas suportadas (.txt, .pdf, .eml).
+
+    Raises:
+        ZipArchiveError: Se o ZIP for inválido, exceder algum limite ou não
+            tiver nenhuma entrada suportada.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+        raise ZipArchiveError(f"Arquivo ZIP inválido: {e}") from e
+
+    try:
+        files = [info for info in archive.infolist() if not info.is_dir()]
+        if len(files) > max_entries:
+            raise ZipArchiveError(
+                f"O ZIP tem {len(files)} arquivos; o máximo é {max_entries}."
+            )
+        total_size = sum(info.file_size for info in files)
+        compressed_size = sum(info.compress_size for info in files)
+        if total_size > max_total_bytes:
+            raise ZipArchiveError(
+                "O conteúdo descompactado do ZIP excede "
+                f"{max_total_bytes / (1024 * 1024):.0f} MB."
+            )
+        if total_size > max_ratio * max(compressed_size, 1):
+            raise ZipArchiveError("Taxa de compressão suspeita no arquivo ZIP.")
+
+        entries = [info for info in files if _is_supported(info)]
+        if not entries:
+            raise ZipArchiveError(
+                "O ZIP não contém arquivos "
+                f"{', '.join(ZIP_SUPPORTED_EXTENSIONS)} legíveis."
+            )
+    except ZipArchiveError:
+        archive.close()
+        metrics.increment("zip.rejected")
+        raise
+    return archive, entries
+
+
+def read_zip_entry(
+    archive: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    max_bytes: int = ZIP_MAX_ENTRY_BYTES,
+) -> bytes:
+    """
+    Descompacta uma entrada em blocos, abortando acima de `max_bytes`.
+
+    Raises:
+        ZipArchiveError: Se a entrada for maior que o limite ou estiver
+            corrompida.
+    """
+    if info.file_size > max_bytes:
+        raise ZipArchiveError(
+            f"Arquivo maior que o limite de {max_bytes / (1024 * 1024):.0f} MB."
+        )
+    chunks = []
+    size = 0
+    try:
+        with archive.open(info) as entry:
+            while chunk := entry.read(_READ_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ZipArchiveError(
+                        "Arquivo maior que o limite de "
+                        f"{max_bytes / (1024 * 1024):.0f} MB."
+                    )
+                chunks.append(chunk)
+    except (zipfile.BadZipFile, EOFError, OSError) as e:
+        raise ZipArchiveError(f"Entrada corrompida: {e}") from e
+    return b"".join(chunks)
+
+
+# --- Jobs de Processamento ---
+
+# Processa uma entrada (nome, bytes) e retorna o item exibido na página.
+EntryProcessor = Callable[[str, bytes], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class ZipJob:
+    """Progresso de um ZIP: os resultados são acrescentados conforme terminam."""
+
+    id: str
+    total: int
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    task: Optional["asyncio.Task[None]"] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) >= self.total
+
+
+_jobs: Dict[str, ZipJob] = {}
+
+
+async def _run_zip_job(
+    job: ZipJob,
+    archive: zipfile.ZipFile,
+    entries: List[zipfile.ZipInfo],
+    process_entry: EntryProcessor,
+    concurrency: int,
+) -> None:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def handle(info: zipfile.ZipInfo) -> None:
+        async with semaphore:
+            try:
+                data = await asyncio.to_thread(read_zip_entry, archive, info)
+                result = await process_entry(info.filename, data)
+            except ZipArchiveError as e:
+                result = {"filename": info.filename, "error": str(e)}
+            except Exception:
+                logger.exception("Falha ao processar %s do ZIP", info.filename)
+                result = {"filename": info.filename, "error": ZIP_ENTRY_GENERIC_ERROR}
+        metrics.increment("zip.entries")
+        job.results.append(result)
+
+    try:
+        await asyncio.gather(*(handle(info) for info in entries))
+    finally:
+        archive.close()
+        job.finished_at = time.monotonic()
+
+
+def _prune_jobs() -> None:
+    now = time.monotonic()
+    for job_id, job in list(_jobs.items()):
+        # Conta a partir do fim: ZIPs demorados não somem antes da última consulta
+        if job.finished_at is not None and now - job.finished_at > ZIP_JOB_TTL_SECONDS:
+            del _jobs[job_id]
+
+
+def start_zip_job(
+    data: bytes,
+    process_entry: EntryProcessor,
+    concurrency: int = ZIP_CONCURRENCY,
+) -> ZipJob:
+    """
+    Valida o ZIP e inicia o processamento das entradas em segundo plano.
+
+    Deve ser chamada dentro do event loop (no endpoint).
+
+    Raises:
+        ZipArchiveError: Se o ZIP for rejeitado por `open_zip_archive`.
+    """
+    archive, entries = open_zip_archive(data)
+    _prune_jobs()
+    job = ZipJob(id=uuid.uuid4().hex, total=len(entries))
+    _jobs[job.id] = job
+    job.task = asyncio.get_running_loop().create_task(
+        _run_zip_job(job, archive, entries, process_entry, concurrency)
+    )
+    return job
+
+
+def get_zip_job(job_id: str) -> Optional[ZipJob]:
+    return _jobs.get(job_id)
@@ -0,0 +1,110 @@
+"""
+Mede a conversão de HTML em texto: a cadeia de expressões regulares anterior
+(script/style, tags, entidades) contra o HTMLTextExtractor de uma passada, em
+tempo e em tokens estimados do texto resultante.
+
+Sem argumentos, usa newsletters sintéticas no formato típico de e-mail marketing
+(tabelas aninhadas, estilos inline, preheader oculto, pixels de rastreamento).
+Arquivos .html reais podem ser passados com --file.
+
+Uso:
+    uv run python -m benchmarks.bench_html
+    uv run python -m benchmarks.bench_html --file newsletter1.html newsletter2.html
+"""
+
+import argparse
+import html
+import re
+import timeit
+from typing import Dict
+
+from app.utils.compaction import estimate_tokens
+from app.utils.text_extractor import html_to_text
+
+HEAD = """<!DOCTYPE html><html><head><meta charset="utf-8">
+<title>Ofertas da Semana</title>
+<style type="text/css">
+  body { margin: 0; padding: 0; } table { border-collapse: collapse; }
+  @media only screen and (max-width: 600px) { .col { width: 100% !important; } }
+</style></head><body style="margin:0;padding:0;background:#f4f4f4">
+<div style="display:none;max-height:0;overflow:hidden;mso-hide:all">
+  Aproveite descontos de até 70% em toda a loja &#8199;&#65279;&#847; &#8199;&#65279;&#847;
+</div>
+"""
+PRODUCT = """<table role="presentation" width="100%" cellpadding="0" cellspacing="0">
+<tr><td class="col" style="padding:12px;font-family:Arial,sans-serif;font-size:14px">
+  <a href="https://click.example.com/track?u=123&amp;id=456"><img src="https://cdn.example.com/p.jpg" alt="Produto" width="180"></a>
+</td><td class="col" style="padding:12px;font-family:Arial,sans-serif;font-size:14px;color:#333">
+  <h2 style="margin:0 0 8px 0">Cadeira Ergonômica Pro</h2>
+  <p style="margin:0">De <s>R$ 1.299,00</s> por <strong>R$ 899,00</strong> &mdash; frete grátis.</p>
+  <p><a href="https://click.example.com/track?u=123&amp;id=789" style="color:#0a66c2">Compre agora &raquo;</a></p>
+</td></tr></table>
+"""
+FOOTER = """<table width="100%"><tr><td style="font-size:11px;color:#999;padding:20px">
+<p>Você recebeu este e-mail porque se cadastrou em nossa loja.</p>
+<p><a href="https://example.com/unsubscribe">Descadastrar</a> | <a href="https://example.com/prefs">Preferências</a></p>
+<img src="https://t.example.com/open.gif" width="1" height="1" style="display:block">
+</td></tr></table>
+<script>window.dataLayer = window.dataLayer || []; dataLayer.push({event: 'open'});</script>
+</body></html>
+"""
+
+
+def _regex_clean(content: str) -> str:
+    """Referência: a implementação anterior de `_clean_html`."""
+    clean_text = re.sub(r"(?is)<(script|style).*?>.*?</\1>", "", content)
+    clean_text = re.sub(r"<[^>]+>", "", clean_text)
+    return html.unescape(clean_text).strip()
+
+
+def _newsletter(products: int) -> str:
+    return HEAD + PRODUCT * products + FOOTER
+
+
+def _malformed(products: int) -> str:
+    """
+    Newsletter com <style> sem fechamento repetido: a regex volta atrás a cada
+    ocorrência. O parser, como o navegador, trata o resto como CSS e o ignora.
+    """
+    return HEAD + (PRODUCT + "<style>") * products + FOOTER.replace("</script>", "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", nargs="+", default=[])
+    args = parser.parse_args()
+
+    documents: Dict[str, str] = {}
+    for path in args.file:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            documents[path] = f.read()
+    if not documents:
+        documents = {
+            "newsletter 10 itens": _newsletter(10),
+            "newsletter 200 itens": _newsletter(200),
+            # A regex é superlinear aqui: 40 itens já levam segundos.
+            "malformada 20 itens": _malformed(20),
+        }
+
+    print(
+        f"{'documento':>22} {'KB':>6} {'regex (ms)':>11} {'parser (ms)':>12} "
+        f"{'tokens regex':>13} {'tokens parser':>14}"
+    )
+    for label, document in documents.items():
+        number = max(1, 200_000 // len(document))
+        regex = min(
+            timeit.repeat(lambda: _regex_clean(document), number=number, repeat=3)
+        )
+        parsed = min(
+            timeit.repeat(lambda: html_to_text(document), number=number, repeat=3)
+        )
+        print(
+            f"{label[-22:]:>22} {len(document) / 1024:>6.0f} "
+            f"{regex / number * 1000:>11.2f} {parsed / number * 1000:>12.2f} "
+            f"{estimate_tokens(_regex_clean(document)):>13} "
+            f"{estimate_tokens(html_to_text(document)):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Mede construção, gravação/carga e consulta do índice vetorial do kNN com 10
+mil, 100 mil e 1 milhão de vetores, com busca exata e com partições IVF.
+
+Uso:
+    uv run python -m benchmarks.bench_knn
+    uv run python -m benchmarks.bench_knn --sizes 10000 100000 --dim 128
+
+Com 1 milhão de vetores de 256 dimensões o índice ocupa ~1 GB de memória.
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.knn_classifier import VectorIndex
+from app.tools.build_knn_index import BATCH_SIZE
+
+QUERY_BATCH = 256
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def bench(size: int, dim: int, nprobe: int) -> None:
+    rng = np.random.default_rng(0)
+    # E-mails reais formam famílias de mensagens parecidas: vetores em torno de
+    # alguns milhares de "modelos".
+    templates = rng.normal(size=(2_000, dim))
+    vectors = (
+        templates[rng.integers(len(templates), size=size)]
+        + rng.normal(scale=0.5, size=(size, dim))
+    ).astype(np.float32)
+    labels = np.where(rng.random(size) < 0.5, "Produtivo", "Improdutivo")
+    # Consultas próximas de vetores existentes, como e-mails quase duplicados.
+    queries = vectors[:QUERY_BATCH] + rng.normal(scale=0.1, size=(QUERY_BATCH, dim))
+
+    index = VectorIndex(dim)
+
+    def add_in_batches():
+        # Mesmo caminho de `build_knn_index`: um `add` a cada BATCH_SIZE e-mails
+        for start in range(0, size, BATCH_SIZE):
+            stop = start + BATCH_SIZE
+            index.add(vectors[start:stop], labels[start:stop])
+        return index.vectors
+
+    _, add_time = _timed(add_in_batches)
+    (_, exact_ids), exact_time = _timed(lambda: index.search(queries, k=10))
+    _, ivf_build_time = _timed(index.build_ivf)
+    (_, ivf_ids), ivf_time = _timed(lambda: index.search(queries, k=10, nprobe=nprobe))
+    recall = np.mean(exact_ids[:, 0] == ivf_ids[:, 0])
+
+    with tempfile.TemporaryDirectory() as directory:
+        _, save_time = _timed(lambda: index.save(directory))
+        _, load_time = _timed(lambda: VectorIndex.load(directory))
+
+    per_query = 1000 / QUERY_BATCH
+    print(
+        f"{size:>9} {add_time:>8.2f}s {ivf_build_time:>8.2f}s {save_time:>7.2f}s "
+        f"{load_time:>7.3f}s {exact_time * per_query:>10.3f} "
+        f"{ivf_time * per_query:>10.3f} {recall:>9.2%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    print(
+        f"{'vetores':>9} {'add':>9} {'ivf':>9} {'save':>8} {'load':>8} "
+        f"{'exata ms/q':>10} {'ivf ms/q':>10} {'recall@1':>9}"
+    )
+    for size in args.sizes:
+        bench(size, args.dim, args.nprobe)
+
+
+if __name__ == "__main__":
+    main()
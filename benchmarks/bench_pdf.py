@@ -0,0 +1,110 @@
+"""
+Mede a extração de PDFs em PDFs sintéticos gerados com reportlab: pdfminer
+padrão (todas as páginas, layout completo) contra o modo rápido, a parada
+antecipada por páginas/caracteres e a divisão de páginas entre processos.
+
+Uso:
+    uv run python -m benchmarks.bench_pdf
+    uv run python -m benchmarks.bench_pdf --pages 10 50 --workers 4
+"""
+
+import argparse
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List
+
+from pdfminer.high_level import extract_text as pdfminer_extract_text
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from app.utils.text_extractor import extract_pdf_text
+
+PARAGRAPH = (
+    "Prezados, segue em anexo a fatura 4471 referente ao contrato de prestação "
+    "de serviços. O pagamento de R$ 1.234,56 vence em 15/03/2026 e pode ser "
+    "feito por boleto ou transferência. Em caso de dúvidas, estamos à disposição."
+)
+
+
+def _make_pdf(pages: int) -> bytes:
+    """Gera um PDF com `pages` páginas de texto corrido."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    words = PARAGRAPH.split()
+    lines = [" ".join(words[i : i + 12]) for i in range(0, len(words), 12)]
+    for page in range(pages):
+        text = pdf.beginText(50, 800)
+        text.setFont("Helvetica", 9)
+        text.textLine(f"Página {page + 1}")
+        for _ in range(18):
+            for line in lines:
+                text.textLine(line)
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _best_of(func: Callable[[], str], repeat: int) -> float:
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-chars", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Aquece os processos (importações) antes de medir.
+        list(executor.map(abs, range(args.workers)))
+
+        for pages in args.pages:
+            data = _make_pdf(pages)
+            variants = {
+                "pdfminer padrão": lambda: pdfminer_extract_text(io.BytesIO(data)),
+                "layout": lambda: extract_pdf_text(data, fast=False, max_chars=0),
+                "rápido": lambda: extract_pdf_text(data, fast=True, max_chars=0),
+                f"rápido, {args.max_chars} chars": lambda: extract_pdf_text(
+                    data, fast=True, max_chars=args.max_chars
+                ),
+                "rápido, 3 páginas": lambda: extract_pdf_text(
+                    data, fast=True, max_pages=3, max_chars=0
+                ),
+                f"layout, {args.workers} processos": lambda: extract_pdf_text(
+                    data,
+                    fast=False,
+                    max_chars=0,
+                    executor=executor,
+                    workers=args.workers,
+                ),
+                f"rápido, {args.workers} processos": lambda: extract_pdf_text(
+                    data,
+                    fast=True,
+                    max_chars=0,
+                    executor=executor,
+                    workers=args.workers,
+                ),
+            }
+
+            print(f"\n{pages} páginas ({len(data) / 1024:.0f} KB)")
+            print(f"{'modo':>28} {'tempo (ms)':>11} {'ganho':>7}")
+            baseline = None
+            for label, func in variants.items():
+                elapsed = _best_of(func, args.repeat)
+                baseline = baseline or elapsed
+                print(
+                    f"{label:>28} {elapsed * 1000:>11.1f} {baseline / elapsed:>6.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
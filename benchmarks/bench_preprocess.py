@@ -0,0 +1,92 @@
+"""
+Compara o pré-processamento passada a passada (`TextPreprocessor.process`) com
+o pipeline compilado (`TextPreprocessor.compile`) em textos de 1 KB, 100 KB e
+10 MB, e a conversão para minúsculas em textos com milhares de tags.
+
+Uso:
+    uv run python -m benchmarks.bench_preprocess
+"""
+
+import re
+import timeit
+
+from app.utils.preprocess import TextPreprocessor, _to_lowercase
+
+OPTIONS = dict(remove_stopwords=True, lemmatize=True, normalize_numbers=True)
+
+SAMPLE = (
+    "Prezados,\tsegue em anexo a FATURA nº 4471 no valor de R$ 1.500,00 "
+    "referente aos serviços de março.   Poderiam confirmar o pagamento até "
+    "o dia 15/04? Os relatórios e as planilhas estão na pasta.\n"
+)
+SIZES = {"1 KB": 1024, "100 KB": 100 * 1024, "10 MB": 10 * 1024 * 1024}
+TAG_COUNTS = [1_000, 5_000, 20_000]
+TAG_SAMPLE = "<td CLASS='valor'>R$ 1.500,00</td> Linha DA Tabela "
+
+
+def _make_text(size: int) -> str:
+    return (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+
+
+def _placeholder_lowercase(text: str) -> str:
+    """Implementação anterior de `_to_lowercase`, com placeholders (referência)."""
+    special_tokens = re.findall(r"<[^>]+>\%?", text)
+    placeholders = [f"__PLACEHOLDER_{i}__" for i, _ in enumerate(special_tokens)]
+    for token, placeholder in zip(special_tokens, placeholders):
+        text = text.replace(token, placeholder, 1)
+    text = text.lower()
+    for token, placeholder in zip(special_tokens, placeholders):
+        text = text.replace(placeholder.lower(), token, 1)
+    return text
+
+
+def bench_lowercase() -> None:
+    print(f"\n{'tags':>8} {'placeholders (ms)':>18} {'spans (ms)':>11} {'ganho':>7}")
+    for count in TAG_COUNTS:
+        text = TAG_SAMPLE * (count // 2)
+        assert _to_lowercase(text) == _placeholder_lowercase(text)
+        baseline = min(
+            timeit.repeat(lambda: _placeholder_lowercase(text), number=1, repeat=3)
+        )
+        spans = min(timeit.repeat(lambda: _to_lowercase(text), number=1, repeat=3))
+        print(
+            f"{count:>8} {baseline * 1000:>18.3f} {spans * 1000:>11.3f} "
+            f"{baseline / spans:>6.2f}x"
+        )
+
+
+def bench_pipeline() -> None:
+    preprocessor = TextPreprocessor()
+    pipeline = preprocessor.compile(**OPTIONS)
+
+    print(f"{'tamanho':>8} {'passadas (ms)':>14} {'compilado (ms)':>15} {'ganho':>7}")
+    for label, size in SIZES.items():
+        text = _make_text(size)
+        assert pipeline(text) == preprocessor.process(text, **OPTIONS)
+        number = max(1, 2_000_000 // size)
+        baseline = (
+            min(
+                timeit.repeat(
+                    lambda: preprocessor.process(text, **OPTIONS),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            / number
+        )
+        compiled = (
+            min(timeit.repeat(lambda: pipeline(text), number=number, repeat=3)) / number
+        )
+        print(
+            f"{label:>8} {baseline * 1000:>14.3f} {compiled * 1000:>15.3f} "
+            f"{baseline / compiled:>6.2f}x"
+        )
+
+
+def main() -> None:
+    bench_pipeline()
+    bench_lowercase()
+
+
+if __name__ == "__main__":
+    main()
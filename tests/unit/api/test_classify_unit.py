@@ -1,7 +1,16 @@
+import asyncio
+import io
+import re
+import threading
+import time
+import zipfile
+
 import pytest
 from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services.classifier import InvalidClassificationResponseError
+from app.utils.boilerplate import BoilerplateResult
 
 # Mock da resposta dos serviços para os testes unitários
 MOCK_CLASSIFICATION = {
@@ -44,7 +53,7 @@ def test_process_email_with_text_input_success(
     mock_generate.assert_called_once()
 
 
-@patch("app.api.classify.extract_text", return_value="Texto do arquivo.")
+@patch("app.api.classify.extract_text_from_upload", return_value="Texto do arquivo.")
 @patch("app.api.classify.preprocess_text", return_value="Texto pré-processado.")
 @patch("app.api.classify.classify_email", return_value=MOCK_CLASSIFICATION)
 @patch("app.api.classify.generate_response", return_value=MOCK_RESPONSE)
@@ -95,3 +104,217 @@ def test_process_email_handles_service_exception(mock_classify, client):
     response = client.post("/api/process-email", data={"email_content": "Olá"})
     assert response.status_code == 500
     assert "Ocorreu um erro inesperado" in response.text
+
+
+@patch("app.api.classify.extract_text", return_value="Texto extraído.")
+@patch("app.api.classify.try_classify_with_knn", return_value=MOCK_CLASSIFICATION)
+@patch("app.api.classify.classify_email")
+@patch("app.api.classify.generate_response", return_value=MOCK_RESPONSE)
+def test_process_email_skips_model_on_close_neighbor_match(
+    mock_generate, mock_classify, mock_knn, mock_extract, client
+):
+    """Verifica se um vizinho próximo confiável dispensa a chamada ao classificador."""
+    response = client.post("/api/process-email", data={"email_content": "Olá"})
+
+    assert response.status_code == 200
+    mock_knn.assert_called_once()
+    mock_classify.assert_not_called()
+
+
+@patch("app.api.classify.extract_text", return_value="Texto extraído.")
+@patch("app.api.classify.classify_email", return_value=MOCK_CLASSIFICATION)
+@patch("app.api.classify.generate_response", return_value=MOCK_RESPONSE)
+def test_process_email_classifies_outside_the_event_loop(
+    mock_generate, mock_classify, mock_extract, client
+):
+    """As chamadas bloqueantes ao Gemini rodam em uma thread, fora do loop."""
+    loop_threads, model_threads = [], []
+    to_thread = asyncio.to_thread
+
+    def classify(text):
+        model_threads.append(threading.current_thread())
+        return MOCK_CLASSIFICATION
+
+    async def spy_to_thread(func, *args):
+        loop_threads.append(threading.current_thread())
+        return await to_thread(func, *args)
+
+    mock_classify.side_effect = classify
+    with patch("app.api.classify.asyncio.to_thread", side_effect=spy_to_thread):
+        response = client.post("/api/process-email", data={"email_content": "Olá"})
+
+    assert response.status_code == 200
+    assert model_threads and loop_threads
+    assert model_threads[0] is not loop_threads[0]
+
+
+@patch("app.api.classify.extract_text", return_value="Atenciosamente,\nEquipe")
+@patch("app.api.classify.remove_boilerplate", return_value=BoilerplateResult("", 2, 0))
+@patch("app.api.classify.classify_email")
+def test_process_email_rejects_boilerplate_only_content(
+    mock_classify, mock_boilerplate, mock_extract, client
+):
+    """Um e-mail que é só assinatura fica vazio após a limpeza e não vai à IA."""
+    response = client.post("/api/process-email", data={"email_content": "Olá"})
+
+    assert response.status_code == 400
+    assert "O conteúdo do e-mail está vazio." in response.text
+    mock_classify.assert_not_called()
+
+
+@patch("app.api.classify.classify_email")
+@patch("app.api.classify.generate_response", return_value=MOCK_RESPONSE)
+def test_automated_eml_upload_skips_the_model(mock_generate, mock_classify, client):
+    """Cabeçalhos de envio em massa classificam o .eml sem chamar o Gemini."""
+    message = (
+        b"Subject: Newsletter de maio\r\n"
+        b"List-Unsubscribe: <https://example.com/sair>\r\n"
+        b"\r\n"
+        b"Confira as novidades da semana na nossa loja.\r\n"
+    )
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("news.eml", message, "message/rfc822")},
+    )
+
+    assert response.status_code == 200
+    assert "improdutivo" in response.text.lower()
+    mock_classify.assert_not_called()
+    assert mock_generate.call_args.args[1] == "Improdutivo"
+
+
+@patch("app.utils.uploads.MAX_UPLOAD_BYTES", 16)
+@patch("app.api.classify.extract_text_from_upload")
+def test_process_email_rejects_oversized_upload(mock_extract, client):
+    """Verifica se um arquivo acima do limite resulta em 413 sem extração."""
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("grande.txt", b"x" * 1024, "text/plain")},
+    )
+
+    assert response.status_code == 413
+    assert "excede o limite" in response.text
+    mock_extract.assert_not_called()
+
+
+def _zip_upload(files) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@patch("app.api.classify.extract_text_from_upload", return_value="Texto do arquivo.")
+@patch("app.api.classify.classify_email", return_value=MOCK_CLASSIFICATION)
+@patch("app.api.classify.generate_response", return_value=MOCK_RESPONSE)
+def test_process_email_streams_zip_results(
+    mock_generate, mock_classify, mock_extract, client
+):
+    """Verifica se um ZIP é processado em segundo plano e consultado aos poucos."""
+    data = _zip_upload({"a.txt": "Primeiro", "b.eml": "Subject: Oi\n\nSegundo"})
+
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("emails.zip", data, "application/zip")},
+    )
+
+    assert response.status_code == 200
+    job_id = re.search(r"/api/zip-jobs/(\w+)\?since=0", response.text).group(1)
+
+    since, items = 0, []
+    for _ in range(100):
+        poll = client.get(f"/api/zip-jobs/{job_id}", params={"since": since})
+        items += re.findall(r"<li ", poll.text)
+        match = re.search(r"since=(\d+)", poll.text)
+        if match is None:  # job concluído: o elemento para de consultar
+            break
+        since = int(match.group(1))
+        time.sleep(0.01)
+
+    assert "2 de 2 arquivos processados" in poll.text
+    assert len(items) == 2
+    assert mock_extract.call_count == 2
+    assert mock_classify.call_count == 2
+
+
+def _wait_for_zip_job(client, response) -> str:
+    job_id = re.search(r"/api/zip-jobs/(\w+)\?since=0", response.text).group(1)
+    html = ""
+    for _ in range(100):
+        poll = client.get(f"/api/zip-jobs/{job_id}")
+        html = poll.text
+        if "hx-get" not in html:
+            break
+        time.sleep(0.01)
+    return html
+
+
+@patch("app.api.classify.extract_text_from_upload", return_value="Texto do arquivo.")
+@patch(
+    "app.api.classify.classify_email",
+    side_effect=InvalidClassificationResponseError("categoria inválida"),
+)
+def test_zip_entries_show_known_ai_errors(mock_classify, mock_extract, client):
+    """Erros conhecidos da IA são exibidos como no endpoint de arquivo único."""
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("emails.zip", _zip_upload({"a.txt": "x"}), "application/zip")},
+    )
+
+    html = _wait_for_zip_job(client, response)
+    assert "Erro ao processar a resposta da IA: categoria inválida" in html
+
+
+@patch(
+    "app.api.classify.extract_text_from_upload",
+    side_effect=RuntimeError("/srv/app/credenciais.json"),
+)
+def test_zip_entries_hide_unexpected_errors(mock_extract, client):
+    """Erros inesperados viram uma mensagem genérica, sem o texto original."""
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("emails.zip", _zip_upload({"a.txt": "x"}), "application/zip")},
+    )
+
+    html = _wait_for_zip_job(client, response)
+    assert "Não foi possível processar este arquivo." in html
+    assert "credenciais" not in html
+
+
+def test_process_email_rejects_invalid_zip(client):
+    """Verifica se um ZIP sem arquivos suportados resulta em 400."""
+    data = _zip_upload({"foto.png": b"\x89PNG"})
+
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("fotos.zip", data, "application/zip")},
+    )
+
+    assert response.status_code == 400
+    assert "não contém" in response.text
+
+
+def test_zip_job_progress_for_unknown_job_stops_polling(client):
+    response = client.get("/api/zip-jobs/desconhecido")
+
+    assert response.status_code == 200
+    assert "expirou" in response.text
+    assert "hx-get" not in response.text
+
+
+@patch("app.api.classify.extract_text_from_upload", return_value="Atenciosamente")
+@patch("app.api.classify.remove_boilerplate", return_value=BoilerplateResult("", 1, 0))
+@patch("app.api.classify.classify_email")
+def test_zip_entries_report_boilerplate_only_content(
+    mock_classify, mock_boilerplate, mock_extract, client
+):
+    """Entradas que ficam vazias após a limpeza são exibidas como vazias."""
+    response = client.post(
+        "/api/process-email",
+        files={"file": ("emails.zip", _zip_upload({"a.txt": "x"}), "application/zip")},
+    )
+
+    html = _wait_for_zip_job(client, response)
+    assert "O conteúdo está vazio." in html
+    mock_classify.assert_not_called()
@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.metrics import metrics
+
+
+def test_metrics_endpoint_returns_counters():
+    """Verifica se o endpoint de métricas expõe os contadores do processo."""
+    metrics.reset()
+    metrics.increment("thread_strip.bytes_saved", 120)
+
+    with TestClient(app) as client:
+        response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.json()["thread_strip.bytes_saved"] == 120
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+from app.services.batch_classifier import (
+    BatchJobStatus,
+    BatchPredictionBackend,
+    BatchPredictionError,
+    LocalBatchBackend,
+    build_batch_request,
+    parse_batch_output,
+    run_batch_classification,
+    write_batch_input,
+)
+
+VALID = {"category": "Produtivo", "confidence": 0.8, "reason": "Pede suporte."}
+
+
+def _predict(prompt: str) -> str:
+    if "obrigado" in prompt:
+        return json.dumps({"category": "Talvez", "confidence": 0.5, "reason": "?"})
+    if "quebrado" in prompt:
+        return "isto não é JSON"
+    return json.dumps(VALID)
+
+
+def test_build_batch_request_uses_classifier_prompt():
+    line = build_batch_request("abc", "sistema fora do ar")
+
+    assert line["id"] == "abc"
+    prompt = line["request"]["contents"][0]["parts"][0]["text"]
+    assert "sistema fora do ar" in prompt
+    assert "<<<EMAIL_TEXT>>>" not in prompt
+    assert line["request"]["generationConfig"]["responseMimeType"] == (
+        "application/json"
+    )
+
+
+def test_run_batch_classification_with_local_backend(tmp_path):
+    backend = LocalBatchBackend(str(tmp_path / "jobs"), _predict, polls_until_done=3)
+    sleeps = []
+
+    results = run_batch_classification(
+        [("1", "sistema fora do ar"), ("2", "muito obrigado"), ("3", "quebrado")],
+        backend,
+        str(tmp_path),
+        poll_interval=5,
+        sleep=sleeps.append,
+    )
+
+    assert sleeps == [5, 5]
+    assert results["1"] == VALID
+    assert "category" in results["2"]["error"]
+    assert "inválida" in results["3"]["error"]
+
+
+def test_local_backend_records_prediction_failures(tmp_path):
+    def failing(prompt):
+        raise RuntimeError("cota excedida")
+
+    backend = LocalBatchBackend(str(tmp_path / "jobs"), failing)
+    results = run_batch_classification([("1", "texto")], backend, str(tmp_path))
+
+    assert results == {"1": {"error": "cota excedida"}}
+
+
+def test_parse_batch_output_matches_lines_without_id(tmp_path):
+    ids_by_prompt = write_batch_input([("1", "texto")], str(tmp_path / "in.jsonl"))
+    line = json.loads((tmp_path / "in.jsonl").read_text(encoding="utf-8"))
+    del line["id"]
+    text = json.dumps(VALID)
+    line["response"] = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+    assert parse_batch_output([line], ids_by_prompt) == {"1": VALID}
+
+
+def test_duplicate_prompts_without_id_share_the_result(tmp_path):
+    ids_by_prompt = write_batch_input(
+        [("1", "mesma newsletter"), ("2", "mesma newsletter")],
+        str(tmp_path / "in.jsonl"),
+    )
+    lines = (tmp_path / "in.jsonl").read_text(encoding="utf-8").splitlines()
+    # O backend devolveu apenas uma linha, sem o campo "id"
+    line = json.loads(lines[0])
+    del line["id"]
+    text = json.dumps(VALID)
+    line["response"] = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+    assert parse_batch_output([line], ids_by_prompt) == {"1": VALID, "2": VALID}
+
+
+class _StuckBackend(BatchPredictionBackend):
+    def __init__(self, state):
+        self.state = state
+
+    def submit(self, input_path):
+        return "job-1"
+
+    def poll(self, job_id):
+        return BatchJobStatus(self.state, error="recurso esgotado")
+
+    def read_output(self, status):
+        return iter(())
+
+
+def test_incomplete_backend_fails_at_construction():
+    class NoOutput(BatchPredictionBackend):
+        def submit(self, input_path):
+            return "job-1"
+
+        def poll(self, job_id):
+            return BatchJobStatus("succeeded")
+
+    with pytest.raises(TypeError):
+        NoOutput()
+
+
+def test_run_batch_classification_raises_on_failure_and_timeout(tmp_path):
+    with pytest.raises(BatchPredictionError, match="recurso esgotado"):
+        run_batch_classification(
+            [("1", "texto")], _StuckBackend("failed"), str(tmp_path)
+        )
+    with pytest.raises(BatchPredictionError, match="prazo"):
+        run_batch_classification(
+            [("1", "texto")],
+            _StuckBackend("running"),
+            str(tmp_path),
+            timeout=0,
+            sleep=lambda seconds: None,
+        )
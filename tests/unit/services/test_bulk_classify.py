@@ -0,0 +1,247 @@
+import json
+import mailbox
+import sqlite3
+from email.message import EmailMessage
+from unittest.mock import patch
+
+import pytest
+from app.services.batch_classifier import LocalBatchBackend
+from app.tools.bulk_classify import (
+    RateLimiter,
+    classify_message,
+    iter_mailbox,
+    main,
+    prepare_message,
+    run,
+    run_batch,
+)
+from app.utils.boilerplate import BoilerplateResult
+from app.utils.compaction import estimate_tokens
+from app.utils.email_parser import parse_email
+
+RESULT = {"category": "Produtivo", "confidence": 0.9, "reason": "Pedido de suporte."}
+
+
+def _message(n: int, body: str = None) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = f"Chamado {n}"
+    message["From"] = f"cliente{n}@example.com"
+    message.set_content(
+        body if body is not None else f"O sistema parou no pedido {n}, podem ajudar?"
+    )
+    return message
+
+
+@pytest.fixture
+def mbox_path(tmp_path):
+    path = tmp_path / "caixa.mbox"
+    box = mailbox.mbox(str(path))
+    for n in range(5):
+        box.add(_message(n))
+    box.add(_message(99, body=""))
+    box.flush()
+    box.close()
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def offline_pipeline():
+    with (
+        patch("app.tools.bulk_classify.try_classify_with_knn", return_value=None),
+        patch("app.tools.bulk_classify.classify_email", return_value=RESULT) as model,
+    ):
+        yield model
+
+
+def _read_jsonl(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def test_iter_mailbox_reads_mbox_and_maildir(tmp_path, mbox_path):
+    maildir = mailbox.Maildir(str(tmp_path / "Maildir"))
+    maildir.add(_message(1))
+    maildir.close()
+
+    assert len(list(iter_mailbox(mbox_path))) == 6
+    [(position, data)] = list(iter_mailbox(str(tmp_path / "Maildir")))
+    assert position == 0
+    assert b"Chamado 1" in data
+
+
+def test_run_writes_one_record_per_message(tmp_path, mbox_path, offline_pipeline):
+    output = str(tmp_path / "resultados.jsonl")
+
+    stats = run(mbox_path, output, concurrency=2)
+
+    records = _read_jsonl(output)
+    assert stats["processed"] == 6
+    assert offline_pipeline.call_count == 5
+    assert sorted(r["status"] for r in records) == ["empty"] + ["ok"] * 5
+    ok = next(r for r in records if r["status"] == "ok")
+    assert ok["category"] == "Produtivo"
+    assert ok["source"] == "model"
+    assert ok["subject"].startswith("Chamado")
+    assert ok["tokens"] > 0
+
+
+def test_resume_skips_completed_and_retries_errors(
+    tmp_path, mbox_path, offline_pipeline
+):
+    output = str(tmp_path / "resultados.jsonl")
+    offline_pipeline.side_effect = [RESULT, RuntimeError("cota"), RESULT]
+    first = run(mbox_path, output, concurrency=1, limit=3)
+    assert first["processed"] == 3
+    assert first["errors"] == 1
+
+    # Simula uma interrupção no meio da gravação de uma linha.
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": "trunc')
+
+    offline_pipeline.side_effect = None
+    second = run(mbox_path, output, concurrency=2)
+
+    assert second["skipped"] == 2
+    assert second["processed"] == 4
+    assert second["errors"] == 0
+    latest = {}
+    for record in _read_jsonl(output):
+        latest[record["id"]] = record["status"]
+    assert sorted(latest.values()) == ["empty"] + ["ok"] * 5
+
+
+def test_sqlite_output_resumes(tmp_path, mbox_path, offline_pipeline):
+    output = str(tmp_path / "resultados.sqlite")
+    run(mbox_path, output, concurrency=2)
+    again = run(mbox_path, output, concurrency=2)
+
+    assert again["processed"] == 0
+    assert again["skipped"] == 6
+    with sqlite3.connect(output) as connection:
+        rows = connection.execute("SELECT status, category FROM results").fetchall()
+    assert len(rows) == 6
+    assert ("ok", "Produtivo") in rows
+
+
+def test_main_reports_throughput_and_tokens(tmp_path, mbox_path, capsys):
+    output = str(tmp_path / "resultados.jsonl")
+
+    assert main([mbox_path, "-o", output, "--rate", "1000"]) == 0
+
+    printed = capsys.readouterr().out
+    assert "e-mails/s" in printed
+    assert "Tokens de entrada estimados" in printed
+
+
+def test_run_batch_classifies_pending_messages_in_one_job(
+    tmp_path, mbox_path, offline_pipeline
+):
+    output = str(tmp_path / "resultados.jsonl")
+    prompts = []
+
+    def predict(prompt):
+        prompts.append(prompt)
+        return json.dumps(RESULT)
+
+    backend = LocalBatchBackend(str(tmp_path / "jobs"), predict)
+    stats = run_batch(mbox_path, output, backend, str(tmp_path), poll_interval=0)
+
+    assert stats["processed"] == 6
+    assert stats["model"] == 5
+    assert len(prompts) == 5
+    offline_pipeline.assert_not_called()
+    records = _read_jsonl(output)
+    assert sorted(r["status"] for r in records) == ["empty"] + ["ok"] * 5
+
+    again = run_batch(mbox_path, output, backend, str(tmp_path), poll_interval=0)
+    assert again["skipped"] == 6
+    assert len(prompts) == 5
+
+
+def test_long_messages_are_rate_limited_and_counted_per_chunk(offline_pipeline):
+    message = _message(1, body=" ".join(f"palavra{n}" for n in range(400)))
+    limiter = RateLimiter(0)
+
+    with (
+        patch("app.tools.bulk_classify.CHUNK_TOKENS", 50),
+        patch("app.services.classifier.CHUNK_TOKENS", 50),
+        patch.object(limiter, "acquire") as acquire,
+    ):
+        record = classify_message("id", 0, message.as_bytes(), limiter)
+
+    calls = offline_pipeline.call_count
+    assert calls > 1
+    assert acquire.call_count == calls
+    chunk_tokens = sum(
+        estimate_tokens(call.args[0]) for call in offline_pipeline.call_args_list
+    )
+    assert record["tokens"] == chunk_tokens
+
+
+def test_boilerplate_only_message_is_recorded_as_empty(offline_pipeline):
+    with patch(
+        "app.tools.bulk_classify.remove_boilerplate",
+        return_value=BoilerplateResult("", 1, 0),
+    ):
+        record, processed_text = prepare_message("id", 0, _message(1).as_bytes())
+
+    assert record["status"] == "empty"
+    assert processed_text is None
+    offline_pipeline.assert_not_called()
+
+
+def test_prepare_message_parses_the_mime_once():
+    with patch(
+        "app.tools.bulk_classify.parse_email",
+        wraps=parse_email,
+    ) as parse:
+        record, _ = prepare_message("id", 0, _message(1).as_bytes())
+
+    assert parse.call_count == 1
+    assert "O sistema parou no pedido 1" in record["text"]
+
+
+def test_responses_add_input_and_output_tokens(offline_pipeline):
+    def respond(text, category, usage=None):
+        usage.update(input_tokens=100, output_tokens=40)
+        return "Resposta."
+
+    with patch("app.tools.bulk_classify.generate_response", side_effect=respond):
+        record = classify_message(
+            "id", 0, _message(1).as_bytes(), RateLimiter(0), respond=True
+        )
+
+    classify_tokens = estimate_tokens(offline_pipeline.call_args.args[0])
+    assert record["tokens"] == classify_tokens + 100
+    assert record["output_tokens"] == 40
+
+
+def test_automated_messages_skip_the_model(offline_pipeline):
+    message = _message(1)
+    message["List-Unsubscribe"] = "<https://example.com/sair>"
+
+    record = classify_message("id", 0, message.as_bytes(), RateLimiter(0))
+
+    assert record["status"] == "ok"
+    assert record["source"] == "headers"
+    assert record["category"] == "Improdutivo"
+    offline_pipeline.assert_not_called()
+
+
+def test_sqlite_output_from_before_output_tokens_is_migrated(tmp_path, mbox_path):
+    output = str(tmp_path / "resultados.sqlite")
+    with sqlite3.connect(output) as connection:
+        connection.execute(
+            "CREATE TABLE results (id TEXT PRIMARY KEY, position INTEGER, "
+            "status TEXT, category TEXT, confidence REAL, reason TEXT, "
+            "suggested_response TEXT, source TEXT, subject TEXT, sender TEXT, "
+            "automated INTEGER, tokens INTEGER, error TEXT)"
+        )
+
+    assert run(mbox_path, output, concurrency=1)["processed"] == 6
@@ -3,6 +3,7 @@ import json
 from unittest.mock import patch, MagicMock
 from app.services.classifier import (
     classify_email,
+    classify_email_chunked,
     _validate_classification_response,
     InvalidResponseJsonError,
     InvalidClassificationResponseError,
@@ -69,6 +70,22 @@ class TestClassifyEmailUnit:
         final_prompt = mock_model_instance.generate_content.call_args[0][0]
         assert email_text in final_prompt
 
+    def test_records_compaction_stats_for_long_texts(self, mock_dependencies):
+        """
+        Verifica se as estatísticas da compactação acompanham o resultado.
+        """
+        email_text = "Por favor, revise o contrato em anexo. " * 200
+
+        with patch("app.utils.compaction.get_input_budget", return_value=100):
+            result = classify_email(email_text)
+
+        stats = result["compaction"]
+        assert stats["compacted_tokens"] <= 100
+        assert stats["dropped_tokens"] == (
+            stats["original_tokens"] - stats["compacted_tokens"]
+        )
+        assert stats["dropped_sentences"] > 0
+
     def test_raises_error_on_non_json_response(self, mock_dependencies):
         """
         Verifica se `InvalidResponseJsonError` é lançado se a API retornar texto não-JSON.
@@ -160,3 +177,55 @@ class TestValidateClassificationResponse:
             match="O valor de 'confidence' .* é inválido",
         ):
             _validate_classification_response(invalid_data)
+
+
+class TestClassifyEmailChunked:
+    """Testa o modo map-reduce de `classify_email_chunked`."""
+
+    @staticmethod
+    def _fake_classifier(chunk_text):
+        """Classifica como produtivo apenas o trecho que contém 'aprovar'."""
+        if "aprovar" in chunk_text:
+            return {
+                "category": "Produtivo",
+                "confidence": 0.9,
+                "reason": "Pede aprovação.",
+            }
+        return {"category": "Improdutivo", "confidence": 0.8, "reason": "Informativo."}
+
+    def test_short_text_uses_a_single_call(self):
+        with patch(
+            "app.services.classifier.classify_email", return_value=VALID_JSON_RESPONSE
+        ) as mock_classify:
+            result = classify_email_chunked("Texto curto.", chunk_tokens=100)
+
+        mock_classify.assert_called_once_with("Texto curto.")
+        assert result["chunks"] == 1
+        assert result["category"] == "Produtivo"
+
+    def test_productive_chunk_above_threshold_wins(self):
+        text = "informativo " * 400 + "favor aprovar a fatura " + "informativo " * 400
+        with patch(
+            "app.services.classifier.classify_email", side_effect=self._fake_classifier
+        ) as mock_classify:
+            result = classify_email_chunked(text, chunk_tokens=200, max_concurrency=3)
+
+        assert mock_classify.call_count == result["chunks"] > 1
+        assert result["category"] == "Produtivo"
+        assert result["confidence"] == 0.9
+        assert "Pede aprovação." in result["reason"]
+        assert "Informativo." not in result["reason"]
+
+    def test_productive_chunk_below_threshold_does_not_win(self):
+        text = "informativo " * 400 + "favor aprovar a fatura"
+        with patch(
+            "app.services.classifier.classify_email", side_effect=self._fake_classifier
+        ):
+            result = classify_email_chunked(
+                text, chunk_tokens=200, productive_threshold=0.95
+            )
+
+        assert result["category"] == "Improdutivo"
+        # A certeza do documento é limitada pelo trecho produtivo de baixa confiança.
+        assert result["confidence"] == pytest.approx(0.1)
+        assert "Informativo." in result["reason"]
@@ -0,0 +1,156 @@
+import json
+
+import numpy as np
+import pytest
+from app.services.knn_classifier import (
+    HashingEmbedder,
+    InvalidVectorIndexError,
+    KnnClassifier,
+    VectorIndex,
+    try_classify_with_knn,
+)
+from app.tools.build_knn_index import main as build_index_main
+
+PRODUCTIVE = [
+    "Poderiam aprovar o pagamento da fatura {n} até sexta?",
+    "Preciso da segunda via do boleto {n}, podem enviar?",
+    "O sistema de faturamento está fora do ar desde as {n}h, podem verificar?",
+]
+UNPRODUCTIVE = [
+    "Muito obrigado pelo retorno, tenham um ótimo dia! Abraço {n}",
+    "Feliz natal a toda a equipe! Boas festas {n}",
+    "Confira as novidades da nossa newsletter de número {n}",
+]
+
+
+def _examples():
+    texts, categories = [], []
+    for n in range(20):
+        for template in PRODUCTIVE:
+            texts.append(template.format(n=n))
+            categories.append("Produtivo")
+        for template in UNPRODUCTIVE:
+            texts.append(template.format(n=n))
+            categories.append("Improdutivo")
+    return texts, categories
+
+
+@pytest.fixture
+def classifier():
+    texts, categories = _examples()
+    embed = HashingEmbedder(128)
+    index = VectorIndex(128)
+    index.add(embed(texts), categories)
+    return KnnClassifier(index, embed, k=5)
+
+
+def test_brute_force_search_returns_sorted_neighbors():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 16)).astype(np.float32)
+    index = VectorIndex(16)
+    index.add(vectors, ["Produtivo"] * 1000)
+
+    similarities, ids = index.search(vectors[:3], k=4)
+    assert ids[:, 0].tolist() == [0, 1, 2]
+    assert np.allclose(similarities[:, 0], 1.0, atol=1e-5)
+    assert np.all(np.diff(similarities, axis=1) <= 0)
+
+
+def test_batched_adds_are_stacked_once():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(30, 16)).astype(np.float32)
+    index = VectorIndex(16)
+    for start in range(0, 30, 10):
+        index.add(vectors[start : start + 10], ["Improdutivo", "Produtivo"] * 5)
+
+    assert len(index) == 30
+    stacked = index.vectors
+    assert stacked.shape == (30, 16)
+    assert index.vectors is stacked
+    assert index.labels.tolist() == [0, 1] * 15
+    assert index.search(vectors[25:26], k=1)[1][0, 0] == 25
+
+
+def test_ivf_search_finds_exact_matches():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+    index = VectorIndex(16)
+    index.add(vectors, ["Improdutivo"] * 2000)
+    index.build_ivf(n_lists=16)
+
+    _, ids = index.search(vectors[:50], k=1, nprobe=4)
+    assert index.has_ivf
+    assert (ids[:, 0] == np.arange(50)).mean() > 0.95
+
+
+def test_predict_votes_by_similarity(classifier):
+    results = classifier.predict(
+        [
+            "Poderiam aprovar o pagamento da fatura 999 até sexta?",
+            "Feliz natal a toda a equipe! Boas festas 2030",
+        ]
+    )
+    assert [r["category"] for r in results] == ["Produtivo", "Improdutivo"]
+    assert all(0.0 <= r["confidence"] <= 1.0 for r in results)
+    assert results[0]["vote"] == 1.0
+
+
+def test_try_classify_only_returns_confident_matches(classifier):
+    match = try_classify_with_knn(
+        "Preciso da segunda via do boleto 7, podem enviar?", classifier
+    )
+    assert match["category"] == "Produtivo"
+    assert set(match) == {"category", "confidence", "reason"}
+
+    assert try_classify_with_knn("Texto totalmente diferente", classifier) is None
+
+
+def test_without_index_nothing_is_classified():
+    assert try_classify_with_knn("qualquer texto") is None
+
+
+@pytest.mark.parametrize("use_ivf", [False, True])
+def test_save_and_load_round_trip(tmp_path, classifier, use_ivf):
+    if use_ivf:
+        classifier.index.build_ivf(n_lists=4)
+    classifier.index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert len(loaded) == len(classifier.index)
+    assert loaded.has_ivf == use_ivf
+    queries = classifier.embed(["Poderiam aprovar o pagamento da fatura 3?"])
+    assert np.array_equal(
+        loaded.search(queries, k=3)[1], classifier.index.search(queries, k=3)[1]
+    )
+
+
+def test_load_invalid_index_raises(tmp_path):
+    with pytest.raises(InvalidVectorIndexError):
+        VectorIndex.load(str(tmp_path))
+
+
+def test_load_meta_without_size_raises(tmp_path, classifier):
+    classifier.index.save(str(tmp_path))
+    meta_path = tmp_path / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    del meta["size"]
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    with pytest.raises(InvalidVectorIndexError):
+        VectorIndex.load(str(tmp_path))
+
+
+def test_build_tool_indexes_labelled_jsonl(tmp_path):
+    texts, categories = _examples()
+    source = tmp_path / "rotulados.jsonl"
+    source.write_text(
+        "\n".join(
+            json.dumps({"text": t, "category": c}) for t, c in zip(texts, categories)
+        )
+        + "\nlinha inválida\n",
+        encoding="utf-8",
+    )
+    output = tmp_path / "index"
+
+    assert build_index_main([str(source), "-o", str(output), "--dim", "64"]) == 0
+    assert len(VectorIndex.load(str(output))) == len(texts)
@@ -5,6 +5,7 @@ from app.services.responder import (
     _validate_generated_response,
     InvalidGeneratedResponseError,
 )
+from app.utils.compaction import estimate_tokens
 
 # Mock da resposta da API Gemini para ser usado nos testes
 MOCK_API_RESPONSE = "Esta é uma resposta padrão gerada pelo mock da API."
@@ -61,6 +62,29 @@ class TestGenerateResponseUnit:
         # Verifica se a categoria foi corretamente interpolada no template mockado
         assert f"Categoria: {category}" in called_with_prompt
 
+    def test_reports_estimated_token_usage(self, mock_vertex_ai):
+        """
+        Verifica se `usage` recebe os tokens estimados do prompt e da resposta.
+        """
+        usage = {}
+        generate_response("Texto de exemplo para o e-mail.", "Produtivo", usage=usage)
+
+        prompt = mock_vertex_ai.return_value.generate_content.call_args[0][0]
+        assert usage["input_tokens"] == estimate_tokens(prompt)
+        assert usage["output_tokens"] == estimate_tokens(MOCK_API_RESPONSE)
+        assert usage["dropped_tokens"] == 0
+
+    def test_reports_tokens_dropped_by_compaction(self, mock_vertex_ai):
+        """
+        Verifica se `usage` informa os tokens do e-mail descartados ao compactar.
+        """
+        usage = {}
+        email_text = "Preciso do relatório de vendas. " * 200
+        with patch("app.utils.compaction.get_input_budget", return_value=100):
+            generate_response(email_text, "Produtivo", usage=usage)
+
+        assert usage["dropped_tokens"] > 0
+
     def test_raises_error_for_invalid_category(self, mock_vertex_ai):
         """
         Verifica se uma exceção `ValueError` é lançada para uma categoria desconhecida.
@@ -72,6 +96,29 @@ class TestGenerateResponseUnit:
         mock_model_instance = mock_vertex_ai.return_value
         mock_model_instance.generate_content.assert_not_called()
 
+    def test_known_improductive_subtype_uses_template_without_api_call(
+        self, mock_vertex_ai
+    ):
+        """
+        Verifica se e-mails improdutivos de subtipo conhecido são respondidos
+        localmente, sem chamar o modelo.
+        """
+        email_text = (
+            "Esta é uma mensagem automática. Não responda. Nenhuma ação é necessária."
+        )
+
+        response = generate_response(email_text, "Improdutivo")
+
+        assert "Nenhuma ação adicional" in response
+        mock_vertex_ai.return_value.generate_content.assert_not_called()
+
+    def test_templates_are_not_used_for_productive_emails(self, mock_vertex_ai):
+        """Verifica se e-mails produtivos sempre passam pelo modelo."""
+        with patch("app.services.responder._load_prompt", return_value="Template"):
+            generate_response("Muito obrigado, agradeço demais!", "Produtivo")
+
+        mock_vertex_ai.return_value.generate_content.assert_called_once()
+
     def test_raises_error_on_invalid_generated_response(self, mock_vertex_ai):
         """
         Verifica se a validação interna é acionada se a API retornar lixo.
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from app.services.response_templates import (
+    ResponseTemplateLibrary,
+    get_template_library,
+    load_logged_responses,
+    log_generated_response,
+    mine_templates,
+)
+
+
+class TestTemplateLibrary:
+    """Testa a detecção de subtipos e o preenchimento dos templates padrão."""
+
+    @pytest.mark.parametrize(
+        "email_text, expected_subtype",
+        [
+            ("Muito obrigado pelo apoio de ontem, agradeço demais!", "agradecimento"),
+            (
+                "Confira a nossa newsletter de março. Para se descadastrar, clique aqui.",
+                "newsletter",
+            ),
+            (
+                "Esta é uma mensagem automática. Não responda. Nenhuma ação é necessária.",
+                "notificacao_automatica",
+            ),
+        ],
+    )
+    def test_detects_known_subtypes_with_high_confidence(
+        self, email_text, expected_subtype
+    ):
+        match = get_template_library().detect(email_text)
+        assert match is not None
+        assert match.subtype == expected_subtype
+        assert match.confidence >= 0.8
+
+    def test_returns_none_without_signals(self):
+        assert get_template_library().detect("Segue o relatório trimestral.") is None
+
+    def test_action_requests_lower_the_confidence(self):
+        """Um agradecimento que pede algo não deve receber resposta pronta."""
+        match = get_template_library().detect(
+            "Obrigado! Agradeço se puder, por favor, enviar o contrato com urgente?"
+        )
+        assert match is not None
+        assert match.confidence < 0.8
+
+    def test_fill_replaces_placeholders(self):
+        library = ResponseTemplateLibrary(
+            {"teste": {"templates": ["<<<SAUDACAO>>> texto <<<NOME>>>"]}}
+        )
+        assert library.fill("teste", {"NOME": "Equipe"}) == "Olá, texto Equipe"
+
+    def test_default_templates_have_no_unfilled_placeholders(self):
+        library = get_template_library()
+        for subtype in library.subtypes:
+            assert "<<<" not in library.fill(subtype)
+
+
+class TestResponseLogAndMining:
+    """Testa o registro de respostas e a mineração de templates candidatos."""
+
+    def test_log_roundtrip_only_returns_model_responses(self, tmp_path):
+        log_path = str(tmp_path / "responses.jsonl")
+        log_generated_response("Improdutivo", "Resposta do modelo.", "model", log_path)
+        log_generated_response("Produtivo", "Outra resposta.", "model", log_path)
+        log_generated_response("Improdutivo", "Do template.", "template", log_path)
+
+        assert list(load_logged_responses(log_path)) == ["Resposta do modelo."]
+
+        with open(log_path, encoding="utf-8") as f:
+            assert all("response" in json.loads(line) for line in f)
+
+    def test_mine_templates_groups_similar_responses(self):
+        responses = [
+            "Olá, agradecemos pela mensagem. Ficamos à disposição. Atenciosamente.",
+            "Olá, agradecemos pela mensagem! Ficamos à disposição. Atenciosamente.",
+            "Olá, agradecemos muito pela mensagem. Ficamos à disposição. Atenciosamente.",
+            "Prezado, confirmamos o recebimento do boleto e faremos o pagamento.",
+        ]
+        candidates = mine_templates(responses, min_cluster_size=3)
+
+        assert len(candidates) == 1
+        assert candidates[0]["size"] == 3
+        assert "agradecemos" in candidates[0]["template"]
@@ -0,0 +1,82 @@
+import pytest
+from app.tools.build_boilerplate_index import main as build_index_main
+from app.utils.boilerplate import (
+    BoilerplateIndex,
+    InvalidBoilerplateIndexError,
+    build_boilerplate_hashes,
+    remove_boilerplate,
+    write_boilerplate_index,
+)
+
+DISCLAIMER = (
+    "Esta mensagem é confidencial e destinada exclusivamente ao destinatário.\n"
+    "Se você a recebeu por engano, apague-a e avise o remetente."
+)
+SIGNATURE_LINE = "Banco Exemplo S.A. | Central de Atendimento 0800 123 4567"
+
+
+def _corpus(size: int = 5):
+    return [
+        f"Mensagem número {i} sobre o contrato {i * 7}.\n\n"
+        f"Atenciosamente,\n{SIGNATURE_LINE}\n\n{DISCLAIMER}"
+        for i in range(size)
+    ]
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Índice construído a partir de um corpus pequeno e aberto via mmap."""
+    path = tmp_path / "boilerplate.idx"
+    write_boilerplate_index(build_boilerplate_hashes(_corpus(), min_count=3), str(path))
+    return BoilerplateIndex.open(str(path))
+
+
+def test_frequent_segments_are_indexed(index):
+    assert len(index) > 0
+    assert index.contains_segment(DISCLAIMER)
+    # A normalização ignora espaços, caixa e dígitos.
+    assert index.contains_segment(SIGNATURE_LINE.upper().replace("4567", "9999"))
+    assert not index.contains_segment("Mensagem número 1 sobre o contrato 7.")
+
+
+def test_remove_boilerplate_keeps_unique_content(index):
+    email = (
+        "Poderiam enviar a segunda via do boleto de março?\n\n"
+        f"Obrigado,\n{SIGNATURE_LINE}\n\n{DISCLAIMER}"
+    )
+    result = remove_boilerplate(email, index)
+
+    assert (
+        result.text == "Poderiam enviar a segunda via do boleto de março?\n\nObrigado,"
+    )
+    assert result.removed_segments == 2
+    assert result.bytes_saved == len(email.encode("utf-8")) - len(
+        result.text.encode("utf-8")
+    )
+
+
+def test_without_index_text_is_unchanged():
+    email = f"Texto qualquer.\n\n{DISCLAIMER}"
+    result = remove_boilerplate(email, BoilerplateIndex.from_hashes([]))
+    assert result.text == email
+    assert result.removed_segments == 0
+
+
+def test_invalid_index_file_raises(tmp_path):
+    path = tmp_path / "invalid.idx"
+    path.write_bytes(b"nao e um indice valido")
+    with pytest.raises(InvalidBoilerplateIndexError):
+        BoilerplateIndex.open(str(path))
+
+
+def test_build_tool_writes_index_from_corpus_directory(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    for i, document in enumerate(_corpus()):
+        (corpus_dir / f"email_{i}.txt").write_text(document, encoding="utf-8")
+    output = tmp_path / "corpus.idx"
+
+    assert (
+        build_index_main([str(corpus_dir), "-o", str(output), "--min-count", "3"]) == 0
+    )
+    assert BoilerplateIndex.open(str(output)).contains_segment(DISCLAIMER)
@@ -0,0 +1,85 @@
+import logging
+
+from app.utils.compaction import (
+    GAP_MARKER,
+    compact_for_model,
+    compact_text,
+    estimate_tokens,
+    get_input_budget,
+    split_into_token_chunks,
+)
+from app.utils.metrics import metrics
+
+
+def _long_document(filler_sentences: int = 200) -> str:
+    """Gera um documento longo com um pedido relevante no meio."""
+    filler = "Este parágrafo descreve a política geral da empresa. " * filler_sentences
+    return (
+        "Olá equipe, segue o relatório anual. "
+        + filler
+        + "Poderiam aprovar o pagamento da fatura 4471 de R$ 1.500,00 até sexta? "
+        + filler
+        + "Atenciosamente, Financeiro."
+    )
+
+
+def test_estimate_tokens_is_proportional_to_length():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+def test_short_text_is_returned_unchanged():
+    text = "Por favor, revise o contrato."
+    result = compact_text(text, max_tokens=100)
+    assert result.text == text
+    assert not result.was_compacted
+    assert result.dropped_tokens == 0
+
+
+def test_long_text_respects_the_budget():
+    result = compact_text(_long_document(), max_tokens=200)
+    assert result.was_compacted
+    assert estimate_tokens(result.text) <= 200
+    assert result.dropped_tokens == result.original_tokens - result.compacted_tokens
+
+
+def test_head_tail_and_salient_sentence_are_kept():
+    """O início, o fim e a frase com pedido, valor e pergunta devem sobreviver."""
+    result = compact_text(_long_document(), max_tokens=200)
+    assert result.text.startswith("Olá equipe")
+    assert result.text.endswith("Atenciosamente, Financeiro.")
+    assert "fatura 4471" in result.text
+    assert GAP_MARKER in result.text
+
+
+def test_text_without_punctuation_is_still_compacted():
+    result = compact_text("palavra " * 5000, max_tokens=300)
+    assert result.was_compacted
+    assert estimate_tokens(result.text) <= 300
+
+
+def test_compact_for_model_records_dropped_tokens():
+    metrics.reset()
+    result = compact_for_model("x. " * 50000, "gemini-2.5-flash")
+
+    assert estimate_tokens(result.text) <= get_input_budget("gemini-2.5-flash")
+    assert metrics.get("compaction.compacted") == 1
+    assert metrics.get("compaction.tokens_dropped") == result.dropped_tokens
+
+
+def test_compact_for_model_logs_the_stats(caplog):
+    with caplog.at_level(logging.INFO, logger="app.utils.compaction"):
+        result = compact_for_model("x. " * 50000, "gemini-2.5-flash")
+
+    assert result.stats()["dropped_sentences"] == result.dropped_sentences > 0
+    assert f"{result.dropped_sentences} frases descartadas" in caplog.text
+
+
+def test_split_into_token_chunks_respects_the_limit():
+    text = "palavra " * 2000
+    chunks = split_into_token_chunks(text, chunk_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
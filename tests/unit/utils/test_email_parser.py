@@ -0,0 +1,140 @@
+from email.message import EmailMessage
+from unittest.mock import patch
+
+from app.utils.email_parser import (
+    EmailAttachment,
+    is_automated_message,
+    parse_email,
+)
+from app.utils.text_extractor import (
+    email_upload_headers,
+    extract_text,
+    extract_text_from_bytes,
+    extract_text_from_email,
+)
+
+BODY = "Olá equipe, poderiam enviar o status do chamado 4471 até amanhã?"
+
+
+def _message(plain=None, html=None, **headers) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = "Status do chamado"
+    message["From"] = "cliente@example.com"
+    message["To"] = "suporte@example.com"
+    for name, value in headers.items():
+        message[name.replace("_", "-")] = value
+    if plain is not None:
+        message.set_content(plain)
+    if html is not None:
+        if plain is None:
+            message.set_content(html, subtype="html")
+        else:
+            message.add_alternative(html, subtype="html")
+    return message
+
+
+def test_plain_text_is_preferred_over_html():
+    message = _message(plain=BODY, html="<p>Versão <b>HTML</b></p>")
+    parsed = parse_email(message.as_bytes())
+
+    assert parsed.body_type == "plain"
+    assert parsed.body.strip() == BODY
+    assert parsed.headers["subject"] == "Status do chamado"
+
+
+def test_html_only_message_is_cleaned():
+    message = _message(
+        html="<html><head><title>x</title></head><p>Olá <b>mundo</b></p>"
+    )
+    text = extract_text_from_bytes(message.as_bytes(), filename="mensagem.eml")
+    assert text == "Assunto: Status do chamado\n\nOlá mundo"
+
+
+def test_quoted_printable_and_base64_bodies_are_decoded():
+    for cte in ("quoted-printable", "base64"):
+        message = EmailMessage()
+        message.set_content("Ação necessária: revisão do contrato.", cte=cte)
+        raw = message.as_bytes()
+        assert "Ação".encode("utf-8") not in raw
+        assert parse_email(raw).body.strip() == "Ação necessária: revisão do contrato."
+
+
+def test_automation_headers_are_exposed():
+    newsletter = _message(plain=BODY, List_Unsubscribe="<https://example.com/unsub>")
+    auto_reply = _message(plain=BODY, Auto_Submitted="auto-replied")
+    person = _message(plain=BODY, Auto_Submitted="no")
+
+    assert parse_email(newsletter.as_bytes()).is_automated
+    assert (
+        parse_email(auto_reply.as_bytes()).headers["auto-submitted"] == "auto-replied"
+    )
+    assert parse_email(auto_reply.as_bytes()).is_automated
+    assert not parse_email(person.as_bytes()).is_automated
+
+
+def test_attachments_are_not_decoded_when_body_is_enough():
+    message = _message(plain=BODY)
+    message.add_attachment(
+        b"%PDF-1.4 " + b"x" * 100_000,
+        maintype="application",
+        subtype="pdf",
+        filename="contrato.pdf",
+    )
+    parsed = parse_email(message.as_bytes())
+
+    assert [a.filename for a in parsed.attachments] == ["contrato.pdf"]
+    assert 90_000 < parsed.attachments[0].size < 110_000
+    with patch.object(EmailAttachment, "read") as mock_read:
+        text = extract_text_from_bytes(message.as_bytes(), filename="m.eml")
+
+    assert BODY in text
+    mock_read.assert_not_called()
+
+
+def test_short_body_falls_back_to_attachment_text(tmp_path):
+    message = _message(plain="Segue.")
+    message.add_attachment(
+        "Fatura 4471 no valor de R$ 1.500,00, vencimento sexta.".encode(),
+        maintype="text",
+        subtype="plain",
+        filename="fatura.txt",
+    )
+    message.add_attachment(
+        b"\x00" * 1000,
+        maintype="application",
+        subtype="octet-stream",
+        filename="dados.bin",
+    )
+    path = tmp_path / "mensagem.eml"
+    path.write_bytes(message.as_bytes())
+
+    with patch.object(
+        EmailAttachment, "read", autospec=True, side_effect=EmailAttachment.read
+    ) as mock_read:
+        text = extract_text(str(path))
+
+    # O anexo binário não suportado nunca é decodificado.
+    assert [call.args[0].filename for call in mock_read.call_args_list] == [
+        "fatura.txt"
+    ]
+    assert text.startswith("Assunto: Status do chamado\n\nSegue.")
+    assert "Fatura 4471" in text
+
+
+def test_upload_headers_are_read_without_the_body():
+    message = _message(plain=BODY, Precedence="bulk")
+    data = message.as_bytes()
+
+    headers = email_upload_headers(data, filename="mensagem.eml")
+    assert headers["subject"] == "Status do chamado"
+    assert is_automated_message(headers)
+    assert email_upload_headers(data, filename="mensagem.txt") is None
+
+
+def test_parsed_email_text_matches_bytes_extraction():
+    message = _message(html="<p>Olá <b>mundo</b></p>")
+    data = message.as_bytes()
+
+    assert extract_text_from_email(parse_email(data)) == extract_text_from_bytes(
+        data, filename="mensagem.eml"
+    )
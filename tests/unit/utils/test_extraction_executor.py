@@ -0,0 +1,113 @@
+import asyncio
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app.utils.extraction_executor import (
+    ExtractionError,
+    ExtractionExecutor,
+    ExtractionTimeoutError,
+    extract_text_from_upload,
+)
+from app.utils.metrics import metrics
+
+
+@pytest.fixture
+def executor():
+    with ExtractionExecutor(workers=1, timeout=5, max_jobs_per_worker=2) as pool:
+        yield pool
+
+
+def test_jobs_run_in_a_separate_process(executor):
+    assert executor.submit(os.getpid).result() != os.getpid()
+    assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+
+
+def test_worker_is_recycled_after_max_jobs(executor):
+    pids = [executor.submit(os.getpid).result() for _ in range(4)]
+    assert pids[0] == pids[1]
+    assert pids[2] == pids[3]
+    assert pids[1] != pids[2]
+
+
+def test_stuck_job_is_killed_and_pool_recovers():
+    metrics.reset()
+    with ExtractionExecutor(workers=1, timeout=0.5) as pool:
+        stuck = pool.submit(time.sleep, 30)
+        with pytest.raises(ExtractionTimeoutError):
+            stuck.result()
+        assert pool.submit(sum, [1, 1]).result() == 2
+    assert metrics.get("extraction.timeouts") == 1
+
+
+def test_memory_limit_is_enforced_per_worker():
+    metrics.reset()
+    with ExtractionExecutor(workers=1, memory_limit_mb=256) as pool:
+        pid = pool.submit(os.getpid).result()
+        with pytest.raises(ExtractionError) as info:
+            pool.submit(bytearray, 1024**3).result()
+        assert isinstance(info.value.__cause__, MemoryError)
+        # O processo que estourou a memória é substituído por um novo.
+        assert pool.submit(os.getpid).result() != pid
+        assert pool.submit(len, b"abc").result() == 3
+    assert metrics.get("extraction.worker_failures") == 1
+
+
+def _exhaust_memory(*args):
+    raise MemoryError
+
+
+def test_worker_errors_make_upload_extraction_return_empty_text(executor):
+    with (
+        patch("app.utils.extraction_executor.extract_text_from_bytes", _exhaust_memory),
+        patch("app.utils.extraction_executor.get_extraction_executor") as get,
+    ):
+        get.return_value = executor
+        text = asyncio.run(extract_text_from_upload(b"conteudo novo", "email.txt"))
+
+    assert text == ""
+
+
+def test_queue_depth_counts_waiting_jobs(executor):
+    jobs = [executor.submit(time.sleep, 0.3) for _ in range(3)]
+    assert executor.queue_depth >= 1
+    for job in jobs:
+        job.result()
+    assert executor.queue_depth == 0
+
+
+def test_extract_text_from_upload_without_pool_runs_in_thread():
+    text = asyncio.run(extract_text_from_upload(b"<p>Ol\xc3\xa1</p>", "email.txt"))
+    assert text == "Olá"
+
+
+def _pdf(pages: int) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        c.drawString(72, 700, f"Pagina {page} do relatorio {time.time_ns()}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def test_long_pdf_uploads_are_extracted_by_page_ranges(executor):
+    data = _pdf(12)
+
+    with (
+        patch("app.utils.extraction_executor.PDF_PARALLEL_MIN_PAGES", 4),
+        patch.object(executor, "submit", wraps=executor.submit) as submit,
+        patch("app.utils.extraction_executor.get_extraction_executor") as get,
+    ):
+        get.return_value = executor
+        text = asyncio.run(extract_text_from_upload(data, "relatorio.pdf"))
+
+    # Uma tarefa para contar as páginas e uma por faixa de páginas.
+    assert submit.call_count == 1 + 3
+    positions = [text.index(f"Pagina {page} ") for page in range(12)]
+    assert positions == sorted(positions)
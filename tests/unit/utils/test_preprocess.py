@@ -1,4 +1,4 @@
-from app.utils.preprocess import preprocess_text
+from app.utils.preprocess import get_stopwords, preprocess_text
 
 
 def test_preprocess_with_none_input():
@@ -188,3 +188,27 @@ def test_preprocess_text_lemmatization_empty_result_after_all_steps():
     input_text_2 = "carros"
     expected_2 = "carro"
     assert preprocess_text(input_text_2, lemmatize=True) == expected_2
+
+
+def test_special_tokens_keep_their_case_when_lowercasing():
+    """Testa se tokens especiais (<...>) são preservados ao converter para minúsculas."""
+    assert (
+        preprocess_text("Valor <NUM>% PAGO <Anexo> OK <NUM>")
+        == "valor <NUM>% pago <Anexo> ok <NUM>"
+    )
+
+
+def test_lowercase_with_thousands_of_special_tokens():
+    """Testa a conversão em textos com milhares de tokens especiais repetidos."""
+    text = "TEXTO <DIV> " * 5000
+    assert preprocess_text(text) == ("texto <DIV> " * 5000).strip()
+
+
+def test_get_stopwords_returns_the_language_list():
+    """
+    Testa o acesso público às stopwords: imutável e vazio para idiomas sem lista.
+    """
+    stopwords = get_stopwords("pt")
+    assert {"de", "para", "com"} <= stopwords
+    assert isinstance(stopwords, frozenset)
+    assert get_stopwords("xx") == frozenset()
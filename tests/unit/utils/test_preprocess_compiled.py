@@ -0,0 +1,49 @@
+import itertools
+
+import pytest
+from app.utils.preprocess import TextPreprocessor
+
+SAMPLES = [
+    "",
+    "Olá EQUIPE,\tsegue o <NUM> relatório   de Março.\n\nPoderiam aprovar?",
+    "  O valor de R$ 1.500,00 vence em 10/03; as faturas e os pães estão pagos. ",
+    "texto\x08com\x01controle e <TAG> ESPECIAL e 25% de desconto",
+    "!!! ... --- ",
+    "arquivo_final.pdf, relatórios_ área² e pães!! pães!!",
+]
+
+OPTION_NAMES = [
+    "lowercase",
+    "remove_stopwords",
+    "lemmatize",
+    "normalize_numbers",
+    "tokenize",
+]
+
+
+@pytest.mark.parametrize(
+    "flags", list(itertools.product([False, True], repeat=len(OPTION_NAMES)))
+)
+def test_compiled_pipeline_matches_process(flags):
+    """O pipeline compilado deve produzir exatamente o mesmo resultado de `process`."""
+    preprocessor = TextPreprocessor()
+    options = dict(zip(OPTION_NAMES, flags))
+    pipeline = preprocessor.compile(**options)
+
+    for text in SAMPLES:
+        assert pipeline(text) == preprocessor.process(text, **options)
+
+
+def test_compiled_pipeline_is_reused_for_the_same_options():
+    preprocessor = TextPreprocessor()
+    assert preprocessor.compile(lemmatize=True) is preprocessor.compile(lemmatize=True)
+    assert preprocessor.compile(lemmatize=True) is not preprocessor.compile()
+
+
+def test_compiled_pipeline_runs_custom_base_steps():
+    preprocessor = TextPreprocessor(base_steps=[lambda text: text.replace("a", "4")])
+    assert (
+        preprocessor.compile()("ABACATE")
+        == preprocessor.process("ABACATE")
+        == "4b4c4te"
+    )
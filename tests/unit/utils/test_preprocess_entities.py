@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+from app.utils.preprocess import TextPreprocessor, preprocess_text, tokenize_text
+
+# Corpus de referência (um caso por linha): texto de entrada, texto
+# normalizado esperado e o tipo de entidade exercitado.
+ENTITY_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "entity_corpus.jsonl")
+
+with open(ENTITY_CORPUS_PATH, encoding="utf-8") as _corpus_file:
+    ENTITY_CORPUS = [
+        (case["input"], case["expected"]) for case in map(json.loads, _corpus_file)
+    ]
+
+
+@pytest.mark.parametrize("input_text, expected_text", ENTITY_CORPUS)
+def test_entity_normalization_corpus(input_text, expected_text):
+    assert preprocess_text(input_text, normalize_entities=True) == expected_text
+
+
+def test_entity_normalization_reduces_token_count():
+    text = " ".join(input_text for input_text, _ in ENTITY_CORPUS)
+    raw_tokens = tokenize_text(preprocess_text(text))
+    entity_tokens = preprocess_text(text, normalize_entities=True, tokenize=True)
+
+    assert "<MOEDA>" in entity_tokens and "<DOC>" in entity_tokens
+    assert len(entity_tokens) < len(raw_tokens)
+
+
+def test_entity_normalization_is_idempotent():
+    once = preprocess_text("R$ 10,00 em 15/03/2026 (12%)", normalize_entities=True)
+    assert preprocess_text(once, normalize_entities=True) == once
+
+
+def test_streaming_does_not_split_entities_with_spaces():
+    preprocessor = TextPreprocessor()
+    text = "Segue a linha 23790.12345 60000.000000 00000.000000 1 00000000000000 de R$ 99,90 "
+    chunks = [text[i : i + 5] for i in range(0, len(text), 5)]
+
+    assert "".join(
+        preprocessor.process_stream(chunks, normalize_entities=True)
+    ) == preprocessor.process(text, normalize_entities=True)
@@ -0,0 +1,80 @@
+import pickle
+
+import pytest
+from app.utils.preprocess import (
+    SuffixRuleLemmatizer,
+    _LEMMATIZER_FUNCTIONS,
+    _PT_LEMMA_EXCEPTIONS,
+    _PT_SUFFIX_RULES,
+    preprocess_text,
+)
+
+# Saídas das regras heurísticas de sufixo (sem a tabela de exceções).
+RULE_OUTPUTS = [
+    ("pães", "pão"),
+    ("ães", "ão"),
+    ("autores", "autor"),
+    ("flores", "flor"),
+    ("mes", "mes"),
+    ("carros", "carro"),
+    ("testes", "test"),
+    ("gás", "gás"),
+    ("aviões", "aviõ"),
+    ("os", "os"),
+    ("mais", "mai"),
+    ("casa", "casa"),
+    ("relatórios", "relatório"),
+    ("es", "es"),
+    ("s", "s"),
+    ("", ""),
+]
+
+
+@pytest.mark.parametrize("word, lemma", RULE_OUTPUTS)
+def test_suffix_rules(word, lemma):
+    lemmatizer = SuffixRuleLemmatizer(_PT_SUFFIX_RULES)
+    assert lemmatizer(word) == lemma
+
+
+@pytest.mark.parametrize(
+    "word, rule_lemma",
+    [("status", "statu"), ("ônibus", "ônibu"), ("lápis", "lápi"), ("óculos", "óculo")],
+)
+def test_exceptions_take_precedence_over_rules(word, rule_lemma):
+    # Mudança intencional: as regras sozinhas cortavam o "-s" dessas palavras
+    # invariáveis; com a tabela de exceções elas são mantidas.
+    assert SuffixRuleLemmatizer(_PT_SUFFIX_RULES)(word) == rule_lemma
+    assert _LEMMATIZER_FUNCTIONS["pt"](word) == word
+    assert _PT_LEMMA_EXCEPTIONS[word] == word
+
+
+def test_exceptions_are_kept_by_preprocess_text():
+    text = preprocess_text("O status do ônibus", lemmatize=True)
+    assert text == "o status do ônibus"
+
+
+def test_longest_matching_rule_wins():
+    lemmatizer = SuffixRuleLemmatizer(
+        [("s", "", 3), ("ões", "ão", 4), ("ais", "al", 4)]
+    )
+    assert lemmatizer("aviões") == "avião"
+    assert lemmatizer("jornais") == "jornal"
+    assert lemmatizer("casas") == "casa"
+
+
+def test_cache_reports_hit_rate():
+    lemmatizer = SuffixRuleLemmatizer(_PT_SUFFIX_RULES, cache_size=2)
+    for word in ["carros", "carros", "carros", "flores"]:
+        lemmatizer(word)
+
+    stats = lemmatizer.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == 0.5
+    assert stats["size"] == 2
+
+
+def test_lemmatizer_survives_pickling():
+    lemmatizer = pickle.loads(pickle.dumps(_LEMMATIZER_FUNCTIONS["pt"]))
+    assert lemmatizer("carros") == "carro"
+    assert lemmatizer.stats()["misses"] == 1
@@ -0,0 +1,33 @@
+from unittest.mock import patch
+
+from app.utils.preprocess import PARALLEL_MIN_BATCH, TextPreprocessor
+
+
+def _texts(count: int):
+    return (f"Fatura {i} dos SERVIÇOS de março" for i in range(count))
+
+
+def test_small_batches_run_in_process():
+    preprocessor = TextPreprocessor()
+    with patch("app.utils.preprocess.ProcessPoolExecutor") as pool:
+        results = list(preprocessor.process_many(_texts(10), normalize_numbers=True))
+
+    pool.assert_not_called()
+    assert results == ["fatura <NUM> dos serviços de março"] * 10
+
+
+def test_large_batches_use_the_pool_and_preserve_order():
+    preprocessor = TextPreprocessor()
+    count = PARALLEL_MIN_BATCH + 37
+    options = dict(remove_stopwords=True, lemmatize=True)
+
+    results = list(
+        preprocessor.process_many(_texts(count), workers=2, chunksize=50, **options)
+    )
+
+    assert results == [preprocessor.process(text, **options) for text in _texts(count)]
+
+
+def test_results_are_streamed():
+    results = TextPreprocessor().process_many(_texts(3), tokenize=True)
+    assert next(results) == ["fatura", "0", "dos", "serviços", "de", "março"]
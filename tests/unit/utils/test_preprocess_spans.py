@@ -0,0 +1,71 @@
+from app.utils.preprocess import (
+    TOKEN_ENTITY,
+    TOKEN_NUMBER,
+    TOKEN_SPECIAL,
+    TOKEN_WORD,
+    TextPreprocessor,
+    TokenSpans,
+)
+
+
+def test_scan_records_offsets_and_kinds():
+    text = "Fatura 1.500,00 <Anexo>% paga."
+    spans = TokenSpans.scan(text)
+
+    assert list(spans.spans()) == [
+        (0, 6, TOKEN_WORD),
+        (7, 15, TOKEN_NUMBER),
+        (16, 24, TOKEN_SPECIAL),
+        (25, 29, TOKEN_WORD),
+    ]
+    assert [text[start:end] for start, end, _ in spans.spans()] == spans.tokens()
+
+
+def test_scan_of_empty_text():
+    assert len(TokenSpans.scan("")) == 0
+    assert TokenSpans.scan(None).to_text() == ""
+
+
+def test_process_tokens_applies_word_stages():
+    text = "Os RELATÓRIOS de março, com 2 faturas <NUM>."
+    spans = TextPreprocessor().process_tokens(
+        text, remove_stopwords=True, lemmatize=True, normalize_numbers=True
+    )
+
+    assert spans.tokens() == ["relatório", "março", "<NUM>", "fatura", "<NUM>"]
+    assert spans.to_text() == "relatório março <NUM> fatura <NUM>"
+
+
+def test_process_tokens_offsets_point_to_the_original_text():
+    text = "Poderiam APROVAR o pagamento?"
+    spans = TextPreprocessor().process_tokens(text, remove_stopwords=True)
+
+    assert [text[start:end] for start, end, _ in spans.spans()] == [
+        "Poderiam",
+        "APROVAR",
+        "pagamento",
+    ]
+
+
+def test_process_tokens_matches_string_tokenization_without_punctuation():
+    """Sem pontuação colada às palavras, o resultado coincide com `process`."""
+    preprocessor = TextPreprocessor()
+    text = "Segue os relatórios das contas de 10 lojas"
+    options = dict(remove_stopwords=True, lemmatize=True, normalize_numbers=True)
+
+    assert preprocessor.process_tokens(text, **options).tokens() == (
+        preprocessor.process(text, tokenize=True, **options)
+    )
+
+
+def test_process_tokens_normalizes_entities_like_process():
+    preprocessor = TextPreprocessor()
+    text = "Pague R$ 1.234,56 até 15/03/2026 no CPF 123.456.789-09 com 2 % de 3 faturas"
+    options = dict(remove_stopwords=True, normalize_entities=True)
+
+    spans = preprocessor.process_tokens(text, **options)
+
+    assert spans.tokens() == preprocessor.process(text, tokenize=True, **options)
+    money = spans.tokens().index("<MOEDA>")
+    start, end, kind = list(spans.spans())[money]
+    assert (text[start:end], kind) == ("R$ 1.234,56", TOKEN_ENTITY)
@@ -0,0 +1,78 @@
+import io
+import itertools
+import random
+
+import pytest
+from app.utils.preprocess import TextPreprocessor
+
+TEXT = (
+    "  Prezados,\tsegue a FATURA nº 4471 de R$ 1.500,00 <Anexo ÚNICO>% dos "
+    "SERVIÇOS.\n\n Poderiam confirmar o pagamento de 15% até 10/04?\x01  Os "
+    "relatórios e as planilhas estão na pasta <NUM> e \x08 nos pães.  \n"
+) * 20
+
+OPTION_NAMES = ["remove_stopwords", "lemmatize", "normalize_numbers"]
+
+
+def _random_chunks(text: str, seed: int):
+    rng = random.Random(seed)
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        yield text[position : position + size]
+        position += size
+
+
+@pytest.mark.parametrize(
+    "flags", list(itertools.product([False, True], repeat=len(OPTION_NAMES)))
+)
+def test_stream_matches_process_for_any_chunking(flags):
+    preprocessor = TextPreprocessor()
+    options = dict(zip(OPTION_NAMES, flags))
+    expected = preprocessor.process(TEXT, **options)
+
+    for seed in range(5):
+        chunks = _random_chunks(TEXT, seed)
+        assert "".join(preprocessor.process_stream(chunks, **options)) == expected
+
+
+def test_number_token_straddling_chunks():
+    preprocessor = TextPreprocessor()
+    chunks = ["O valor é 1.5", "00,", "00 e o código <N", "UM> foi ", "enviado"]
+    result = "".join(preprocessor.process_stream(chunks, normalize_numbers=True))
+    assert result == "o valor é <NUM> e o código <NUM> foi enviado"
+
+
+def test_stream_with_tokenize_matches_process():
+    preprocessor = TextPreprocessor()
+    tokens = list(
+        itertools.chain.from_iterable(
+            preprocessor.process_stream(_random_chunks(TEXT, 0), tokenize=True)
+        )
+    )
+    assert tokens == preprocessor.process(TEXT, tokenize=True)
+
+
+@pytest.mark.parametrize("content", [TEXT, TEXT.encode("utf-8")])
+def test_stream_reads_file_objects(content):
+    source = io.StringIO(content) if isinstance(content, str) else io.BytesIO(content)
+    result = "".join(TextPreprocessor().process_stream(source, chunk_size=7))
+    assert result == TextPreprocessor().process(TEXT)
+
+
+def test_stream_output_pieces_stay_bounded():
+    chunks = ("palavra " * 100 for _ in range(1000))
+    pieces = list(TextPreprocessor().process_stream(chunks))
+    assert len(pieces) > 100
+    assert max(len(piece) for piece in pieces) < 2000
+
+
+def test_stream_rejects_custom_base_steps():
+    preprocessor = TextPreprocessor(base_steps=[str.strip])
+    with pytest.raises(ValueError):
+        list(preprocessor.process_stream(["texto"]))
+
+
+def test_stream_of_empty_input():
+    assert list(TextPreprocessor().process_stream([])) == []
+    assert list(TextPreprocessor().process_stream(["  \n ", "\t"])) == []
@@ -0,0 +1,88 @@
+import os
+from unittest.mock import patch
+
+from app.utils.metrics import metrics
+from app.utils.text_cache import ExtractedTextCache, content_hash
+from app.utils.text_extractor import (
+    extract_text,
+    extract_text_from_bytes,
+    text_cache_key,
+)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ExtractedTextCache(max_entries=2)
+    cache.put("a", "texto a")
+    cache.put("b", "texto b")
+    assert cache.get("a") == "texto a"  # "a" passa a ser o mais recente
+    cache.put("c", "texto c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "texto a"
+    assert cache.get("c") == "texto c"
+    assert cache.stats()["hit_rate"] == 0.75
+
+
+def test_disk_tier_survives_a_new_cache_instance(tmp_path):
+    text = "Boleto de cobrança " * 500
+    ExtractedTextCache(directory=str(tmp_path)).put("chave", text)
+
+    stored = [f for _, _, files in os.walk(tmp_path) for f in files]
+    assert len(stored) == 1
+    # Entradas ficam comprimidas em disco.
+    assert os.path.getsize(next(tmp_path.rglob("*.z"))) < len(text) // 10
+
+    fresh = ExtractedTextCache(directory=str(tmp_path))
+    assert fresh.get("chave") == text
+
+
+def test_disk_tier_respects_the_size_bound(tmp_path):
+    cache = ExtractedTextCache(
+        max_entries=0, directory=str(tmp_path), max_disk_bytes=2500
+    )
+    for index in range(10):
+        # Texto pouco compressível, ~1 KB por entrada em disco.
+        cache.put(f"k{index}", os.urandom(600).hex())
+
+    assert cache.stats()["disk_bytes"] <= 2500
+    assert cache.get("k9") is not None
+    assert cache.get("k0") is None
+
+
+def test_repeated_pdf_is_not_parsed_twice(tmp_path):
+    data = f"Fatura {os.urandom(8).hex()}".encode("utf-8")
+    txt_path = tmp_path / "fatura.txt"
+    txt_path.write_bytes(data)
+    metrics.reset()
+
+    with patch(
+        "app.utils.text_extractor._extract_pdf_bytes", return_value="Texto do PDF"
+    ) as mock_pdf:
+        first = extract_text_from_bytes(b"%PDF-" + data, filename="anexo.pdf")
+        second = extract_text_from_bytes(b"%PDF-" + data, filename="copia.pdf")
+
+    assert first == second == "Texto do PDF"
+    mock_pdf.assert_called_once()
+    assert metrics.get("text_cache.hits") == 1
+
+    # O caminho .txt de extract_text usa o mesmo cache, pelo hash do conteúdo.
+    assert extract_text(str(txt_path)) == data.decode("utf-8")
+    assert extract_text_from_bytes(
+        data, filename="outro.txt", sha256=content_hash(data)
+    ) == data.decode("utf-8")
+    assert metrics.get("text_cache.hits") == 2
+
+
+def test_changing_extraction_settings_misses_the_cache():
+    data = b"%PDF-" + os.urandom(8).hex().encode("utf-8")
+
+    with patch(
+        "app.utils.text_extractor._extract_pdf_bytes", return_value="Texto do PDF"
+    ) as mock_pdf:
+        key = text_cache_key(data, filename="anexo.pdf")
+        extract_text_from_bytes(data, filename="anexo.pdf")
+        with patch("app.utils.text_extractor.PDF_MAX_CHARS", 10):
+            assert text_cache_key(data, filename="anexo.pdf") != key
+            extract_text_from_bytes(data, filename="anexo.pdf")
+
+    assert mock_pdf.call_count == 2
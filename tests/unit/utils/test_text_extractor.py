@@ -1,4 +1,14 @@
-from app.utils.text_extractor import extract_text
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.text_extractor import (
+    count_pdf_pages,
+    extract_pdf_text,
+    extract_text,
+    extract_text_from_bytes,
+    html_to_text,
+)
+from app.utils.thread_stripper import strip_quoted_history
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 
@@ -23,9 +33,9 @@ def test_plain_text_returns_unchanged():
 
 
 def test_text_with_basic_html_tags_removed():
-    """Testa se as tags HTML básicas são removidas do texto."""
+    """Testa se as tags HTML são removidas e os blocos viram quebras de linha."""
     html_text = "<h1>Título</h1><p>Este é um <b>conteúdo</b> com <i>formatação</i>.</p>"
-    expected_text = "TítuloEste é um conteúdo com formatação."
+    expected_text = "Título\nEste é um conteúdo com formatação."
     assert extract_text(html_text) == expected_text
 
 
@@ -42,7 +52,7 @@ def test_html_with_line_breaks_and_entities():
         "<span>Esta é uma nova linha.</span></div>\n"
         "<p>Outro parágrafo &copy; 2023.</p>"
     )
-    expected_output = "Olá & Mundo!Esta é uma nova linha.\nOutro parágrafo © 2023."
+    expected_output = "Olá & Mundo!\nEsta é uma nova linha.\nOutro parágrafo © 2023."
     assert extract_text(mixed_content) == expected_output
 
 
@@ -85,10 +95,38 @@ def test_style_tags_removed():
 def test_malformed_html_no_exception():
     """Testa se HTML malformado não causa uma exceção e é tratado graciosamente."""
     malformed_html = "<div><p>Tag não fechada<div>Texto normal."
-    expected_text = "Tag não fechadaTexto normal."
+    expected_text = "Tag não fechada\nTexto normal."
     assert extract_text(malformed_html) == expected_text
 
 
+def test_head_and_hidden_elements_are_skipped():
+    """Testa se head, preheaders ocultos e pixels de rastreamento são ignorados."""
+    newsletter = (
+        "<html><head><title>Oferta</title><style>p{color:red}</style></head><body>"
+        '<div style="display:none;max-height:0">Preheader escondido</div>'
+        '<span hidden>Oculto</span><div aria-hidden="true">Também oculto</div>'
+        "<p>Promoção   da\n semana</p>"
+        '<img src="https://t.example/pixel.gif" width="1"><p>Até sexta.</p>'
+        "</body></html>"
+    )
+    # Espaços são colapsados, mas a quebra de linha do texto é mantida
+    assert extract_text(newsletter) == "Promoção da\nsemana\nAté sexta."
+
+
+def test_html_table_cells_and_pre_whitespace():
+    html_text = (
+        "<table><tr><td>Valor</td><td>R$ 10</td></tr><tr><td>Total</td></tr></table>"
+        "<pre>linha  1</pre>"
+    )
+    assert extract_text(html_text) == "Valor R$ 10\nTotal\nlinha  1"
+
+
+def test_html_to_text_accepts_chunked_input():
+    html_text = "<div>Olá <b>mun</b>do &amp; <script>x()</script>equipe</div><p>Fim</p>"
+    chunks = [html_text[i : i + 3] for i in range(0, len(html_text), 3)]
+    assert html_to_text(chunks) == html_to_text(html_text) == "Olá mundo & equipe\nFim"
+
+
 # --- Testes para .txt ---
 
 
@@ -117,7 +155,7 @@ def test_txt_file_with_html_content_is_cleaned(tmp_path):
     """Testa se um arquivo .txt contendo HTML tem as tags removidas."""
     p = tmp_path / "arquivo_com_html.txt"
     conteudo_html = "<h1>Título</h1><p>Texto com <b>negrito</b>.</p>"
-    conteudo_esperado = "TítuloTexto com negrito."
+    conteudo_esperado = "Título\nTexto com negrito."
     p.write_text(conteudo_html, encoding="utf-8")
     assert extract_text(str(p)) == conteudo_esperado
 
@@ -181,3 +219,109 @@ def test_corrupted_pdf_file_returns_empty_string(tmp_path):
     pdf_path = tmp_path / "corrupted.pdf"
     pdf_path.write_text("%PDF-1.x\n...junk...\n")
     assert extract_text(str(pdf_path)) == ""
+
+
+# --- Testes para extract_text_from_bytes ---
+
+
+def test_extract_text_from_pdf_bytes(tmp_path):
+    """Testa a extração de um PDF em memória, sem caminho de arquivo."""
+    pdf_path = tmp_path / "valid.pdf"
+    content = "Este é o conteúdo de um arquivo PDF."
+    _create_pdf(pdf_path, text_content=content)
+    data = pdf_path.read_bytes()
+
+    assert content in extract_text_from_bytes(data, filename="anexo.pdf")
+    assert content in extract_text_from_bytes(
+        memoryview(data), mime_type="application/pdf"
+    )
+    # Sem nome nem MIME type, a assinatura %PDF- identifica o arquivo.
+    assert content in extract_text_from_bytes(io.BytesIO(data))
+
+
+def test_extract_text_from_txt_bytes_cleans_html():
+    data = "<p>Olá, <b>mundo</b>!</p>".encode("utf-8")
+    assert extract_text_from_bytes(data, filename="email.TXT") == "Olá, mundo!"
+    assert extract_text_from_bytes(data, mime_type="text/plain; charset=utf-8") == (
+        "Olá, mundo!"
+    )
+
+
+def test_extract_text_from_bytes_rejects_invalid_content():
+    assert extract_text_from_bytes(b"\xff\xfe\xfa", filename="email.txt") == ""
+    assert extract_text_from_bytes(b"%PDF-1.x\n...junk...\n", filename="x.pdf") == ""
+    assert extract_text_from_bytes(b"binario", filename="planilha.xlsx") == ""
+
+
+# --- Testes para extração por páginas ---
+
+
+def _create_multipage_pdf(path, pages):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    for page in range(pages):
+        text_object = c.beginText()
+        text_object.setTextOrigin(72, 700)
+        text_object.setFont("Helvetica", 10)
+        text_object.textLines(
+            f"Pagina {page} linha um.\nSegunda linha da pagina {page}."
+        )
+        c.drawText(text_object)
+        c.showPage()
+    c.save()
+
+
+def test_fast_mode_keeps_lines_and_words_apart(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    _create_multipage_pdf(pdf_path, 1)
+
+    text = extract_pdf_text(str(pdf_path), fast=True, max_chars=0)
+    assert "Pagina 0 linha um.\nSegunda linha da pagina 0." in text
+
+
+def test_extraction_stops_at_page_and_char_limits(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    _create_multipage_pdf(pdf_path, 10)
+
+    assert count_pdf_pages(str(pdf_path)) == 10
+    by_pages = extract_pdf_text(str(pdf_path), fast=True, max_pages=3, max_chars=0)
+    assert "pagina 2" in by_pages and "pagina 3" not in by_pages
+
+    by_chars = extract_pdf_text(str(pdf_path), fast=True, max_chars=60)
+    assert "pagina 1" in by_chars and "pagina 2" not in by_chars
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    _create_multipage_pdf(pdf_path, 12)
+    data = pdf_path.read_bytes()
+
+    sequential = extract_pdf_text(data, max_chars=0)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        parallel = extract_pdf_text(data, max_chars=0, executor=executor, workers=2)
+        limited = extract_pdf_text(data, max_chars=10, executor=executor, workers=2)
+
+    assert parallel == sequential
+    assert limited == extract_pdf_text(data, max_chars=10)
+    assert "pagina 0" in limited and "pagina 1" not in limited
+
+
+def test_plain_text_reply_with_angle_brackets_keeps_lines():
+    """
+    Endereços entre "<>" e "</" não tornam o texto HTML: as linhas são mantidas
+    e o histórico citado continua sendo removido.
+    """
+    reply = (
+        "Pode confirmar o recebimento da fatura?\n\n"
+        "Obrigado </ ate logo\n\n"
+        "Em seg., 3 de mar. de 2025 às 10:00, João Silva <joao@empresa.com> escreveu:\n"
+        "> Olá, segue a fatura em anexo.\n"
+        "> Abraço"
+    )
+
+    text = extract_text(reply)
+
+    assert text == reply
+    stripped = strip_quoted_history(text).text
+    assert "Pode confirmar o recebimento da fatura?" in stripped
+    assert "joao@empresa.com" not in stripped
+    assert "segue a fatura" not in stripped
@@ -0,0 +1,94 @@
+import pytest
+from app.utils.metrics import metrics
+from app.utils.thread_stripper import strip_quoted_history
+
+NEW_MESSAGE = "Pessoal, segue a planilha corrigida. Podem validar até amanhã?"
+QUOTED_MESSAGE = "Bom dia, encontrei um erro na planilha de conciliação de março."
+
+
+@pytest.mark.parametrize(
+    "raw_email",
+    [
+        pytest.param(
+            f"{NEW_MESSAGE}\n\nEm seg., 10 de mar. de 2026 às 09:12, Ana Souza "
+            f"<ana@empresa.com> escreveu:\n> {QUOTED_MESSAGE}\n> Abraços",
+            id="gmail_pt",
+        ),
+        pytest.param(
+            f"{NEW_MESSAGE}\n\nEm seg., 10 de mar. de 2026 às 09:12, Ana Souza "
+            f"<ana@empresa.com>\nescreveu:\n\n> {QUOTED_MESSAGE}",
+            id="gmail_pt_attribution_wrapped",
+        ),
+        pytest.param(
+            f"{NEW_MESSAGE}\n\nOn Mon, Mar 10, 2026 at 9:12 AM Ana Souza wrote:\n"
+            f"> {QUOTED_MESSAGE}",
+            id="gmail_en",
+        ),
+        pytest.param(
+            f"{NEW_MESSAGE}\n\n-----Original Message-----\nFrom: Ana Souza\n"
+            f"Sent: Monday, March 10, 2026\nSubject: Planilha\n\n{QUOTED_MESSAGE}",
+            id="outlook_separator",
+        ),
+        pytest.param(
+            f"{NEW_MESSAGE}\n________________________________\nDe: Ana Souza\n"
+            f"Enviado: segunda-feira, 10 de março de 2026\nPara: Financeiro\n"
+            f"Assunto: Planilha\n\n{QUOTED_MESSAGE}",
+            id="outlook_header_block",
+        ),
+    ],
+)
+def test_keeps_only_the_newest_message(raw_email):
+    result = strip_quoted_history(raw_email)
+
+    assert NEW_MESSAGE in result.text
+    assert QUOTED_MESSAGE not in result.text
+    assert result.had_history
+
+
+def test_inline_quoted_lines_are_removed():
+    raw_email = f"> {QUOTED_MESSAGE}\n\n{NEW_MESSAGE}"
+    assert strip_quoted_history(raw_email).text == NEW_MESSAGE
+
+
+def test_text_without_history_is_unchanged():
+    result = strip_quoted_history(NEW_MESSAGE)
+    assert result.text == NEW_MESSAGE
+    assert result.bytes_saved == 0
+    assert result.summary is None
+
+
+def test_pure_forward_keeps_the_forwarded_message():
+    """Um encaminhamento sem comentário deve manter a mensagem encaminhada."""
+    raw_email = (
+        "---------- Forwarded message ---------\nDe: Ana Souza <ana@empresa.com>\n"
+        "Date: seg., 10 de mar. de 2026\nSubject: Planilha\nTo: Financeiro\n\n"
+        f"{QUOTED_MESSAGE}"
+    )
+    assert strip_quoted_history(raw_email).text == QUOTED_MESSAGE
+
+
+def test_summary_describes_the_quoted_history():
+    raw_email = (
+        f"{NEW_MESSAGE}\n\nEm seg., 10 de mar. de 2026 às 09:12, Ana Souza "
+        f"escreveu:\n> {QUOTED_MESSAGE}"
+    )
+    result = strip_quoted_history(raw_email, summarize=True)
+
+    assert result.text.startswith(NEW_MESSAGE)
+    assert result.summary is not None
+    assert "Ana Souza" in result.summary
+    assert "erro na planilha" in result.summary
+    assert result.summary in result.text
+
+
+def test_records_bytes_and_tokens_saved():
+    metrics.reset()
+    raw_email = f"{NEW_MESSAGE}\n\nOn Mon, Ana wrote:\n" + f"> {QUOTED_MESSAGE}\n" * 20
+
+    result = strip_quoted_history(raw_email)
+
+    expected_bytes = len(raw_email.encode("utf-8")) - len(NEW_MESSAGE.encode("utf-8"))
+    assert result.bytes_saved == expected_bytes
+    assert result.tokens_saved > 0
+    assert metrics.get("thread_strip.bytes_saved") == expected_bytes
+    assert metrics.get("thread_strip.tokens_saved") == result.tokens_saved
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from app.utils.token_corpus import (
+    InvalidTokenCorpusError,
+    TokenCorpus,
+    Vocabulary,
+)
+
+DOCUMENTS = [
+    ["poderiam", "aprovar", "fatura", "<NUM>"],
+    [],
+    ["obrigado", "retorno", "fatura", "<tag com\nquebra>"],
+]
+
+
+def test_vocabulary_interns_tokens_in_order():
+    vocabulary = Vocabulary(["a", "b", "a"])
+    assert len(vocabulary) == 2
+    assert vocabulary.intern("c") == 2
+    assert vocabulary.get_id("b") == 1 and vocabulary.token(2) == "c"
+
+
+def test_append_and_reopen_documents(tmp_path):
+    path = str(tmp_path / "corpus")
+    with TokenCorpus.open(path, "a") as corpus:
+        for document in DOCUMENTS:
+            corpus.append(document)
+
+    corpus = TokenCorpus.open(path)
+    assert len(corpus) == 3
+    assert list(corpus.iter_documents()) == DOCUMENTS
+    assert len(corpus.vocabulary) == 7
+    # Tokens repetidos compartilham o mesmo ID.
+    assert corpus.token_ids(0)[2] == corpus.token_ids(2)[2]
+    assert isinstance(corpus.token_ids(0), np.memmap)
+
+
+def test_appending_to_an_existing_corpus_extends_the_vocabulary(tmp_path):
+    path = str(tmp_path / "corpus")
+    with TokenCorpus.open(path, "a") as corpus:
+        corpus.append(DOCUMENTS[0])
+    with TokenCorpus.open(path, "a") as corpus:
+        corpus.append_text("Favor aprovar a FATURA 123", normalize_numbers=True)
+
+    corpus = TokenCorpus.open(path)
+    assert corpus.document(1) == ["favor", "aprovar", "a", "fatura", "<NUM>"]
+    assert [len(ids) for ids in corpus] == [4, 5]
+    assert len(corpus.vocabulary) == 6
+
+
+def test_read_only_corpus_rejects_appends(tmp_path):
+    path = str(tmp_path / "corpus")
+    TokenCorpus.open(path, "a").close()
+
+    corpus = TokenCorpus.open(path)
+    assert len(corpus) == 0
+    with pytest.raises(ValueError):
+        corpus.append(["x"])
+
+
+def test_missing_or_inconsistent_corpus_raises(tmp_path):
+    with pytest.raises(InvalidTokenCorpusError):
+        TokenCorpus.open(str(tmp_path / "inexistente"))
+
+    path = tmp_path / "corpus"
+    with TokenCorpus.open(str(path), "a") as corpus:
+        corpus.append(DOCUMENTS[0])
+    (path / "tokens.bin").write_bytes(b"\x00" * 4)
+    with pytest.raises(InvalidTokenCorpusError):
+        TokenCorpus.open(str(path))
+
+
+def test_interrupted_flush_is_ignored_and_truncated_on_append(tmp_path):
+    path = tmp_path / "corpus"
+    with TokenCorpus.open(str(path), "a") as corpus:
+        corpus.append(DOCUMENTS[0])
+
+    # Simula uma queda no meio do flush: tokens gravados, offset parcial e
+    # uma linha incompleta no vocabulário.
+    with open(path / "vocab.txt", "a", encoding="utf-8") as f:
+        f.write('"nov')
+    with open(path / "tokens.bin", "ab") as f:
+        f.write(b"\x01\x00\x00\x00" * 3)
+    with open(path / "offsets.bin", "ab") as f:
+        f.write(b"\x07\x00\x00")
+
+    corpus = TokenCorpus.open(str(path))
+    assert list(corpus.iter_documents()) == [DOCUMENTS[0]]
+
+    with TokenCorpus.open(str(path), "a") as corpus:
+        corpus.append(DOCUMENTS[2])
+
+    corpus = TokenCorpus.open(str(path))
+    assert list(corpus.iter_documents()) == [DOCUMENTS[0], DOCUMENTS[2]]
+    assert len(corpus.vocabulary) == 7
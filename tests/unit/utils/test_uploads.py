@@ -0,0 +1,52 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.uploads import (
+    UploadSizeLimitMiddleware,
+    UploadTooLargeError,
+    read_upload,
+)
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="email.pdf")
+
+
+def test_read_upload_returns_content_and_hash():
+    data = os.urandom(200_000)
+    upload = asyncio.run(read_upload(_upload(data), chunk_size=4096))
+
+    assert upload.data == data
+    assert upload.size == len(data)
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+
+
+def test_read_upload_stops_at_the_size_limit():
+    file = _upload(b"x" * 100_000)
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(read_upload(file, max_bytes=5000, chunk_size=1000))
+
+    # A leitura para no primeiro bloco acima do limite.
+    assert file.file.tell() == 6000
+
+
+def test_middleware_rejects_large_content_length_before_reading_body():
+    inner = FastAPI()
+
+    @inner.post("/api/process-email")
+    async def endpoint():
+        raise AssertionError("O endpoint não deveria ser chamado.")
+
+    client = TestClient(UploadSizeLimitMiddleware(inner, max_bytes=1024))
+    response = client.post("/api/process-email", content=b"x" * 200_000)
+
+    assert response.status_code == 413
+    assert "excede o limite" in response.text
+    assert "toast" in response.headers["hx-trigger"]
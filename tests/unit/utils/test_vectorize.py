@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.utils.vectorize import HashingVectorizer
+
+EMAILS = [
+    "Poderiam aprovar o pagamento da fatura de R$ 1.500,00?",
+    "Obrigado pelo retorno, tenham um ótimo dia!",
+    "Poderiam aprovar o pagamento da fatura de R$ 2.300,00?",
+    "",
+]
+
+
+def test_transform_returns_csr_arrays():
+    matrix = HashingVectorizer(n_features=2**12).transform(EMAILS)
+
+    assert matrix.shape == (4, 2**12)
+    assert matrix.indptr.tolist()[0] == 0 and len(matrix.indptr) == 5
+    assert matrix.indices.dtype == np.int32 and matrix.data.dtype == np.float32
+    assert matrix.indptr[-1] == len(matrix.indices) == len(matrix.data)
+    # Linha vazia não tem entradas.
+    assert matrix.indptr[4] == matrix.indptr[3]
+
+
+def test_rows_are_l2_normalized_and_entities_collapse():
+    dense = HashingVectorizer(n_features=2**12).transform(EMAILS, dense=True)
+
+    assert np.allclose(np.linalg.norm(dense[:3], axis=1), 1.0)
+    # Os dois pedidos diferem apenas no valor, normalizado para <MOEDA>.
+    assert np.allclose(dense[0], dense[2])
+    assert dense[0] @ dense[1] < 0.5
+
+
+def test_bigrams_add_features():
+    unigrams = HashingVectorizer(n_features=2**16, ngram_range=(1, 1), norm=None)
+    both = HashingVectorizer(n_features=2**16, ngram_range=(1, 2), norm=None)
+    tokens = [["aprovar", "pagamento", "fatura"]]
+
+    assert unigrams.transform_tokens(tokens).nnz == 3
+    assert both.transform_tokens(tokens).nnz == 5
+
+
+def test_counts_are_accumulated_without_sign():
+    vectorizer = HashingVectorizer(
+        n_features=2**16, ngram_range=(1, 1), alternate_sign=False, norm=None
+    )
+    dense = vectorizer.transform_tokens([["boleto", "boleto", "pix"]], dense=True)
+    assert sorted(dense[0][dense[0] != 0].tolist()) == [1.0, 2.0]
+
+
+def test_idf_weights_can_be_saved_and_loaded(tmp_path):
+    vectorizer = HashingVectorizer(n_features=2**12)
+    idf = vectorizer.fit_idf(EMAILS)
+    assert idf.shape == (2**12,) and idf.dtype == np.float32
+
+    path = tmp_path / "idf.npy"
+    vectorizer.save_idf(str(path))
+    other = HashingVectorizer(n_features=2**12)
+    other.load_idf(str(path))
+
+    assert np.array_equal(
+        other.transform(EMAILS, dense=True), vectorizer.transform(EMAILS, dense=True)
+    )
+    with pytest.raises(ValueError):
+        HashingVectorizer(n_features=2**10).load_idf(str(path))
+
+
+def test_cancelled_buckets_do_not_count_as_document_frequency():
+    vectorizer = HashingVectorizer(n_features=1, ngram_range=(1, 1), norm=None)
+    vectorizer._pipeline = str.split
+    # Com uma só coluna, duas features de sinais opostos se anulam.
+    signs = {}
+    for word in ("boleto", "pix", "fatura", "nota", "prazo", "reembolso"):
+        code = vectorizer.transform_tokens([[word]], dense=True)[0, 0]
+        signs.setdefault(code, word)
+    cancelled = f"{signs[1.0]} {signs[-1.0]}"
+
+    idf = vectorizer.fit_idf([cancelled, signs[1.0]])
+
+    assert vectorizer.transform_tokens([cancelled.split()]).nnz == 0
+    assert idf[0] == pytest.approx(np.log(3 / 2) + 1)
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.utils.zip_uploads import (
+    ZIP_ENTRY_GENERIC_ERROR,
+    ZIP_JOB_TTL_SECONDS,
+    ZipArchiveError,
+    _prune_jobs,
+    get_zip_job,
+    is_zip_upload,
+    open_zip_archive,
+    read_zip_entry,
+    start_zip_job,
+)
+
+
+def _zip(files, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_is_zip_upload_uses_extension_or_mime_type():
+    assert is_zip_upload("emails.ZIP")
+    assert is_zip_upload("upload", "application/zip")
+    assert not is_zip_upload("contrato.pdf", "application/pdf")
+
+
+def test_open_zip_archive_keeps_only_supported_entries():
+    data = _zip(
+        {
+            "a.txt": "Olá",
+            "pasta/b.eml": "Subject: Oi\n\nCorpo",
+            "c.PDF": b"%PDF-1.4",
+            "foto.png": b"\x89PNG",
+            "interno.zip": b"PK",
+            "__MACOSX/._a.txt": b"",
+            ".DS_Store": b"",
+        }
+    )
+
+    archive, entries = open_zip_archive(data)
+    archive.close()
+
+    assert [info.filename for info in entries] == ["a.txt", "pasta/b.eml", "c.PDF"]
+
+
+def test_open_zip_archive_rejects_invalid_archives():
+    with pytest.raises(ZipArchiveError, match="inválido"):
+        open_zip_archive(b"nao e um zip")
+    with pytest.raises(ZipArchiveError, match="não contém"):
+        open_zip_archive(_zip({"foto.png": b"\x89PNG"}))
+
+
+def test_open_zip_archive_enforces_zip_bomb_limits():
+    with pytest.raises(ZipArchiveError, match="máximo é 2"):
+        open_zip_archive(_zip({f"{n}.txt": "x" for n in range(3)}), max_entries=2)
+    with pytest.raises(ZipArchiveError, match="excede"):
+        open_zip_archive(_zip({"a.txt": "x" * 2048}), max_total_bytes=1024)
+    # 1 MB de zeros comprime para ~1 KB
+    with pytest.raises(ZipArchiveError, match="compressão"):
+        open_zip_archive(_zip({"a.txt": b"\0" * 1_000_000}))
+
+
+def test_read_zip_entry_enforces_size_and_integrity():
+    data = _zip({"a.txt": b"x" * 10_000}, compression=zipfile.ZIP_STORED)
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    info = archive.getinfo("a.txt")
+
+    assert read_zip_entry(archive, info, max_bytes=10_000) == b"x" * 10_000
+    with pytest.raises(ZipArchiveError, match="limite"):
+        read_zip_entry(archive, info, max_bytes=1000)
+    # Tamanho declarado falso: a leitura para nele e o CRC não confere
+    info.file_size = 10
+    with pytest.raises(ZipArchiveError, match="corrompida"):
+        read_zip_entry(archive, info, max_bytes=1000)
+
+
+def test_zip_job_collects_results_with_bounded_concurrency():
+    data = _zip({f"{n}.txt": f"e-mail {n}" for n in range(6)})
+    active = 0
+    peak = 0
+
+    async def process(filename, content):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if filename == "3.txt":
+            raise RuntimeError("falha no SDK em /srv/app/segredo.py")
+        if filename == "4.txt":
+            raise ZipArchiveError("Arquivo maior que o limite de 5 MB.")
+        return {"filename": filename, "text": content.decode()}
+
+    async def run():
+        job = start_zip_job(data, process, concurrency=2)
+        assert job.total == 6
+        await job.task
+        return job
+
+    job = asyncio.run(run())
+
+    assert job.done
+    assert peak == 2
+    by_name = {item["filename"]: item for item in job.results}
+    assert by_name["0.txt"]["text"] == "e-mail 0"
+    # Erros inesperados não expõem o texto original na página
+    assert by_name["3.txt"]["error"] == ZIP_ENTRY_GENERIC_ERROR
+    assert by_name["4.txt"]["error"] == "Arquivo maior que o limite de 5 MB."
+    assert job.finished_at is not None
+
+
+def test_finished_jobs_expire_from_completion_not_creation():
+    async def process(filename, content):
+        return {"filename": filename}
+
+    async def run():
+        job = start_zip_job(_zip({"a.txt": "x"}), process)
+        await job.task
+        return job
+
+    job = asyncio.run(run())
+    # Um ZIP que levou mais que o TTL para terminar continua disponível
+    job.created_at -= ZIP_JOB_TTL_SECONDS * 2
+    _prune_jobs()
+    assert get_zip_job(job.id) is job
+
+    job.finished_at -= ZIP_JOB_TTL_SECONDS + 1
+    _prune_jobs()
+    assert get_zip_job(job.id) is None